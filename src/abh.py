@@ -3,27 +3,83 @@ american bunny hop; a tui wrapper for lldb.
 
 Run with:
 
-    python abh.py
+    python abh.py [--startup-profile]
 """
 
-from rich.syntax import Syntax
+from __future__ import annotations
+
+import time
+
+# everything from here on counts as import time for --startup-profile
+STARTED = time.perf_counter()
+
+from rich.text import Text
 from textual.app import App, ComposeResult
-from textual.containers import Grid
+from textual.containers import Grid, Horizontal
+from textual.message import Message
 from textual.reactive import reactive
 from textual.widgets import (
     Footer,
     Header,
     RichLog,
 )
-
-import lldb
-import os
-import re
-
+from textual.worker import get_current_worker
+
+from typing import Optional
+
+import argparse
+import sys
+import tempfile
+
+from startup import StartupProfile, lazy_import
+
+# imported for real on the engine's first use, after the ui has painted
+lldb = lazy_import("lldb")
+
+from asmview import AsmView
+from breakpoints import BreakpointRegistry
+from covermap import Coverage
+from disasm import DisassemblyCache
+from engine import Batched, Covered, DebuggerEngine, Exited, Failed, Output, Running, Stopped
+from expression import parse as parse_expression
+from hexview import HexView
+from memcache import MemoryCache
+from registers import RegisterTable
+from regsets import RegisterSets
+from scanner import ValueScan
 from sessioninfo import SessionInfo
-from prompts import TargetPrompt, BreakpointPrompt
-from notifs import ErrorNotif, SymbolNotif, WarningMotif
+from snapshot import StopSnapshot
+from sprayview import SprayView
+from stepping import parse as parse_batch
+from strings import StringIndex
+from symbols import SymbolIndex
+from tracing import Trace
+from traceview import TraceView
+from xrefs import XrefIndex
+from prompts import TargetPrompt, BreakpointPrompt, BatchPrompt
+from notifs import (
+    ErrorNotif,
+    PointerNotif,
+    ScanNotif,
+    StringNotif,
+    SymbolNotif,
+    WarningMotif,
+    XrefNotif,
+)
 from inspector import Inspector
+from perfview import ProfilerPanel
+from pointers import PointerMap, statics
+from profiler import PROFILER
+
+IMPORTED = time.perf_counter()
+
+
+class EngineEvent(Message):
+    """Carries an event from the debugger engine onto the app's loop."""
+
+    def __init__(self, event: object) -> None:
+        super().__init__()
+        self.event = event
 
 
 class AmericanBunnyHop(App):
@@ -33,24 +89,57 @@ class AmericanBunnyHop(App):
     BINDINGS = [
         ("t", "target", "target"),
         ("s", "symbols", "symbols"),
+        ("j", "xrefs", "xrefs"),
+        ("k", "coverage", "coverage"),
+        ("z", "export_coverage", "export coverage"),
+        ("g", "strings", "strings"),
+        ("a", "scan", "scan"),
+        ("l", "pointers", "pointers"),
         ("b", "breakpoint", "breaks"),
         ("r", "run", "run"),
         ("c", "continue", "continue"),
         ("o", "next", "step over"),
         ("i", "step", "step into"),
+        ("n", "batch", "batch"),
+        ("p", "interrupt", "interrupt"),
         ("x", "examine", "examine"),
         ("d", "deref", "deref"),
+        ("e", "record", "record"),
+        ("y", "replay", "replay"),
+        ("v", "regsets", "reg sets"),
+        ("m", "memory", "memory"),
+        ("w", "spray", "spray"),
+        ("f", "profiler", "profiler"),
+        ("u", "dump_profile", "dump profile"),
         ("q", "clean_quit", "quit"),
     ]
 
-    dbg: reactive[lldb.SBDebugger] = reactive(lldb.SBDebugger.Create())
     filename: reactive[str] = reactive("")
-    target: reactive[lldb.SBTarget] = reactive(lldb.SBTarget())
-    process: reactive[lldb.SBProcess] = reactive(lldb.SBProcess())
-    thread: reactive[lldb.SBThread] = reactive(lldb.SBThread())
+    target: reactive[Optional[lldb.SBTarget]] = reactive(None)
+    process: reactive[Optional[lldb.SBProcess]] = reactive(None)
+    thread: reactive[Optional[lldb.SBThread]] = reactive(None)
     mounted: bool = False
-    regex = re.compile(r"\[[0-9]+m")
-    previous_regs = {}
+    engine: Optional[DebuggerEngine] = None
+    snapshot: Optional[StopSnapshot] = None
+    pending: Optional[StopSnapshot] = None
+    trace: Optional[Trace] = None
+    scan: Optional[ValueScan] = None
+    pointers: Optional[PointerMap] = None
+    coverage: Optional[Coverage] = None
+    recording: bool = False
+
+    def __init__(self, startup_profile: bool = False) -> None:
+        super().__init__()
+        self.listings = DisassemblyCache()
+        self.memory = MemoryCache()
+        self.symbols = SymbolIndex()
+        self.breakpoints = BreakpointRegistry(self.symbols)
+        self.xrefs = XrefIndex(self.symbols)
+        self.strings = StringIndex()
+        self.profile: Optional[StartupProfile] = None
+        if startup_profile:
+            self.profile = StartupProfile(STARTED)
+            self.profile.mark("imports", IMPORTED)
 
     def compose(self) -> ComposeResult:
         """Compose our UI."""
@@ -59,45 +148,28 @@ class AmericanBunnyHop(App):
             SessionInfo().data_bind(
                 AmericanBunnyHop.filename,
                 AmericanBunnyHop.target,
-                AmericanBunnyHop.process,
-                AmericanBunnyHop.thread,
             ),
-            Grid(
-                RichLog(
-                    id="regs64",
-                    auto_scroll=False,
-                    markup=True,
-                    classes="regs_item scroller",
-                ),
-                RichLog(
-                    id="regs32",
-                    auto_scroll=False,
-                    markup=True,
-                    classes="regs_item scroller",
-                ),
-                RichLog(
-                    id="regs16",
-                    auto_scroll=False,
-                    markup=True,
-                    classes="regs_item scroller",
-                ),
-                RichLog(
-                    id="regs8",
-                    auto_scroll=False,
-                    markup=True,
-                    classes="regs_item scroller",
-                ),
-                id="regs",
+            RegisterTable(id="regs"),
+            Inspector(self.memory, self.symbols.resolve),
+            Horizontal(
+                AsmView(id="asm", classes="scroller"),
+                HexView(self.memory, id="hexview", classes="scroller"),
+                RichLog(id="output", classes="scroller", auto_scroll=True),
+                RegisterSets(id="regsets", classes="scroller"),
+                TraceView(id="trace", classes="scroller"),
+                SprayView(self.memory, id="spray", classes="scroller"),
+                id="views",
             ),
-            Inspector(regs=self.previous_regs),
-            RichLog(id="asm", classes="scroller", auto_scroll=False),
             id="body",
         )
+        yield ProfilerPanel(self.memory, id="profiler")
         yield Footer()
 
     def on_mount(self) -> None:
         self.title = "american bunny hop"
-        self.dbg.SetAsync(False)
+        self.call_after_refresh(self.painted)
+        self.memory.listeners.append(self.listings.invalidate)
+        self.breakpoints.listeners.append(self.listings.invalidate)
         self.mounted = True
 
         # for testing only
@@ -105,6 +177,29 @@ class AmericanBunnyHop(App):
         # self.target = target
         # self.filename = target.GetExecutable().GetFilename()
 
+    def painted(self) -> None:
+        """The first frame is up; now pay for lldb, off the ui thread."""
+        if self.profile is not None:
+            self.profile.mark("first paint")
+        self.run_worker(self.start_engine, thread=True, group="engine")
+
+    def start_engine(self) -> None:
+        # the first attribute read does the actual import
+        lldb.SBDebugger
+        if self.profile is not None:
+            self.profile.mark("lldb imported")
+        engine = DebuggerEngine(lambda event: self.post_message(EngineEvent(event)))
+        engine.start()
+        self.call_from_thread(self.engine_ready, engine)
+
+    def engine_ready(self, engine: DebuggerEngine) -> None:
+        self.engine = engine
+        if self.profile is not None:
+            self.profile.mark("debugger ready")
+            output = self.query_one("#output", RichLog)
+            for line in self.profile.report():
+                output.write(Text(line, "bright_black"))
+
     def action_target(self) -> None:
         """Set the target."""
 
@@ -113,13 +208,30 @@ class AmericanBunnyHop(App):
             if path == "\n":
                 return
 
-            target = self.dbg.CreateTarget(path)
+            if self.engine is None:
+                self.error("debugger is still starting up!")
+                return
+
+            target = self.engine.dbg.CreateTarget(path)
             if not target:
                 self.error("couldn't find executable with that name!")
                 return
 
             self.target = target
             self.filename = target.GetExecutable().GetFilename()
+            self.query_one(RegisterSets).reset()
+            self.scan = None
+            self.pointers = None
+            if self.coverage is not None:
+                self.engine.cover(None)
+                self.coverage = None
+                self.query_one(AsmView).heat = None
+            self.symbols.attach(target)
+            self.breakpoints.attach(target)
+            self.xrefs.attach(target)
+            # warm the index (or its on-disk cache) before anyone asks for it
+            self.run_worker(self.symbols.main, thread=True, exclusive=True, group="symbols")
+            self.run_worker(self.analyse, thread=True, exclusive=True, group="xrefs")
 
         self.push_screen(TargetPrompt(), set_target)
 
@@ -130,51 +242,173 @@ class AmericanBunnyHop(App):
             self.error("no target set!")
             return
 
-        symbols = []
-        for module in self.target.module_iter():
-            if self.filename not in str(module):
-                continue
-            for symbol in module:
-                if "mangled" in str(symbol):
-                    continue
-                symbols.append(str(symbol))
+        self.push_screen(SymbolNotif(self.symbols))
 
-        self.push_screen(SymbolNotif(symbols))
+    def analyse(self) -> None:
+        """Build the xref index; runs on a worker, a batch of functions at a time."""
+        worker = get_current_worker()
+        self.xrefs.build(cancelled=lambda: worker.is_cancelled)
 
-    def action_breakpoint(self) -> None:
-        """Set a breakpoint."""
+    def action_xrefs(self) -> None:
+        """Callers and callees of a function; enter sets a breakpoint on one."""
 
-        breakpoints = list(self.target.breakpoint_iter())
-        breakpoint_names = [
-            str(breakpoint).split(", ")[1].split(" = ")[1][1:-1]
-            for breakpoint in breakpoints
-        ]
+        if not self.target:
+            self.error("no target set!")
+            return
 
-        def set_breakpoint(path: str) -> None:
+        def set_breakpoint(address: str) -> None:
             # handle escape
-            if path == "\n":
+            if not address:
                 return
 
-            if not self.target:
-                self.error("no target set!")
+            try:
+                entry = self.breakpoints.create(f"0x{address}")
+            except ValueError as error:
+                self.error(str(error))
                 return
 
-            # check for duplicates
-            if path in breakpoint_names:
-                self.error("breakpoint already set!")
+            if entry.locations == 0:
+                self.warn("no locations found for breakpoint")
+
+        self.push_screen(XrefNotif(self.xrefs, self.symbols), set_breakpoint)
+
+    def action_coverage(self) -> None:
+        """Arm a one-shot breakpoint on every basic block, or clear the rest."""
+
+        if not self.target:
+            self.error("no target set!")
+            return
+        if self.engine is None:
+            self.error("debugger is still starting up!")
+            return
+        if self.process and self.process.GetState() == lldb.eStateRunning:
+            self.error("process is running!")
+            return
+
+        if self.coverage is not None and self.coverage.armed:
+            self.engine.cover(None)
+            return
+        if self.coverage is not None:
+            # another round over the same blocks
+            self.engine.cover(self.coverage)
+            return
+
+        target = self.target
+
+        def build() -> None:
+            worker = get_current_worker()
+            try:
+                coverage = Coverage.build(
+                    target, self.symbols, cancelled=lambda: worker.is_cancelled
+                )
+            except ValueError as error:
+                self.call_from_thread(self.error, str(error))
+                return
+            if not worker.is_cancelled:
+                self.call_from_thread(self.arm, coverage)
+
+        self.query_one("#output", RichLog).write(Text("finding basic blocks...", "magenta"))
+        self.run_worker(build, thread=True, exclusive=True, group="coverage")
+
+    def arm(self, coverage: Coverage) -> None:
+        self.coverage = coverage
+        self.query_one(AsmView).heat = coverage.heat
+        self.engine.cover(coverage)
+
+    def action_export_coverage(self) -> None:
+        """Write the blocks and their hit counts out as json."""
+        if self.coverage is None:
+            self.error("no coverage yet!")
+            return
+        try:
+            path = self.coverage.export()
+        except OSError as error:
+            self.error(f"couldn't write coverage: {error}")
+            return
+        self.query_one("#output", RichLog).write(Text(f"coverage written to {path}", "magenta"))
+
+    def action_strings(self) -> None:
+        """Search the strings in the process's memory."""
+
+        if self.snapshot is None or not self.snapshot.stopped:
+            self.error("process not stopped!")
+            return
+
+        def examine(address: str) -> None:
+            # handle escape
+            if address:
+                self.examine(int(address, 16))
+
+        self.push_screen(StringNotif(self.strings, self.snapshot.process), examine)
+
+    def action_scan(self) -> None:
+        """Search writable memory for a value, narrowing over later stops."""
+
+        if self.snapshot is None or not self.snapshot.stopped:
+            self.error("process not stopped!")
+            return
+
+        def examine(address: str) -> None:
+            # handle escape
+            if address:
+                self.examine(int(address, 16))
+
+        def keep(scan: ValueScan) -> None:
+            self.scan = scan
+
+        self.push_screen(ScanNotif(self.snapshot.process, self.scan, keep), examine)
+
+    def action_pointers(self) -> None:
+        """Find what points at an address, and pointer chains to it."""
+
+        if self.snapshot is None or not self.snapshot.stopped:
+            self.error("process not stopped!")
+            return
+
+        def examine(address: str) -> None:
+            # handle escape
+            if address:
+                self.examine(int(address, 16))
+
+        def keep(pointers: PointerMap) -> None:
+            self.pointers = pointers
+
+        context = self.query_one(Inspector).context
+        self.push_screen(
+            PointerNotif(
+                self.snapshot.process,
+                self.pointers,
+                keep,
+                lambda text: parse_expression(text).evaluate(context),
+                statics(self.target),
+            ),
+            examine,
+        )
+
+    def action_breakpoint(self) -> None:
+        """Set, toggle or delete breakpoints."""
+
+        if not self.target:
+            self.error("no target set!")
+            return
+
+        def set_breakpoint(text: str) -> None:
+            # handle escape
+            if text == "\n" or not text.strip():
                 return
 
-            breakpoint = self.target.BreakpointCreateByName(path, self.filename)
-            if not breakpoint:
-                self.error("couldn't set breakpoint!")
+            try:
+                entry = self.breakpoints.create(text)
+            except ValueError as error:
+                self.error(str(error))
                 return
 
             # warn if 0 locations
-            if breakpoint.GetNumLocations() == 0:
+            if entry.locations == 0:
                 self.warn("no locations found for breakpoint")
                 return
 
-        self.push_screen(BreakpointPrompt(breakpoints), set_breakpoint)
+        self.push_screen(BreakpointPrompt(self.breakpoints), set_breakpoint)
 
     def action_run(self) -> None:
         """Run the target."""
@@ -183,14 +417,7 @@ class AmericanBunnyHop(App):
             self.error("no target set!")
             return
 
-        process = self.target.LaunchSimple(None, None, os.getcwd())
-        if not process:
-            self.error("couldn't launch process!")
-            return
-
-        self.process = process
-        self.thread = process.GetSelectedThread()
-        self.disas()
+        self.engine.launch(self.target)
 
     def action_continue(self) -> None:
         """Continue stepping until the next breakpoint."""
@@ -199,12 +426,16 @@ class AmericanBunnyHop(App):
             self.error("no process running!")
             return
 
-        process = self.process.Continue()
-        if not process:
-            self.error("couldn't continue process!")
+        self.engine.resume()
+
+    def action_interrupt(self) -> None:
+        """Stop a running process wherever it is."""
+
+        if not self.process:
+            self.error("no process running!")
             return
 
-        self.disas()
+        self.engine.interrupt()
 
     def action_step(self) -> None:
         """Step one instruction, stepping into function calls."""
@@ -220,15 +451,41 @@ class AmericanBunnyHop(App):
         if not self.process:
             self.error("no process running!")
             return
-        if not self.process.GetState() == lldb.eStateStopped:
+        state = self.process.GetState()
+        if state in (lldb.eStateRunning, lldb.eStateStepping):
+            # a step is still in flight; drop this one rather than queue it
+            return
+        if state != lldb.eStateStopped:
             self.error("process not stopped!")
             return
         if not self.thread:
             self.error("no thread selected!")
             return
 
-        self.thread.StepInstruction(step_over)
-        self.disas()
+        self.engine.step(self.thread, step_over)
+
+    def action_batch(self) -> None:
+        """Step many times in one go; only the final state is drawn."""
+
+        if not self.process or self.snapshot is None:
+            self.error("no process running!")
+            return
+
+        def run_batch(text: str) -> None:
+            # handle escape
+            if text == "\n" or not text.strip():
+                return
+            if self.snapshot is None or not self.thread:
+                self.error("no thread selected!")
+                return
+            try:
+                batch = parse_batch(text, list(self.snapshot.registers), self.symbols.resolve)
+            except ValueError as error:
+                self.error(str(error))
+                return
+            self.engine.batch(self.thread, batch)
+
+        self.push_screen(BatchPrompt(), run_batch)
 
     def action_examine(self) -> None:
         self.query_one(Inspector).input_focus()
@@ -239,98 +496,211 @@ class AmericanBunnyHop(App):
             return
         self.query_one(Inspector).deref_toggle()
 
-    def action_clean_quit(self) -> None:
-        if self.process:
-            self.process.Destroy()
-        self.app.exit()
+    def action_regsets(self) -> None:
+        """Show or hide the non-general register sets."""
+        regsets = self.query_one(RegisterSets)
+        regsets.display = not regsets.display
+        if regsets.display:
+            regsets.focus()
+            regsets.load_visible()
+
+    def action_memory(self) -> None:
+        """Show or hide the memory dump."""
+        hexview = self.query_one(HexView)
+        hexview.display = not hexview.display
+        if hexview.display:
+            hexview.focus()
+            if self.snapshot is not None:
+                hexview.load_regions(self.snapshot.process)
+                if hexview.mapped is None:
+                    hexview.goto(self.snapshot.pc)
+
+    def action_spray(self) -> None:
+        """Show or hide the type spray over the examined window."""
+        spray = self.query_one(SprayView)
+        spray.display = not spray.display
+        if spray.display:
+            spray.focus()
+            if spray.cursor is None and self.snapshot is not None:
+                # nothing examined yet; start from the stack
+                rsp = self.snapshot.registers.get("rsp")
+                spray.goto(rsp.value if rsp is not None else self.snapshot.pc)
+            else:
+                spray.load()
+
+    def action_record(self) -> None:
+        """Start or stop recording a trace of every stop."""
+        if self.recording:
+            self.engine.trace(None)
+            self.recording = False
+            self.query_one("#output", RichLog).write(Text("trace stopped", "magenta"))
+            return
 
-    # manages assembly view and regs view
-    def disas(self) -> None:
-        # update regs and session info, too
-        self.regs()
-        self.update_session_info()
+        if not self.process:
+            self.error("no process running!")
+            return
 
-        if not self.mounted or not self.process or not self.thread:
+        directory = tempfile.mkdtemp(prefix="abh-trace-")
+        self.engine.trace(directory)
+        self.trace = Trace(directory)
+        self.recording = True
+        self.query_one("#output", RichLog).write(Text(f"tracing into {directory}", "magenta"))
+
+    def action_replay(self) -> None:
+        """Show or hide the trace replay."""
+        view = self.query_one(TraceView)
+        if view.display:
+            view.display = False
+            # back to the live registers
+            if self.snapshot is not None:
+                self.query_one(RegisterTable).update(self.snapshot)
             return
 
-        state = self.process.GetState()
-        richlog = self.query_one("#asm", RichLog)
-        if state == lldb.eStateExited:
-            richlog.clear()
-            richlog.write(" process exited!")
+        if self.trace is None:
+            self.error("no trace recorded!")
             return
-        if state != lldb.eStateStopped:
+        if view.trace is not self.trace:
+            view.open(self.trace, self.target)
+        else:
+            view.reload()
+        view.display = True
+        view.focus()
+
+    def action_profiler(self) -> None:
+        """Show or hide the latency overlay."""
+        self.query_one(ProfilerPanel).toggle()
+
+    def action_dump_profile(self) -> None:
+        """Write the recorded spans out as a chrome trace."""
+        try:
+            path = PROFILER.dump()
+        except OSError as error:
+            self.error(f"couldn't write profile: {error}")
             return
+        self.query_one("#output", RichLog).write(Text(f"profile written to {path}", "magenta"))
+
+    def on_trace_view_scrubbed(self, event: TraceView.Scrubbed) -> None:
+        self.query_one(RegisterTable).show(event.registers)
+
+    def on_inspector_examined(self, event: Inspector.Examined) -> None:
+        """Jump the memory dump to whatever the inspector just examined."""
+        self.examine(event.address)
+
+    def examine(self, address: int) -> None:
+        """Point the memory dump and the spray at `address`."""
+        spray = self.query_one(SprayView)
+        if spray.display:
+            spray.goto(address)
+        else:
+            spray.cursor = address
+        hexview = self.query_one(HexView)
+        if not hexview.goto(address):
+            return
+        hexview.display = True
 
-        frame: lldb.SBFrame = self.thread.GetSelectedFrame()
-        if not frame:
-            return
-
-        disas = frame.Disassemble()
-
-        # peel off extra characters
-        disas = self.regex.sub("", disas)
-
-        # prettify
-        asm = Syntax(disas, "ecl", line_numbers=True, background_color="#1e1e1e")
-
-        # write to the screen
-        richlog.clear()
-        richlog.write(asm)
-
-    def regs(self) -> None:
-        if (
-            not self.mounted
-            or not self.process
-            or self.process.GetState() != lldb.eStateStopped
-            or not self.thread
-        ):
-            return
-
-        frame: lldb.SBFrame = self.thread.GetSelectedFrame()
-        if not frame:
-            return
-        log64 = self.query_one("#regs64", RichLog)
-        log32 = self.query_one("#regs32", RichLog)
-        log16 = self.query_one("#regs16", RichLog)
-        log8 = self.query_one("#regs8", RichLog)
-        log64.clear()
-        log32.clear()
-        log16.clear()
-        log8.clear()
-
-        regs = frame.GetRegisters()
-        gprs = []
-        for reg in regs:
-            if "general purpose registers" in reg.name.lower():
-                gprs = reg
-                break
-        for reg in gprs:
-            if len(reg.value) == 4:
-                richlog = log8
-            elif len(reg.value) == 6:
-                richlog = log16
-            elif len(reg.value) == 10:
-                richlog = log32
-            elif len(reg.value) == 18:
-                richlog = log64
-            else:
-                richlog = log8
+    def action_clean_quit(self) -> None:
+        if self.engine is not None:
+            self.engine.shutdown()
+        self.app.exit()
 
-            if (
-                reg.name in self.previous_regs
-                and reg.value != self.previous_regs[reg.name]
-            ):
-                richlog.write(f"[magenta]%[/]{reg.name: <6}: [blue b r]{reg.value}[/]")
-            else:
-                richlog.write(f"[magenta]%[/]{reg.name: <6}: [blue]{reg.value}[/]")
-            self.previous_regs[reg.name] = reg.value
+    def on_engine_event(self, message: EngineEvent) -> None:
+        """React to the debugger engine; widgets only refresh on stops."""
+        event = message.event
+        if isinstance(event, (Stopped, Exited, Running)):
+            self.process = event.snapshot.process
+            self.thread = event.snapshot.thread
+            if not event.snapshot.stopped:
+                # the last stop is over; nothing may read the process till the next
+                self.snapshot = None
+            self.show(event.snapshot)
+        elif isinstance(event, Batched):
+            self.process = event.snapshot.process
+            self.thread = event.snapshot.thread
+            self.show(event.snapshot)
+            rate = event.steps / event.seconds if event.seconds else 0
+            self.query_one("#output", RichLog).write(
+                Text.assemble(
+                    (event.reason, "magenta"),
+                    f": {event.steps} steps in {event.seconds:.3f}s ({rate:,.0f} instructions/s)",
+                )
+            )
+        elif isinstance(event, Covered):
+            # a repaint of the lines on screen, never a whole new render
+            asm = self.query_one(AsmView)
+            asm.border_subtitle = (
+                f"coverage {event.covered}/{event.blocks} blocks, {event.armed} armed"
+            )
+            asm.refresh()
+        elif isinstance(event, Output):
+            self.query_one("#output", RichLog).write(event.text.rstrip("\n"))
+        elif isinstance(event, Failed):
+            self.error(event.message)
+
+    def show(self, snapshot: StopSnapshot) -> None:
+        """Queue a snapshot for rendering, coalescing bursts of stops."""
+        pending = self.pending is not None
+        self.pending = snapshot
+        if not pending:
+            # only the newest snapshot is drawn, once per screen refresh
+            self.call_after_refresh(self.render_pending)
+
+    def render_pending(self) -> None:
+        snapshot, self.pending = self.pending, None
+        if snapshot is None or not self.mounted:
+            return
+        with PROFILER.span("render stop", "render"):
+            self.render_snapshot(snapshot)
+
+    def render_snapshot(self, snapshot: StopSnapshot) -> None:
+        self.memory.attach(snapshot.process)
+        if snapshot.stopped:
+            with PROFILER.span("hex view", "render"):
+                self.query_one(HexView).new_stop(snapshot.process)
+            with PROFILER.span("spray view", "render"):
+                self.query_one(SprayView).new_stop(snapshot.process)
+        self.update_session_info(snapshot)
+        if snapshot.stopped:
+            self.regs(snapshot)
+        self.disas(snapshot)
+        if snapshot.stopped:
+            self.snapshot = snapshot
+        trace = self.query_one(TraceView)
+        if trace.display:
+            trace.reload()
+
+    # manages assembly view
+    def disas(self, snapshot: StopSnapshot) -> None:
+        asm = self.query_one(AsmView)
+        if snapshot.exited:
+            asm.show_message(" process exited!")
+            return
+        if not snapshot.stopped or not snapshot.frame:
+            return
+
+        target = snapshot.process.GetTarget()
+        listing = self.listings.listing(target, snapshot.frame)
+        # the code under the pc was rewritten since we decoded it
+        if listing and not self.listings.verify(self.memory.read, listing, snapshot.pc):
+            listing = self.listings.listing(target, snapshot.frame)
+        if listing is None:
+            asm.show_message(" no disassembly available here")
+            return
+
+        with PROFILER.span("asm view", "render"):
+            asm.show(listing, snapshot.pc)
+
+    def regs(self, snapshot: StopSnapshot) -> None:
+        with PROFILER.span("registers", "render"):
+            self.query_one(RegisterTable).update(snapshot)
+
+        with PROFILER.span("register sets", "render"):
+            self.query_one(RegisterSets).update(snapshot)
 
         # give inspector up-to-date regs
-        self.query_one(Inspector).update(self.process, self.previous_regs)
+        self.query_one(Inspector).update(snapshot)
 
-    def update_session_info(self) -> None:
-        self.query_one(SessionInfo).update(self.target, self.process, self.thread)
+    def update_session_info(self, snapshot: StopSnapshot) -> None:
+        self.query_one(SessionInfo).update(snapshot)
 
     def error(self, message: str) -> None:
         """Display an error message."""
@@ -342,4 +712,14 @@ class AmericanBunnyHop(App):
 
 
 if __name__ == "__main__":
-    AmericanBunnyHop().run()
+    parser = argparse.ArgumentParser(description="american bunny hop")
+    parser.add_argument(
+        "--startup-profile",
+        action="store_true",
+        help="report import, first paint and debugger startup timings",
+    )
+    args = parser.parse_args()
+    app = AmericanBunnyHop(startup_profile=args.startup_profile)
+    app.run()
+    if app.profile is not None:
+        print("\n".join(app.profile.report()), file=sys.stderr)
@@ -0,0 +1,89 @@
+"""
+colouring for disassembly.
+
+a small tokenizer for the operand syntax lldb prints on x86-64 (at&t) and
+arm64, emitting rich spans directly instead of running a pygments lexer over
+the whole listing.
+"""
+
+from rich.style import Style
+from rich.text import Text
+
+import re
+
+from disasm import Instruction
+
+ADDRESS = Style(color="blue")
+OFFSET = Style(color="bright_black")
+BYTES = Style(color="grey42")
+MNEMONIC = Style(color="magenta", bold=True)
+BRANCH = Style(color="deep_pink4", bold=True)
+REGISTER = Style(color="medium_violet_red")
+IMMEDIATE = Style(color="dark_violet")
+SYMBOL = Style(color="green")
+COMMENT = Style(color="bright_black", italic=True)
+
+# instruction bytes shown before the mnemonic; longer encodings are elided
+BYTES_SHOWN = 8
+
+X86_REGISTERS = (
+    r"[re]?(?:[abcd]x|[sd]i|[sb]p|ip)|[abcd][lh]|[sd]il|[sb]pl"
+    r"|r(?:[89]|1[0-5])[dwb]?|[xyz]mm(?:[0-9]|[12][0-9]|3[01])|k[0-7]"
+    r"|[cdefgs]s|st(?:\([0-7]\))?|[re]flags|cr[0-8]|dr[0-7]"
+)
+ARM64_REGISTERS = (
+    r"[xwbhsdqvz](?:[0-9]|[12][0-9]|3[01])(?:\.(?:16b|8b|8h|4h|4s|2s|2d|1d|b|h|s|d))?"
+    r"|w?sp|[xw]zr|fp|lr|pc|nzcv|p(?:[0-9]|1[0-5])"
+)
+
+OPERAND = re.compile(
+    rf"(?P<register>%?\b(?:{X86_REGISTERS}|{ARM64_REGISTERS})\b)"
+    r"|(?P<immediate>[$#]-?(?:0x[0-9a-f]+|\d+(?:\.\d+)?))"
+    r"|(?P<symbol><[^>]*>)"
+    r"|(?P<number>-?\b(?:0x[0-9a-f]+|\d+)\b)",
+    re.IGNORECASE,
+)
+STYLES = {
+    "register": REGISTER,
+    "immediate": IMMEDIATE,
+    "number": IMMEDIATE,
+    "symbol": SYMBOL,
+}
+
+BRANCHES = re.compile(
+    r"(?:call|jmp|j[a-z]{1,3}|ret|loop\w*|b|bl|blr|br|b\.\w+|cbn?z|tbn?z|retaa|retab)q?",
+    re.IGNORECASE,
+)
+
+
+def is_branch(mnemonic: str) -> bool:
+    return BRANCHES.fullmatch(mnemonic) is not None
+
+
+def operands(text: Text, source: str) -> None:
+    """Append `source` to `text`, styling registers, immediates and symbols."""
+    position = 0
+    for match in OPERAND.finditer(source):
+        start, end = match.span()
+        if start > position:
+            text.append(source[position:start])
+        text.append(match.group(), STYLES[match.lastgroup])
+        position = end
+    if position < len(source):
+        text.append(source[position:])
+
+
+def render(ins: Instruction, function_start: int) -> Text:
+    """Render one instruction as a single line of rich text."""
+    text = Text(end="", no_wrap=True)
+    text.append(f"0x{ins.address:x}", ADDRESS)
+    text.append(f" {f'<+{ins.address - function_start}>:':<9} ", OFFSET)
+    shown = ins.data[:BYTES_SHOWN].hex(" ")
+    if len(ins.data) > BYTES_SHOWN:
+        shown += "…"
+    text.append(f"{shown:<{BYTES_SHOWN * 3}} ", BYTES)
+    text.append(f"{ins.mnemonic:<8}", BRANCH if is_branch(ins.mnemonic) else MNEMONIC)
+    operands(text, ins.operands)
+    if ins.comment:
+        text.append(f" ; {ins.comment}", COMMENT)
+    return text
@@ -0,0 +1,167 @@
+from rich.segment import Segment
+from rich.style import Style
+from rich.text import Text
+from textual.geometry import Size
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from asmtok import render
+from disasm import Listing
+
+# rows decoded per lazy fetch when scrolling off either end of a window
+FETCH_ROWS = 128
+# rendered lines kept per (address, bytes), across listings
+RENDERED_LINES = 8192
+
+# coverage backgrounds by rounds a block was hit in: never, once, a few, many
+HEAT = (
+    Style(bgcolor="#3b2020"),
+    Style(bgcolor="#1e3a26"),
+    Style(bgcolor="#245c32"),
+    Style(bgcolor="#2f7d40"),
+)
+
+
+def heat_style(count: int) -> Style:
+    return HEAT[min(count.bit_length(), len(HEAT) - 1)]
+
+
+class AsmView(ScrollView):
+    """Disassembly of the current function, drawn a line at a time.
+
+    Lines are rendered once per listing and kept on the listing itself; moving
+    the pc inside the same function only repaints the two affected lines. For
+    windowed listings, scrolling near either edge decodes more rows. With
+    `heat` set, lines inside coverage blocks get a background by hit count,
+    applied as they're drawn, so new hits only need a repaint.
+    """
+
+    highlight = Style(bgcolor="#44475a", bold=True)
+
+    listing: Optional[Listing] = None
+    version: int = -1
+    pc_row: Optional[int] = None
+    message: Text = Text("", end="")
+    # load address -> rounds its block was hit in, None outside blocks
+    heat: Optional[Callable[[int], Optional[int]]] = None
+
+    def __init__(self, *, id: Optional[str] = None, classes: Optional[str] = None) -> None:
+        super().__init__(id=id, classes=classes)
+        self.rendered: "OrderedDict[Tuple[int, bytes], Strip]" = OrderedDict()
+
+    def show(self, listing: Listing, pc: int) -> None:
+        """Point the view at `pc`, switching listings only when needed."""
+        previous = self.pc_row
+        self.pc_row = listing.row(pc)
+
+        if listing is not self.listing or listing.version != self.version:
+            self.listing = listing
+            self.border_title = listing.name
+            self.relayout()
+            if self.pc_row is not None:
+                # the new virtual size only applies once laid out
+                self.call_after_refresh(self.follow, self.pc_row)
+            return
+
+        if previous is not None:
+            self.refresh_line(previous)
+        if self.pc_row is not None:
+            self.refresh_line(self.pc_row)
+            self.follow(self.pc_row)
+
+    def show_message(self, message: str) -> None:
+        self.listing = None
+        self.pc_row = None
+        self.border_title = ""
+        self.message = Text(message, end="")
+        self.virtual_size = Size(self.message.cell_len, 1)
+        self.refresh()
+
+    def relayout(self) -> None:
+        listing = self.listing
+        if listing is None:
+            return
+        self.prerender(listing)
+        self.version = listing.version
+        width = max((strip.cell_length for strip in listing.lines), default=0)
+        self.virtual_size = Size(width, len(listing))
+        self.refresh()
+
+    def follow(self, row: int) -> None:
+        """Scroll only once the pc leaves the middle of the view."""
+        top = self.scroll_offset.y
+        height = self.size.height
+        margin = min(3, height // 4)
+        if top + margin <= row < top + height - margin:
+            return
+        self.scroll_to(y=max(0, row - height // 3), animate=False)
+
+    def watch_scroll_y(self, old_value: float, new_value: float) -> None:
+        super().watch_scroll_y(old_value, new_value)
+        listing = self.listing
+        if listing is None:
+            return
+
+        row = round(new_value)
+        height = self.size.height
+        if row + 2 * height >= len(listing) and listing.extend_forward(FETCH_ROWS):
+            self.relayout()
+        if row < height:
+            added = listing.extend_backward(FETCH_ROWS)
+            if added:
+                # keep the same instructions on screen as rows land above them
+                if self.pc_row is not None:
+                    self.pc_row += added
+                self.relayout()
+                self.scroll_to(y=row + added, animate=False)
+
+    def prerender(self, listing: Listing) -> None:
+        """Render every row that doesn't have a line yet."""
+        console = self.app.console
+        base = self.rich_style
+        for row, line in enumerate(listing.lines):
+            if line is not None:
+                continue
+            ins = listing.instructions[row]
+            key = (ins.address, ins.data)
+            strip = self.rendered.get(key)
+            if strip is None:
+                text = render(ins, listing.start)
+                strip = Strip(text.render(console), text.cell_len).apply_style(base)
+                self.rendered[key] = strip
+                if len(self.rendered) > RENDERED_LINES:
+                    self.rendered.popitem(last=False)
+            listing.lines[row] = strip
+
+    def render_line(self, y: int) -> Strip:
+        scroll_x, scroll_y = self.scroll_offset
+        row = scroll_y + y
+        width = self.size.width
+        style = self.rich_style
+
+        if self.listing is None:
+            if row != 0:
+                return Strip.blank(width, style)
+            strip = Strip(self.message.render(self.app.console), self.message.cell_len)
+            return strip.crop_extend(scroll_x, scroll_x + width, style)
+
+        if row >= len(self.listing):
+            return Strip.blank(width, style)
+
+        strip = self.listing.lines[row]
+        if strip is None:
+            return Strip.blank(width, style)
+        if row == self.pc_row:
+            extended = strip.extend_cell_length(scroll_x + width)
+            return extended.apply_style(self.highlight).crop(scroll_x, scroll_x + width)
+        if self.heat is not None:
+            count = self.heat(self.listing.instructions[row].address)
+            if count is not None:
+                extended = strip.extend_cell_length(scroll_x + width, style)
+                # over the line's own background, which would otherwise win
+                heated = Segment.apply_style(extended, post_style=heat_style(count))
+                return Strip(heated, extended.cell_length).crop(scroll_x, scroll_x + width)
+        return strip.crop_extend(scroll_x, scroll_x + width, style)
@@ -0,0 +1,227 @@
+"""
+benchmarks over the binaries in test/.
+
+measures, per binary:
+
+    target_create   SBDebugger.CreateTarget
+    symbols_cold    reading the symbol index with an empty cache
+    symbols_warm    reading it back from the on-disk cache
+    symbols_screen  `s` until the symbols screen shows its first rows
+    breakpoint_set  breaking on main through the registry
+    launch_to_main  `r` until the stop at main is drawn
+    step            `i` until the next stop is drawn (step + disas + regs)
+    type_spray      the inspector's type spray, with and without dereferencing
+
+the ui numbers come from driving the real app headlessly through textual's
+pilot, so they include a little of the pilot's own overhead.
+
+Run with:
+
+    python src/bench.py                       # writes bench.json
+    python src/bench.py --save-baseline baseline.json
+    python src/bench.py --baseline baseline.json --threshold 0.2
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import lldb
+
+from abh import AmericanBunnyHop
+from breakpoints import BreakpointRegistry
+from inspector import Inspector
+from symbols import SymbolIndex
+from virtuallist import VirtualList
+
+BINARIES = ["test/hello", "test/mario", "test/rust_hello"]
+# seconds to wait for the app to get somewhere before giving up on a binary
+TIMEOUT = 30.0
+
+Samples = Dict[str, List[float]]
+
+
+def timed(samples: Samples, name: str, work: Callable[[], object]) -> object:
+    start = time.perf_counter()
+    result = work()
+    samples[name].append(time.perf_counter() - start)
+    return result
+
+
+def bench_core(path: str, repeat: int, samples: Samples) -> None:
+    """Operations on the shared core, without any ui."""
+    dbg = lldb.SBDebugger.Create()
+    try:
+        for _ in range(repeat):
+            target = timed(samples, "target_create", lambda: dbg.CreateTarget(path))
+            with tempfile.TemporaryDirectory() as directory:
+                index = SymbolIndex(directory)
+                index.attach(target)
+                timed(samples, "symbols_cold", index.main)
+                index = SymbolIndex(directory)
+                index.attach(target)
+                timed(samples, "symbols_warm", index.main)
+
+                registry = BreakpointRegistry(index)
+                registry.attach(target)
+                timed(samples, "breakpoint_set", lambda: registry.create("main"))
+            dbg.DeleteTarget(target)
+    finally:
+        lldb.SBDebugger.Destroy(dbg)
+
+
+async def until(pilot, condition: Callable[[], bool], timeout: float = TIMEOUT) -> None:
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("timed out waiting for the app")
+        await pilot.pause(0.0005)
+
+
+async def bench_app(path: str, steps: int, samples: Samples) -> None:
+    """Operations through the app, driven by the pilot."""
+    app = AmericanBunnyHop()
+    async with app.run_test(size=(200, 60)) as pilot:
+        await until(pilot, lambda: app.engine is not None)
+        target = app.engine.dbg.CreateTarget(path)
+        app.target = target
+        app.filename = target.GetExecutable().GetFilename()
+        app.symbols.attach(target)
+        app.breakpoints.attach(target)
+        app.breakpoints.create("main")
+
+        start = time.perf_counter()
+        await pilot.press("s")
+        await until(pilot, lambda: bool(app.screen.query(VirtualList)))
+        symbols = app.screen.query_one(VirtualList)
+        await until(pilot, lambda: bool(symbols.items))
+        await pilot.pause()
+        samples["symbols_screen"].append(time.perf_counter() - start)
+        await pilot.press("escape")
+
+        start = time.perf_counter()
+        app.action_run()
+        await until(pilot, lambda: app.snapshot is not None)
+        samples["launch_to_main"].append(time.perf_counter() - start)
+
+        for _ in range(steps):
+            if app.snapshot is None or not app.snapshot.stopped:
+                break
+            stop_id = app.snapshot.stop_id
+            start = time.perf_counter()
+            app.action_step()
+            await until(
+                pilot,
+                lambda: app.snapshot is not None
+                and app.snapshot.stop_id != stop_id
+                and app.pending is None,
+            )
+            await pilot.pause()
+            samples["step"].append(time.perf_counter() - start)
+
+        if app.snapshot is not None and "rsp" in app.snapshot.registers:
+            inspector = app.query_one(Inspector)
+            address = f"{app.snapshot.registers['rsp'].value:016x}"
+            for dereferencing in (False, True):
+                for _ in range(steps):
+                    timed(
+                        samples,
+                        "type_spray",
+                        lambda: inspector.type_spray(address, dereferencing),
+                    )
+
+        await pilot.press("q")
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "median": statistics.median(ordered),
+        "mean": statistics.fmean(ordered),
+        "min": ordered[0],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "count": len(ordered),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """Metrics whose median got slower than the baseline by more than `threshold`."""
+    regressions = []
+    for binary, metrics in results["results"].items():
+        for metric, summary in metrics.items():
+            before = baseline.get("results", {}).get(binary, {}).get(metric)
+            if not before or not before["median"]:
+                continue
+            ratio = summary["median"] / before["median"]
+            if ratio > 1 + threshold:
+                regressions.append(
+                    f"{binary} {metric}: {before['median'] * 1000:.3f} ms -> "
+                    f"{summary['median'] * 1000:.3f} ms ({ratio:.2f}x)"
+                )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="benchmark abh against test/")
+    parser.add_argument("binaries", nargs="*", default=BINARIES)
+    parser.add_argument("--repeat", type=int, default=5, help="runs of the core benchmarks")
+    parser.add_argument("--runs", type=int, default=2, help="runs of the app benchmarks")
+    parser.add_argument("--steps", type=int, default=50, help="steps timed per app run")
+    parser.add_argument("--output", default="bench.json")
+    parser.add_argument("--baseline", help="results to compare against")
+    parser.add_argument("--save-baseline", help="also write the results here")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown")
+    args = parser.parse_args(argv)
+
+    results: dict = {
+        "meta": {
+            "time": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "lldb": lldb.SBDebugger.GetVersionString(),
+        },
+        "results": {},
+    }
+    for path in args.binaries:
+        samples: Samples = defaultdict(list)
+        bench_core(path, args.repeat, samples)
+        for _ in range(args.runs):
+            asyncio.run(bench_app(path, args.steps, samples))
+        results["results"][path] = {
+            metric: summarize(values) for metric, values in samples.items() if values
+        }
+
+    for path, metrics in results["results"].items():
+        print(path)
+        for metric, summary in metrics.items():
+            print(
+                f"  {metric:<16} median {summary['median'] * 1000:9.3f} ms"
+                f"  p95 {summary['p95'] * 1000:9.3f} ms  n={summary['count']}"
+            )
+
+    for output in filter(None, (args.output, args.save_baseline)):
+        with open(output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
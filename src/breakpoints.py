@@ -0,0 +1,250 @@
+"""
+breakpoint registry.
+
+breakpoints are described by what they were created from (a name, an address,
+or a regex over the symbol index) plus their modifiers, instead of by parsing
+`str(SBBreakpoint)`. conditions are handed to lldb's own `SetCondition`, so a
+conditional breakpoint is checked inside lldb and never calls back into python.
+
+the prompt accepts:
+
+    main                      break on a function by name
+    *0x401136 / 0x401136      break on an address
+    /^print_/                 break on every symbol matching a regex
+    ... once                  delete the breakpoint after its first hit
+    ... after 3               ignore the first three hits
+    ... if $rdi == 0          only stop when the lldb expression holds
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import lldb
+import re
+
+from symbols import SymbolIndex
+
+# breakpoints abh sets for itself carry this name and stay out of listings
+INTERNAL = "abh-internal"
+
+
+class BreakpointSpec(NamedTuple):
+    """What the user asked for, parsed from the prompt."""
+
+    kind: str
+    location: str
+    condition: str = ""
+    one_shot: bool = False
+    ignore_count: int = 0
+
+
+class BreakpointEntry(NamedTuple):
+    """One breakpoint as the prompt shows it."""
+
+    id: int
+    kind: str
+    location: str
+    name: str
+    condition: str
+    one_shot: bool
+    ignore_count: int
+    enabled: bool
+    locations: int
+    hits: int
+
+
+def parse(text: str) -> BreakpointSpec:
+    """Parse a prompt line; raises ValueError with a message for the user."""
+    text, _, condition = text.strip().partition(" if ")
+    words = text.split()
+    one_shot = False
+    ignore_count = 0
+    # modifiers come last, so names with spaces in them survive
+    while words:
+        if words[-1] == "once":
+            one_shot = True
+            words.pop()
+        elif len(words) >= 2 and words[-2] == "after":
+            try:
+                ignore_count = int(words[-1], 0)
+            except ValueError:
+                raise ValueError(f"bad hit count: {words[-1]}")
+            del words[-2:]
+        else:
+            break
+
+    location = " ".join(words)
+    if not location:
+        raise ValueError("no breakpoint location given!")
+
+    if len(location) > 2 and location.startswith("/") and location.endswith("/"):
+        try:
+            re.compile(location[1:-1])
+        except re.error as error:
+            raise ValueError(f"bad regex: {error}")
+        return BreakpointSpec("regex", location[1:-1], condition.strip(), one_shot, ignore_count)
+
+    address = location.lstrip("*")
+    if location.startswith("*") or re.fullmatch(r"0x[0-9a-fA-F]+", address):
+        try:
+            value = int(address, 0)
+        except ValueError:
+            raise ValueError(f"bad address: {address}")
+        return BreakpointSpec("address", f"0x{value:x}", condition.strip(), one_shot, ignore_count)
+
+    return BreakpointSpec("name", location, condition.strip(), one_shot, ignore_count)
+
+
+class BreakpointRegistry:
+    """Every breakpoint in the target, keyed by id and by what it breaks on."""
+
+    def __init__(self, symbols: SymbolIndex) -> None:
+        self.symbols = symbols
+        self.target: Optional[lldb.SBTarget] = None
+        self.specs: Dict[int, BreakpointSpec] = {}
+        # called with (address, size) for every location added or removed
+        self.listeners: List[Callable[[int, int], None]] = []
+
+    def attach(self, target: lldb.SBTarget) -> None:
+        self.target = target
+        self.specs = {}
+
+    def find(self, kind: str, location: str) -> Optional[int]:
+        for id, spec in self.specs.items():
+            if (spec.kind, spec.location) == (kind, location):
+                return id
+        return None
+
+    def create(self, text: str) -> BreakpointEntry:
+        """Create a breakpoint from a prompt line."""
+        spec = parse(text)
+        self.sync()
+        if self.find(spec.kind, spec.location) is not None:
+            raise ValueError("breakpoint already set!")
+
+        if spec.kind == "address":
+            breakpoint = self.target.BreakpointCreateByAddress(int(spec.location, 16))
+        elif spec.kind == "regex":
+            names = self.matching(spec.location)
+            if not names:
+                raise ValueError("no symbols match that regex!")
+            breakpoint = self.target.BreakpointCreateByNames(
+                names,
+                lldb.eFunctionNameTypeAuto,
+                lldb.SBFileSpecList(),
+                lldb.SBFileSpecList(),
+            )
+        else:
+            module = self.target.GetExecutable().GetFilename()
+            breakpoint = self.target.BreakpointCreateByName(spec.location, module)
+        if not breakpoint:
+            raise ValueError("couldn't set breakpoint!")
+
+        if spec.condition:
+            breakpoint.SetCondition(spec.condition)
+        if spec.one_shot:
+            breakpoint.SetOneShot(True)
+        if spec.ignore_count:
+            breakpoint.SetIgnoreCount(spec.ignore_count)
+
+        self.specs[breakpoint.GetID()] = spec
+        self.notify(breakpoint)
+        return self.entry(breakpoint)
+
+    def matching(self, pattern: str) -> List[str]:
+        """Names of the code symbols in the index that match `pattern`."""
+        regex = re.compile(pattern)
+        names = []
+        for symbols in self.symbols.loaded(False):
+            for record in symbols.by_address:
+                if record.type != "code":
+                    continue
+                if regex.search(record.demangled) or regex.search(record.name):
+                    names.append(record.name)
+        return sorted(set(names))
+
+    def toggle(self, id: int) -> Optional[BreakpointEntry]:
+        breakpoint = self.target.FindBreakpointByID(id)
+        if not breakpoint:
+            return None
+        breakpoint.SetEnabled(not breakpoint.IsEnabled())
+        self.notify(breakpoint)
+        return self.entry(breakpoint)
+
+    def delete(self, id: int) -> bool:
+        breakpoint = self.target.FindBreakpointByID(id)
+        if not breakpoint:
+            return False
+        self.notify(breakpoint)
+        self.specs.pop(id, None)
+        return self.target.BreakpointDelete(id)
+
+    def sync(self) -> None:
+        """Forget breakpoints lldb deleted on its own, like one-shots that fired."""
+        if not self.target:
+            self.specs = {}
+            return
+        alive = {breakpoint.GetID() for breakpoint in self.target.breakpoint_iter()}
+        self.specs = {id: spec for id, spec in self.specs.items() if id in alive}
+
+    def entries(self) -> List[BreakpointEntry]:
+        self.sync()
+        if not self.target:
+            return []
+        return [
+            self.entry(breakpoint)
+            for breakpoint in self.target.breakpoint_iter()
+            if not breakpoint.MatchesName(INTERNAL)
+        ]
+
+    def entry(self, breakpoint: lldb.SBBreakpoint) -> BreakpointEntry:
+        id = breakpoint.GetID()
+        spec = self.specs.get(id, BreakpointSpec("other", ""))
+        if spec.kind == "regex":
+            name = f"/{spec.location}/"
+        else:
+            name = self.location_name(breakpoint) or spec.location
+        return BreakpointEntry(
+            id=id,
+            kind=spec.kind,
+            location=spec.location,
+            name=name,
+            condition=breakpoint.GetCondition() or "",
+            one_shot=breakpoint.IsOneShot(),
+            ignore_count=breakpoint.GetIgnoreCount(),
+            enabled=breakpoint.IsEnabled(),
+            locations=breakpoint.GetNumLocations(),
+            hits=breakpoint.GetHitCount(),
+        )
+
+    def location_name(self, breakpoint: lldb.SBBreakpoint) -> str:
+        """Symbol of the first resolved location, with an offset if inside it."""
+        for location in breakpoint:
+            address = location.GetAddress()
+            symbol = address.GetSymbol()
+            if not symbol:
+                continue
+            offset = address.GetFileAddress() - symbol.GetStartAddress().GetFileAddress()
+            return symbol.GetName() + (f"+{offset}" if offset else "")
+        return ""
+
+    def notify(self, breakpoint: lldb.SBBreakpoint) -> None:
+        # lldb patches traps into the code; don't trust old listings there
+        for location in breakpoint:
+            for listener in self.listeners:
+                listener(location.GetLoadAddress(), 1)
+
+
+def modifiers(entry: BreakpointEntry) -> List[str]:
+    """What an entry was set up with beyond its location, for display."""
+    flags = []
+    if not entry.enabled:
+        flags.append("disabled")
+    if entry.one_shot:
+        flags.append("once")
+    if entry.ignore_count:
+        flags.append(f"after {entry.ignore_count}")
+    if entry.condition:
+        flags.append(f"if {entry.condition}")
+    return flags
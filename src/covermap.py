@@ -0,0 +1,193 @@
+"""
+basic block coverage with one-shot breakpoints.
+
+every code symbol of the main module is split into basic blocks: a block
+starts at the function's entry, at every jump target inside it, and right
+after every jump or return. each block gets a one-shot breakpoint, which
+lldb deletes on its first hit, so the cost of a block falls to nothing once
+it has run. the engine resumes from coverage stops itself and only reports a
+summary now and then, so the ui never redraws per hit.
+
+arming again after a run adds another round; a block's count is the number
+of rounds it was hit in, which is what the heatmap shows:
+
+    coverage = Coverage.build(target, symbols)
+    engine.cover(coverage)              # arm, a batch of breakpoints at a time
+    ...                                 # run
+    engine.cover(None)                  # clear whatever wasn't hit
+    coverage.heat(pc)                   # rounds the block around pc was hit in
+    coverage.export()
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import Callable, Dict, Iterator, List, Optional
+
+import bisect
+import json
+import lldb
+import re
+import time
+
+from breakpoints import INTERNAL
+from symbols import SymbolIndex, SymbolRecord, module_key
+from xrefs import JUMPS, instructions, module_slide, targets
+
+# breakpoints set or deleted per engine command; the rest queue behind others
+BATCH = 256
+# what ends a block besides a jump
+RETURNS = re.compile(r"(?:ret[a-z]*|br|ud2|hlt)q?", re.IGNORECASE)
+
+
+def leaders(
+    target: lldb.SBTarget, module: lldb.SBModule, record: SymbolRecord, slide: int
+) -> List[int]:
+    """File addresses where the basic blocks of one function start."""
+    starts = {record.start}
+    for start, size, mnemonic, operands in instructions(target, module, record):
+        if JUMPS.fullmatch(mnemonic):
+            for _, to in targets(start, size, mnemonic, operands):
+                if record.start <= to - slide < record.end:
+                    starts.add(to - slide)
+        elif not RETURNS.fullmatch(mnemonic):
+            continue
+        starts.add(start + size)
+    return sorted(start for start in starts if start < record.end)
+
+
+class Coverage:
+    """Blocks of the main module, sorted by file address, and their hits."""
+
+    def __init__(
+        self,
+        target: lldb.SBTarget,
+        key: str,
+        starts: array,
+        ends: array,
+        functions: List[str],
+    ) -> None:
+        self.target = target
+        self.key = key
+        self.starts = starts
+        self.ends = ends
+        # the function of each block, by name
+        self.functions = functions
+        # rounds each block was hit in
+        self.hits = array("L", [0]) * len(starts)
+        self.rounds = 0
+        # breakpoint id -> block index, for breakpoints not hit yet
+        self.armed: Dict[int, int] = {}
+        # blocks hit since the engine last reported
+        self.fresh = 0
+        # load address - file address, once the process has loaded the module
+        self.slide = 0
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @classmethod
+    def build(
+        cls,
+        target: lldb.SBTarget,
+        symbols: SymbolIndex,
+        cancelled: Callable[[], bool] = lambda: False,
+    ) -> Coverage:
+        """Disassemble every function of the main module into blocks."""
+        main = symbols.main()
+        if main is None or target.GetNumModules() == 0:
+            raise ValueError("no symbols in the target!")
+        module = target.GetModuleAtIndex(0)
+        slide = module_slide(target, module)
+        starts = array("Q")
+        ends = array("Q")
+        functions: List[str] = []
+        for record in main.by_address:
+            if record.type != "code" or record.end <= record.start:
+                continue
+            if cancelled():
+                break
+            blocks = leaders(target, module, record, slide)
+            starts.extend(blocks)
+            ends.extend(blocks[1:] + [record.end])
+            functions.extend([record.demangled] * len(blocks))
+        return cls(target, module_key(module), starts, ends, functions)
+
+    def relocate(self) -> None:
+        """Pick up where the module is loaded now."""
+        self.slide = module_slide(self.target, self.target.GetModuleAtIndex(0))
+
+    def arm(self) -> Iterator[int]:
+        """Set a one-shot breakpoint on every block; yields after each batch."""
+        module = self.target.GetModuleAtIndex(0)
+        self.rounds += 1
+        for first in range(0, len(self), BATCH):
+            for index in range(first, min(first + BATCH, len(self))):
+                address = module.ResolveFileAddress(self.starts[index])
+                breakpoint = self.target.BreakpointCreateBySBAddress(address)
+                if not breakpoint:
+                    continue
+                breakpoint.SetOneShot(True)
+                breakpoint.AddName(INTERNAL)
+                self.armed[breakpoint.GetID()] = index
+            yield len(self.armed)
+
+    def disarm(self) -> Iterator[int]:
+        """Delete the breakpoints that weren't hit; yields after each batch."""
+        ids = list(self.armed)
+        for first in range(0, len(ids), BATCH):
+            for id in ids[first : first + BATCH]:
+                self.target.BreakpointDelete(id)
+                self.armed.pop(id, None)
+            yield len(self.armed)
+
+    def hit(self, breakpoint_id: int) -> bool:
+        """Count a hit on one of our breakpoints; False if it isn't one."""
+        index = self.armed.pop(breakpoint_id, None)
+        if index is None:
+            return False
+        self.hits[index] += 1
+        self.fresh += 1
+        return True
+
+    def covered(self) -> int:
+        """Blocks hit in at least one round."""
+        return len(self) - self.hits.count(0)
+
+    def block(self, address: int) -> Optional[int]:
+        """Index of the block covering a file address."""
+        index = bisect.bisect_right(self.starts, address) - 1
+        if index < 0 or address >= self.ends[index]:
+            return None
+        return index
+
+    def heat(self, address: int) -> Optional[int]:
+        """Rounds the block around a load address was hit in; None outside blocks."""
+        index = self.block(address - self.slide)
+        return None if index is None else self.hits[index]
+
+    def export(self, path: Optional[str] = None) -> str:
+        """Write every block and its hits as json; returns the path."""
+        path = path or f"abh-coverage-{int(time.time())}.json"
+        module = self.target.GetModuleAtIndex(0)
+        blocks = [
+            {
+                "address": self.starts[index],
+                "size": self.ends[index] - self.starts[index],
+                "function": self.functions[index],
+                "hits": self.hits[index],
+            }
+            for index in range(len(self))
+        ]
+        with open(path, "w") as file:
+            json.dump(
+                {
+                    "module": module.GetFileSpec().GetFilename() or "",
+                    "uuid": self.key,
+                    "rounds": self.rounds,
+                    "covered": self.covered(),
+                    "blocks": blocks,
+                },
+                file,
+            )
+        return path
@@ -90,19 +90,23 @@ def cmd_xt(debugger, command, result, _dict):
     addr = int(thread.GetFrameAtIndex(0).EvaluateExpression(args[0]).GetValue(), 10)
     error = lldb.SBError()
 
-    ended = False
-    s = ""
-    offset = 0
-
-    while not ended:
-        mem = target.GetProcess().ReadMemory(addr + offset, 100, error)
-        for i in range(0, 100, 2):
-            wc = mem[i + 1] << 8 | mem[i]
-            s += chr(wc)
-            if wc == 0:
-                ended = True
+    data = bytearray()
+    end = -1
+    size = 4096
+    while end < 0:
+        mem = target.GetProcess().ReadMemory(addr + len(data), size, error)
+        if not error.Success() or not mem:
+            # the page after may be unmapped; the rest of this one may not be
+            rest = 4096 - (addr + len(data)) % 4096
+            if size == rest:
                 break
-
-        offset += 100
-
-    print(s)
+            size = rest
+            continue
+        data += mem
+        size = 4096
+        # the terminator is a whole nul character, not any two nul bytes
+        end = data.find(b"\0\0")
+        while end >= 0 and end % 2:
+            end = data.find(b"\0\0", end + 1)
+
+    print(data[: end if end >= 0 else len(data) - len(data) % 2].decode("utf-16-le", errors="replace"))
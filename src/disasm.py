@@ -0,0 +1,293 @@
+"""
+decoded disassembly, cached per function.
+
+listings are keyed by module uuid plus the address range of the enclosing
+function (or symbol, when there's no debug info), so stepping around inside
+one function never decodes it twice. functions too big to decode in one go
+are held as a window around the pc that grows as the view scrolls.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import lldb
+
+from profiler import PROFILER
+
+# functions larger than this many bytes are decoded as a window around the pc
+WINDOW_THRESHOLD = 4096
+# instructions decoded before and after the pc when a window is opened
+WINDOW_BEFORE = 64
+WINDOW_AFTER = 192
+# longest possible x86 instruction
+MAX_INSTRUCTION = 15
+# instructions dropped from the front of a heuristic x86 resync
+RESYNC_SLACK = 4
+
+
+class Instruction(NamedTuple):
+    """One decoded instruction, detached from lldb."""
+
+    address: int
+    data: bytes
+    mnemonic: str
+    operands: str
+    comment: str
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+
+def decode(target: lldb.SBTarget, instructions: lldb.SBInstructionList) -> List[Instruction]:
+    """Pull everything we draw out of an `SBInstructionList` in one pass."""
+    decoded = []
+    error = lldb.SBError()
+    for ins in instructions:
+        size = ins.GetByteSize()
+        data = ins.GetData(target).ReadRawData(error, 0, size) if size else b""
+        decoded.append(
+            Instruction(
+                address=ins.GetAddress().GetLoadAddress(target),
+                data=data or b"",
+                mnemonic=ins.GetMnemonic(target) or "",
+                operands=ins.GetOperands(target) or "",
+                comment=ins.GetComment(target) or "",
+            )
+        )
+    return decoded
+
+
+def read(target: lldb.SBTarget, address: int, count: int) -> List[Instruction]:
+    """Decode `count` instructions starting at a load address."""
+    if count <= 0:
+        return []
+    with PROFILER.span("ReadInstructions", "lldb"):
+        instructions = target.ReadInstructions(lldb.SBAddress(address, target), count)
+    return decode(target, instructions)
+
+
+def fixed_width(target: lldb.SBTarget) -> int:
+    """Instruction size on fixed-width architectures, 0 otherwise."""
+    triple = target.GetTriple() or ""
+    if triple.startswith(("arm64", "aarch64")):
+        return 4
+    return 0
+
+
+def read_backward(
+    target: lldb.SBTarget, end: int, floor: int, count: int
+) -> List[Instruction]:
+    """Decode up to `count` instructions ending exactly at `end`.
+
+    x86 can't be decoded backwards, so we decode forwards from somewhere
+    earlier and keep the result only if it lands on `end`. `floor` is the start
+    of the enclosing symbol, which is always a safe place to resync from.
+    """
+    if end <= floor or count <= 0:
+        return []
+
+    width = fixed_width(target)
+    if width:
+        start = max(floor, end - count * width)
+        return read(target, start, (end - start) // width)
+
+    def run_to_end(start: int) -> Optional[List[Instruction]]:
+        kept: List[Instruction] = []
+        address = start
+        while address < end:
+            # x86 averages a little under four bytes an instruction
+            chunk = [
+                ins
+                for ins in read(target, address, (end - address) // 4 + 1)
+                if ins.address < end
+            ]
+            if not chunk:
+                break
+            kept.extend(chunk)
+            address = chunk[-1].address + chunk[-1].size
+        if address != end:
+            return None
+        return kept
+
+    # close enough to the symbol start to resync from there exactly
+    if end - floor <= count * MAX_INSTRUCTION:
+        return (run_to_end(floor) or [])[-count:]
+
+    # otherwise guess; x86 decoding self-synchronises within a few instructions,
+    # so anything that lands on `end` is right apart from its first few entries
+    guess = end - (count + RESYNC_SLACK) * 6
+    for start in range(guess, max(floor, guess - MAX_INSTRUCTION), -1):
+        kept = run_to_end(start)
+        if kept and len(kept) > RESYNC_SLACK:
+            return kept[RESYNC_SLACK:][-count:]
+    return (run_to_end(floor) or [])[-count:]
+
+
+class Listing:
+    """The decoded instructions of one function or symbol, or a window of them."""
+
+    def __init__(
+        self,
+        key: Tuple[str, int, int],
+        name: str,
+        target: lldb.SBTarget,
+        instructions: List[Instruction],
+    ) -> None:
+        self.key = key
+        self.name = name
+        self.start = key[1]
+        self.end = key[2]
+        self.target = target
+        # bumped whenever rows are added or replaced, so views know to redraw
+        self.version = 0
+        self.instructions: List[Instruction] = []
+        self.rows: Dict[int, int] = {}
+        # pre-rendered lines, filled in lazily by whoever draws the listing
+        self.lines: List[Any] = []
+        self.replace(instructions)
+
+    def __len__(self) -> int:
+        return len(self.instructions)
+
+    def __contains__(self, address: int) -> bool:
+        return self.start <= address < self.end
+
+    def row(self, address: int) -> Optional[int]:
+        return self.rows.get(address)
+
+    @property
+    def head_complete(self) -> bool:
+        return not self.instructions or self.instructions[0].address <= self.start
+
+    @property
+    def tail_complete(self) -> bool:
+        if not self.instructions:
+            return True
+        last = self.instructions[-1]
+        return last.address + last.size >= self.end
+
+    def replace(self, instructions: List[Instruction]) -> None:
+        self.instructions = instructions
+        self.lines = [None] * len(instructions)
+        self.reindex()
+
+    def reindex(self) -> None:
+        self.rows = {ins.address: row for row, ins in enumerate(self.instructions)}
+        self.version += 1
+
+    def seek(self, pc: int) -> bool:
+        """Re-open the window around `pc`; False if nothing decodes there."""
+        after = [
+            ins for ins in read(self.target, pc, WINDOW_AFTER) if ins.address < self.end
+        ]
+        if not after:
+            return False
+        before = read_backward(self.target, pc, self.start, WINDOW_BEFORE)
+        self.replace(before + after)
+        return True
+
+    def extend_backward(self, count: int) -> int:
+        """Decode up to `count` more rows above the window; returns rows added."""
+        if self.head_complete:
+            return 0
+        decoded = read_backward(self.target, self.instructions[0].address, self.start, count)
+        if not decoded:
+            return 0
+        self.instructions[:0] = decoded
+        self.lines[:0] = [None] * len(decoded)
+        self.reindex()
+        return len(decoded)
+
+    def extend_forward(self, count: int) -> int:
+        """Decode up to `count` more rows below the window; returns rows added."""
+        if self.tail_complete:
+            return 0
+        last = self.instructions[-1]
+        decoded = [
+            ins
+            for ins in read(self.target, last.address + last.size, count)
+            if ins.address < self.end
+        ]
+        if not decoded:
+            return 0
+        self.instructions.extend(decoded)
+        self.lines.extend([None] * len(decoded))
+        self.reindex()
+        return len(decoded)
+
+
+class DisassemblyCache:
+    """LRU cache of function listings."""
+
+    def __init__(self, capacity: int = 64) -> None:
+        self.capacity = capacity
+        self.listings: "OrderedDict[Tuple[str, int, int], Listing]" = OrderedDict()
+
+    def listing(self, target: lldb.SBTarget, frame: lldb.SBFrame) -> Optional[Listing]:
+        """Return the listing containing the frame's pc, decoding it if needed."""
+        pc = frame.GetPC()
+
+        # most steps land in the function we just drew; skip lldb entirely
+        for key, listing in reversed(self.listings.items()):
+            if pc in listing and (listing.row(pc) is not None or listing.seek(pc)):
+                self.listings.move_to_end(key)
+                return listing
+
+        function = frame.GetFunction()
+        scope = function if function else frame.GetSymbol()
+        if not scope:
+            return None
+
+        start = scope.GetStartAddress()
+        end = scope.GetEndAddress()
+        key = (
+            start.GetModule().GetUUIDString() or "",
+            start.GetLoadAddress(target),
+            end.GetLoadAddress(target),
+        )
+        listing = self.listings.get(key)
+        if listing is None:
+            name = scope.GetName() or ""
+            if key[2] - key[1] > WINDOW_THRESHOLD:
+                listing = Listing(key, name, target, [])
+                listing.seek(pc)
+            else:
+                with PROFILER.span("GetInstructions", "lldb"):
+                    instructions = scope.GetInstructions(target)
+                listing = Listing(key, name, target, decode(target, instructions))
+            self.listings[key] = listing
+            while len(self.listings) > self.capacity:
+                self.listings.popitem(last=False)
+        elif listing.row(pc) is None:
+            listing.seek(pc)
+        self.listings.move_to_end(key)
+        return listing
+
+    def verify(
+        self, read: Callable[[int, int], Optional[bytes]], listing: Listing, pc: int
+    ) -> bool:
+        """Check the bytes under the pc still match; drop the listing if not."""
+        row = listing.row(pc)
+        if row is None:
+            return True
+        ins = listing.instructions[row]
+        if read(pc, ins.size) == ins.data:
+            return True
+        self.listings.pop(listing.key, None)
+        return False
+
+    def invalidate(self, address: int, size: int = 1) -> None:
+        """Forget every listing overlapping a write to `[address, address + size)`."""
+        stale = [
+            key
+            for key, listing in self.listings.items()
+            if listing.start < address + size and address < listing.end
+        ]
+        for key in stale:
+            del self.listings[key]
+
+    def clear(self) -> None:
+        self.listings.clear()
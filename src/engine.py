@@ -0,0 +1,421 @@
+"""
+debugger engine; owns the lldb debugger on a worker thread.
+
+the app never blocks on lldb: execution control is queued onto the worker,
+and the worker reports back through plain event objects handed to `sink`.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from itertools import chain
+from typing import Any, Callable, Iterator, Optional
+
+import lldb
+import os
+import queue
+import threading
+import time
+
+from covermap import Coverage
+from profiler import PROFILER
+from snapshot import StopSnapshot, collect
+from stepping import Batch
+from tracing import TraceWriter
+
+
+@dataclass(frozen=True)
+class Stopped:
+    """The process stopped; widgets should refresh."""
+
+    snapshot: StopSnapshot
+
+
+@dataclass(frozen=True)
+class Running:
+    """The process resumed."""
+
+    snapshot: StopSnapshot
+
+
+@dataclass(frozen=True)
+class Exited:
+    """The process exited, crashed or was detached."""
+
+    snapshot: StopSnapshot
+    status: int
+    description: str
+
+
+@dataclass(frozen=True)
+class Batched:
+    """A batch finished; only its final state is reported."""
+
+    snapshot: StopSnapshot
+    steps: int
+    seconds: float
+    reason: str
+
+
+@dataclass(frozen=True)
+class Output:
+    """Text the inferior wrote to stdout or stderr."""
+
+    text: str
+
+
+@dataclass(frozen=True)
+class Covered:
+    """Coverage moved on; sent at most every `REPORT_INTERVAL`, not per hit."""
+
+    covered: int
+    blocks: int
+    armed: int
+
+
+@dataclass(frozen=True)
+class Failed:
+    """A queued command failed."""
+
+    message: str
+
+
+class DebuggerEngine:
+    """Worker thread driving an async `SBDebugger` through its listener."""
+
+    # broadcaster bit used to wake the pump when a command is queued
+    WAKE = 1 << 0
+    # seconds between coverage reports while the process runs
+    REPORT_INTERVAL = 0.25
+
+    def __init__(self, sink: Callable[[Any], None]) -> None:
+        self.sink = sink
+        self.dbg = lldb.SBDebugger.Create()
+        self.dbg.SetAsync(True)
+        self.listener = self.dbg.GetListener()
+        self.broadcaster = lldb.SBBroadcaster("abh.engine")
+        self.listener.StartListeningForEvents(self.broadcaster, self.WAKE)
+        self.process = lldb.SBProcess()
+        self.commands: queue.SimpleQueue = queue.SimpleQueue()
+        self.closing = False
+        # set to stop a batch between two steps
+        self.cancel = threading.Event()
+        # appends every stop to a trace while set
+        self.recorder: Optional[TraceWriter] = None
+        # blocks whose breakpoints are resumed from without a stop event
+        self.coverage: Optional[Coverage] = None
+        # whether the process was last continued, rather than stepped
+        self.continued = False
+        # swallow the running event after resuming from a coverage hit
+        self.quiet = False
+        self.reported = 0.0
+        self.worker = threading.Thread(target=self._pump, name="abh-engine", daemon=True)
+
+    def start(self) -> None:
+        self.worker.start()
+
+    def shutdown(self) -> None:
+        """Kill the process, stop the worker and tear down the debugger."""
+        self.submit(self._kill)
+        self.cancel.set()
+        self.closing = True
+        self.broadcaster.BroadcastEventByType(self.WAKE)
+        self.worker.join(timeout=2)
+        lldb.SBDebugger.Destroy(self.dbg)
+
+    def submit(self, command: Callable[..., None], *args: Any) -> None:
+        """Run `command(*args)` on the worker thread."""
+        self.commands.put((command, args))
+        self.broadcaster.BroadcastEventByType(self.WAKE)
+
+    def launch(self, target: lldb.SBTarget) -> None:
+        self.submit(self._launch, target)
+
+    def resume(self) -> None:
+        self.submit(self._resume)
+
+    def step(self, thread: lldb.SBThread, step_over: bool) -> None:
+        self.submit(self._step, thread, step_over)
+
+    def batch(self, thread: lldb.SBThread, batch: Batch) -> None:
+        self.submit(self._batch, thread, batch)
+
+    def cover(self, coverage: Optional[Coverage]) -> None:
+        """Arm breakpoints on every block of `coverage`, or clear them with None."""
+        self.submit(self._cover, coverage)
+
+    def trace(self, directory: Optional[str]) -> None:
+        """Start recording every stop into `directory`, or stop with None."""
+        self.submit(self._trace, directory)
+
+    def interrupt(self) -> None:
+        # safe from any thread, and must not wait behind queued commands
+        self.cancel.set()
+        if self.process and self.process.GetState() in (
+            lldb.eStateRunning,
+            lldb.eStateStepping,
+        ):
+            self.process.SendAsyncInterrupt()
+
+    # everything below runs on the worker thread
+
+    def _pump(self) -> None:
+        event = lldb.SBEvent()
+        while not self.closing:
+            self._drain()
+            # wake up once a second even when idle so shutdown is noticed
+            if self.listener.WaitForEvent(1, event):
+                self._handle(event)
+        self._drain()
+
+    def _drain(self) -> None:
+        while True:
+            try:
+                command, args = self.commands.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                command(*args)
+            except Exception as e:
+                self.sink(Failed(str(e)))
+
+    def _handle(self, event: lldb.SBEvent) -> None:
+        if not lldb.SBProcess.EventIsProcessEvent(event):
+            return
+
+        process = lldb.SBProcess.GetProcessFromEvent(event)
+        kind = event.GetType()
+        if kind & (
+            lldb.SBProcess.eBroadcastBitSTDOUT | lldb.SBProcess.eBroadcastBitSTDERR
+        ):
+            self._flush_output(process)
+        if not kind & lldb.SBProcess.eBroadcastBitStateChanged:
+            return
+
+        state = lldb.SBProcess.GetStateFromEvent(event)
+        if state == lldb.eStateStopped:
+            # stops that lldb resumed from on its own aren't interesting
+            if lldb.SBProcess.GetRestartedFromEvent(event):
+                return
+            if self._covered(process, self.continued):
+                self.quiet = True
+                return
+            snapshot = collect(process)
+            if self.recorder is not None and snapshot.frame:
+                self.recorder.record_registers(snapshot.pc, list(snapshot.registers.values()))
+                self.recorder.flush()
+            self.sink(Stopped(snapshot))
+        elif state == lldb.eStateRunning:
+            if self.quiet:
+                self.quiet = False
+                return
+            self.sink(Running(collect(process)))
+        elif state in (lldb.eStateExited, lldb.eStateCrashed, lldb.eStateDetached):
+            self._flush_output(process)
+            self._report(True)
+            self.sink(
+                Exited(
+                    collect(process),
+                    process.GetExitStatus(),
+                    process.GetExitDescription() or "",
+                )
+            )
+
+    def _flush_output(self, process: lldb.SBProcess) -> None:
+        for read in (process.GetSTDOUT, process.GetSTDERR):
+            chunks = []
+            while True:
+                chunk = read(4096)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+            if chunks:
+                self.sink(Output("".join(chunks)))
+
+    def _launch(self, target: lldb.SBTarget) -> None:
+        process = target.LaunchSimple(None, None, os.getcwd())
+        if not process:
+            self.sink(Failed("couldn't launch process!"))
+            return
+        self.process = process
+        self.continued = True
+
+    def _resume(self) -> None:
+        if not self.process:
+            self.sink(Failed("no process running!"))
+            return
+        self.continued = True
+        error = self.process.Continue()
+        if error.Fail():
+            self.sink(Failed("couldn't continue process!"))
+
+    def _step(self, thread: lldb.SBThread, step_over: bool) -> None:
+        if self.process.GetState() != lldb.eStateStopped:
+            return
+        self.continued = False
+        with PROFILER.span("StepInstruction", "lldb"):
+            thread.StepInstruction(step_over)
+
+    def _batch(self, thread: lldb.SBThread, batch: Batch) -> None:
+        process = self.process
+        if process.GetState() != lldb.eStateStopped:
+            self.sink(Failed("process not stopped!"))
+            return
+        self.cancel.clear()
+        steps = 0
+        state = lldb.eStateStopped
+        start = time.perf_counter()
+
+        if batch.address is not None:
+            target = process.GetTarget()
+            breakpoint = target.BreakpointCreateByAddress(batch.address)
+            breakpoint.SetOneShot(True)
+            process.Continue()
+            state = self._wait(process, True)
+            target.BreakpointDelete(breakpoint.GetID())
+            pc = thread.GetFrameAtIndex(0).GetPC() if state == lldb.eStateStopped else None
+            reason = "reached" if pc == batch.address else "stopped elsewhere"
+        else:
+            reason = "done"
+            while steps < batch.count:
+                if self.cancel.is_set():
+                    reason = "cancelled"
+                    break
+                thread.StepInstruction(batch.step_over)
+                state = self._wait(process)
+                steps += 1
+                if state != lldb.eStateStopped:
+                    break
+                if self.recorder is not None:
+                    self.recorder.record_frame(thread.GetFrameAtIndex(0))
+                if batch.until is not None and batch.until(thread.GetFrameAtIndex(0)):
+                    reason = "condition holds"
+                    break
+            else:
+                if batch.until is not None:
+                    reason = "gave up"
+
+        if state != lldb.eStateStopped:
+            reason = lldb.SBDebugger.StateAsCString(state)
+        if self.recorder is not None:
+            self.recorder.flush()
+        PROFILER.record("batch", "lldb", start, time.perf_counter())
+        seconds = time.perf_counter() - start
+        self.sink(Batched(collect(process), steps, seconds, f"{batch.description}: {reason}"))
+
+    def _wait(self, process: lldb.SBProcess, continued: bool = False) -> int:
+        """Wait for the process to stop again, swallowing the events on the way.
+
+        Coverage hits are resumed from here too, unless the process was
+        stepped, in which case the step itself is the stop.
+        """
+        event = lldb.SBEvent()
+        while not self.closing:
+            if not self.listener.WaitForEvent(1, event):
+                continue
+            if not lldb.SBProcess.EventIsProcessEvent(event):
+                continue
+            kind = event.GetType()
+            if kind & (
+                lldb.SBProcess.eBroadcastBitSTDOUT | lldb.SBProcess.eBroadcastBitSTDERR
+            ):
+                self._flush_output(process)
+            if not kind & lldb.SBProcess.eBroadcastBitStateChanged:
+                continue
+            state = lldb.SBProcess.GetStateFromEvent(event)
+            if state == lldb.eStateStopped and lldb.SBProcess.GetRestartedFromEvent(event):
+                continue
+            if state == lldb.eStateStopped and self._covered(process, continued):
+                continue
+            if state in (
+                lldb.eStateStopped,
+                lldb.eStateExited,
+                lldb.eStateCrashed,
+                lldb.eStateDetached,
+            ):
+                if state != lldb.eStateStopped:
+                    self._flush_output(process)
+                return state
+        return process.GetState()
+
+    def _covered(self, process: lldb.SBProcess, resume: bool) -> bool:
+        """Count coverage hits in a stop; True if that's all it was and we resumed."""
+        coverage = self.coverage
+        if coverage is None:
+            return False
+        with PROFILER.span("coverage stop", "lldb"):
+            hit = False
+            others = False
+            for thread in process:
+                reason = thread.GetStopReason()
+                if reason == lldb.eStopReasonNone:
+                    continue
+                if reason != lldb.eStopReasonBreakpoint:
+                    others = True
+                    continue
+                # (breakpoint id, location id) pairs
+                for index in range(0, thread.GetStopReasonDataCount(), 2):
+                    if coverage.hit(thread.GetStopReasonDataAtIndex(index)):
+                        hit = True
+                    else:
+                        others = True
+            if not hit or others or not resume:
+                # a real stop; the heatmap should be current for it
+                self._report(True)
+                return False
+            self._report(False)
+            process.Continue()
+            return True
+
+    def _report(self, now: bool) -> None:
+        """Tell the app about new hits, unless it was told very recently."""
+        coverage = self.coverage
+        if coverage is None or not coverage.fresh:
+            return
+        if not now and time.monotonic() - self.reported < self.REPORT_INTERVAL:
+            return
+        self._announce(coverage)
+
+    def _announce(self, coverage: Coverage) -> None:
+        coverage.relocate()
+        coverage.fresh = 0
+        self.reported = time.monotonic()
+        self.sink(Covered(coverage.covered(), len(coverage), len(coverage.armed)))
+
+    def _cover(self, coverage: Optional[Coverage]) -> None:
+        # whatever was armed before goes first, new coverage or not
+        steps: Iterator[int] = iter(())
+        if self.coverage is not None and self.coverage.armed:
+            steps = self.coverage.disarm()
+        if coverage is not None:
+            self.coverage = coverage
+            steps = chain(steps, coverage.arm())
+        self._batches(steps)
+
+    def _batches(self, steps: Iterator[int]) -> None:
+        """Run one batch, then queue the rest behind whatever else was asked for."""
+        if next(steps, None) is None:
+            if self.coverage is not None:
+                self._announce(self.coverage)
+            return
+        self.submit(self._batches, steps)
+
+    def _trace(self, directory: Optional[str]) -> None:
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+        if directory is None:
+            return
+        self.recorder = TraceWriter(directory)
+        # the state tracing starts from
+        thread = self.process.GetSelectedThread() if self.process else lldb.SBThread()
+        if self.process.GetState() == lldb.eStateStopped and thread:
+            self.recorder.record_frame(thread.GetFrameAtIndex(0))
+            self.recorder.flush()
+
+    def _kill(self) -> None:
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+        if self.process:
+            self.process.Kill()
@@ -0,0 +1,270 @@
+"""
+address expressions, shared by the inspector and `until` predicates.
+
+an expression is parsed once into a tree, folded, and compiled into nested
+closures; evaluating it against a new stop only looks the names up again.
+
+    rsp+0x10            registers (any case) and integers (0x.., 0b.., 0o..)
+    [rbp-8]             an 8 byte read; byte/word/dword/qword[...] for others
+    main+0x20           symbols, resolved through the symbol index
+    (rax >> 4) & 0xff   precedence as in python: * / % + - << >> & ^ |
+    rax == 0 && [rsp]   comparisons and && || ! (or `and`, `or`, `not`)
+
+arithmetic wraps at 64 bits, and comparisons are unsigned.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, FrozenSet, NamedTuple, Optional, Tuple
+
+import functools
+import operator
+import re
+
+MASK = (1 << 64) - 1
+
+TOKEN = re.compile(
+    r"\s*(?:"
+    r"(?P<number>0[xX][0-9a-fA-F_]+|0[bB][01_]+|0[oO][0-7_]+|\d[\d_]*)"
+    r"|(?P<name>[A-Za-z_.$][\w.$@]*(?:::[A-Za-z_~][\w.$@]*)*)"
+    r"|(?P<op><<|>>|<=|>=|==|!=|&&|\|\||[-+*/%&|^~!<>()\[\]])"
+    r")"
+)
+KEYWORDS = {"and": "&&", "or": "||", "not": "!"}
+SIZES = {"byte": 1, "word": 2, "dword": 4, "qword": 8}
+
+
+def divide(left: int, right: int) -> int:
+    if right == 0:
+        raise ValueError("division by zero")
+    return left // right
+
+
+def modulo(left: int, right: int) -> int:
+    if right == 0:
+        raise ValueError("division by zero")
+    return left % right
+
+
+# operator -> (binding power, function); higher binds tighter
+BINARY = {
+    "||": (1, None),
+    "&&": (2, None),
+    "==": (3, lambda a, b: int(a == b)),
+    "!=": (3, lambda a, b: int(a != b)),
+    "<": (3, lambda a, b: int(a < b)),
+    "<=": (3, lambda a, b: int(a <= b)),
+    ">": (3, lambda a, b: int(a > b)),
+    ">=": (3, lambda a, b: int(a >= b)),
+    "|": (4, operator.or_),
+    "^": (5, operator.xor),
+    "&": (6, operator.and_),
+    "<<": (7, lambda a, b: (a << b) & MASK if b < 64 else 0),
+    ">>": (7, operator.rshift),
+    "+": (8, lambda a, b: (a + b) & MASK),
+    "-": (8, lambda a, b: (a - b) & MASK),
+    "*": (9, lambda a, b: (a * b) & MASK),
+    "/": (9, divide),
+    "%": (9, modulo),
+}
+UNARY = {
+    "-": lambda a: -a & MASK,
+    "~": lambda a: ~a & MASK,
+    "!": lambda a: int(not a),
+    "+": lambda a: a,
+}
+# operators whose result is a truth value
+BOOLEAN = {"||", "&&", "==", "!=", "<", "<=", ">", ">=", "!"}
+
+# ("number", value) | ("name", name) | ("deref", node, size)
+# | ("unary", op, node) | ("binary", op, left, right)
+Node = Tuple
+
+
+class Context(NamedTuple):
+    """Where an expression's names and memory come from."""
+
+    # a register's value by lowercase name, or None if there's no such register
+    register: Callable[[str], Optional[int]]
+    # `size` bytes at an address, or None if unreadable
+    read: Callable[[int, int], Optional[bytes]]
+    # a symbol's load address, or None
+    resolve: Callable[[str], Optional[int]]
+
+
+class Parser:
+    """Recursive descent with precedence climbing over the binary operators."""
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.tokens = self.tokenize(text)
+        self.position = 0
+
+    def tokenize(self, text: str) -> list:
+        tokens = []
+        index = 0
+        text = text.rstrip()
+        while index < len(text):
+            match = TOKEN.match(text, index)
+            if match is None or match.end() == index:
+                raise ValueError(f"unexpected {text[index:].strip()[:1]!r} in expression")
+            kind = match.lastgroup
+            value = match.group(kind)
+            if kind == "name" and value.lower() in KEYWORDS:
+                kind, value = "op", KEYWORDS[value.lower()]
+            tokens.append((kind, value))
+            index = match.end()
+        return tokens
+
+    def peek(self) -> Tuple[str, str]:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return ("end", "")
+
+    def take(self) -> Tuple[str, str]:
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def expect(self, op: str) -> None:
+        kind, value = self.take()
+        if kind != "op" or value != op:
+            raise ValueError(f"expected {op!r} in expression")
+
+    def parse(self) -> Node:
+        if not self.tokens:
+            raise ValueError("empty expression")
+        node = self.binary(0)
+        if self.peek()[0] != "end":
+            raise ValueError(f"unexpected {self.peek()[1]!r} in expression")
+        return node
+
+    def binary(self, floor: int) -> Node:
+        left = self.unary()
+        while True:
+            kind, op = self.peek()
+            if kind != "op" or op not in BINARY or BINARY[op][0] <= floor:
+                return left
+            self.take()
+            right = self.binary(BINARY[op][0])
+            left = fold(("binary", op, left, right))
+
+    def unary(self) -> Node:
+        kind, value = self.peek()
+        if kind == "op" and value in UNARY:
+            self.take()
+            return fold(("unary", value, self.unary()))
+        return self.primary()
+
+    def primary(self) -> Node:
+        kind, value = self.take()
+        if kind == "number":
+            return ("number", int(value, 0) & MASK)
+        if kind == "name":
+            size = SIZES.get(value.lower())
+            if size is not None and self.peek() == ("op", "["):
+                self.take()
+                return self.deref(size)
+            return ("name", value)
+        if kind == "op" and value == "(":
+            node = self.binary(0)
+            self.expect(")")
+            return node
+        if kind == "op" and value == "[":
+            return self.deref(8)
+        if kind == "end":
+            raise ValueError("expression ends too early")
+        raise ValueError(f"unexpected {value!r} in expression")
+
+    def deref(self, size: int) -> Node:
+        node = self.binary(0)
+        self.expect("]")
+        return ("deref", node, size)
+
+
+def fold(node: Node) -> Node:
+    """Evaluate operators over constants once, at parse time."""
+    if node[0] == "unary" and node[2][0] == "number":
+        return ("number", UNARY[node[1]](node[2][1]))
+    if node[0] == "binary" and node[2][0] == "number" and node[3][0] == "number":
+        op, left, right = node[1], node[2][1], node[3][1]
+        if op == "&&":
+            return ("number", int(bool(left and right)))
+        if op == "||":
+            return ("number", int(bool(left or right)))
+        return ("number", BINARY[op][1](left, right))
+    return node
+
+
+def build(node: Node) -> Callable[[Context], int]:
+    """Compile a tree into closures over a `Context`."""
+    kind = node[0]
+    if kind == "number":
+        value = node[1]
+        return lambda context: value
+
+    if kind == "name":
+        name = node[1]
+        lowered = name.lower()
+
+        def lookup(context: Context) -> int:
+            value = context.register(lowered)
+            if value is None:
+                value = context.resolve(name)
+            if value is None:
+                raise ValueError(f"unknown register or symbol: {name}")
+            return value
+
+        return lookup
+
+    if kind == "deref":
+        inner, size = build(node[1]), node[2]
+
+        def deref(context: Context) -> int:
+            address = inner(context)
+            data = context.read(address, size)
+            if data is None:
+                raise ValueError(f"can't read memory at 0x{address:x}")
+            return int.from_bytes(data, "little")
+
+        return deref
+
+    if kind == "unary":
+        function, operand = UNARY[node[1]], build(node[2])
+        return lambda context: function(operand(context))
+
+    op, left, right = node[1], build(node[2]), build(node[3])
+    if op == "&&":
+        return lambda context: int(bool(left(context) and right(context)))
+    if op == "||":
+        return lambda context: int(bool(left(context) or right(context)))
+    function = BINARY[op][1]
+    return lambda context: function(left(context), right(context))
+
+
+def names(node: Node) -> FrozenSet[str]:
+    if node[0] == "name":
+        return frozenset([node[1]])
+    return frozenset().union(*(names(child) for child in node[1:] if isinstance(child, tuple)))
+
+
+class Expression:
+    """A parsed and compiled expression; evaluate it against any number of stops."""
+
+    def __init__(self, text: str, tree: Node) -> None:
+        self.text = text
+        self.tree = tree
+        self.names = names(tree)
+        # a comparison or logical expression, rather than an address
+        self.predicate = tree[0] in ("unary", "binary") and tree[1] in BOOLEAN
+        self.function = build(tree)
+
+    def evaluate(self, context: Context) -> int:
+        """The expression's value; raises ValueError for bad names or memory."""
+        return self.function(context)
+
+
+@functools.lru_cache(maxsize=256)
+def parse(text: str) -> Expression:
+    """Parse `text`, raising ValueError; the same text is only parsed once."""
+    return Expression(text, Parser(text).parse())
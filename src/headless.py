@@ -0,0 +1,394 @@
+"""
+headless driver; scripted sessions on the same engine as the tui.
+
+never imports textual. a script is one command per line, and every command
+prints one json object per line:
+
+    target test/hello
+    break main
+    run
+    step 10
+    next
+    until rax == 0
+    regs
+    memory rsp 64
+    disas 8
+    symbols print
+    xrefs main
+    coverage on
+    strings password
+    scan u32 1234
+    narrow changed
+    pointers rsp
+    chains 0x601040 3
+    continue
+    coverage export
+
+Run with:
+
+    python headless.py script.abh
+    python headless.py -c "target test/hello" -c "break main" -c run -c regs
+    python headless.py -j 8 scripts/*.abh
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+import argparse
+import json
+import lldb
+import multiprocessing
+import queue
+import sys
+import time
+
+from breakpoints import BreakpointRegistry
+from scanner import ValueScan
+from disasm import read as read_instructions
+from covermap import Coverage
+from engine import Batched, Covered, DebuggerEngine, Exited, Failed, Output, Stopped
+from memcache import MemoryCache
+from pointers import MAX_OFFSET, PointerMap, statics
+from snapshot import StopSnapshot
+from stepping import Batch, parse as parse_batch
+from strings import StringIndex
+from symbols import SymbolIndex
+from xrefs import XrefIndex
+
+# seconds to wait for the process to stop before a command gives up
+TIMEOUT = 30.0
+
+
+class Session:
+    """One debugger, driven a command at a time."""
+
+    def __init__(self, timeout: float = TIMEOUT) -> None:
+        self.timeout = timeout
+        self.events: queue.SimpleQueue = queue.SimpleQueue()
+        self.engine = DebuggerEngine(self.events.put)
+        self.engine.start()
+        self.target = lldb.SBTarget()
+        self.symbols = SymbolIndex()
+        self.breakpoints = BreakpointRegistry(self.symbols)
+        self.memory = MemoryCache()
+        self.xrefs = XrefIndex(self.symbols)
+        self.strings = StringIndex()
+        self.scan: Optional[ValueScan] = None
+        self.pointers: Optional[PointerMap] = None
+        self.coverage: Optional[Coverage] = None
+        self.snapshot: Optional[StopSnapshot] = None
+        # what the inferior printed during the current command
+        self.output: List[str] = []
+
+    def close(self) -> None:
+        self.engine.shutdown()
+
+    def run(self, line: str) -> Iterator[Dict[str, Any]]:
+        """Run one command, yielding its result and any inferior output."""
+        words = line.split()
+        if not words or words[0].startswith("#"):
+            return
+        command = getattr(self, f"do_{words[0]}", None)
+        if command is None:
+            yield {"command": line, "ok": False, "error": f"unknown command: {words[0]}"}
+            return
+        self.output = []
+        try:
+            result = command(*words[1:])
+            record = {"command": line, "ok": True, **(result or {})}
+        except Exception as error:
+            # one failed command is a record, never the end of the script
+            record = {"command": line, "ok": False, "error": str(error) or type(error).__name__}
+        if self.output:
+            yield {"output": "".join(self.output)}
+        yield record
+
+    def wait(self, covered: bool = False) -> Dict[str, Any]:
+        """Block until the engine reports the process stopped or gone.
+
+        Resumes are reported too, but there's nothing to say about them. With
+        `covered`, wait for coverage to be armed or cleared instead.
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                event = self.events.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                self.engine.interrupt()
+                raise RuntimeError("timed out waiting for the process")
+            if isinstance(event, Output):
+                self.output.append(event.text)
+            elif isinstance(event, Failed):
+                raise RuntimeError(event.message)
+            elif isinstance(event, Covered) and covered:
+                return {"covered": event.covered, "blocks": event.blocks, "armed": event.armed}
+            elif isinstance(event, (Stopped, Exited, Batched)):
+                self.snapshot = event.snapshot
+                self.memory.attach(event.snapshot.process)
+                result = self.describe(event.snapshot)
+                if isinstance(event, Exited):
+                    result["status"] = event.status
+                if isinstance(event, Batched):
+                    result["steps"] = event.steps
+                    result["seconds"] = round(event.seconds, 6)
+                    result["reason"] = event.reason
+                return result
+
+    def describe(self, snapshot: StopSnapshot) -> Dict[str, Any]:
+        return {
+            "state": snapshot.state_name,
+            "pid": snapshot.pid,
+            "pc": snapshot.pc,
+            "stop_reason": snapshot.stop_reason,
+        }
+
+    def stopped(self) -> StopSnapshot:
+        if self.snapshot is None or not self.snapshot.stopped:
+            raise RuntimeError("process not stopped!")
+        return self.snapshot
+
+    def address(self, text: str) -> int:
+        """An integer, a register, or a symbol name."""
+        try:
+            return int(text, 0)
+        except ValueError:
+            pass
+        if self.snapshot is not None and text in self.snapshot.registers:
+            return self.snapshot.registers[text].value
+        address = self.symbols.resolve(text)
+        if address is None:
+            raise ValueError(f"no such address, register or symbol: {text}")
+        return address
+
+    def do_target(self, path: str) -> Dict[str, Any]:
+        target = self.engine.dbg.CreateTarget(path)
+        if not target:
+            raise ValueError("couldn't find executable with that name!")
+        self.target = target
+        self.symbols.attach(target)
+        self.breakpoints.attach(target)
+        self.xrefs.attach(target)
+        self.coverage = None
+        return {"target": target.GetExecutable().fullpath, "triple": target.GetTriple()}
+
+    def do_break(self, *spec: str) -> Dict[str, Any]:
+        if not self.target:
+            raise ValueError("no target set!")
+        return self.breakpoints.create(" ".join(spec))._asdict()
+
+    def do_breakpoints(self) -> Dict[str, Any]:
+        return {"breakpoints": [entry._asdict() for entry in self.breakpoints.entries()]}
+
+    def do_run(self) -> Dict[str, Any]:
+        if not self.target:
+            raise ValueError("no target set!")
+        self.engine.launch(self.target)
+        return self.wait()
+
+    def do_continue(self) -> Dict[str, Any]:
+        self.stopped()
+        self.engine.resume()
+        return self.wait()
+
+    def do_step(self, count: str = "1") -> Dict[str, Any]:
+        return self.batch(Batch(count=int(count, 0), description=f"{count} steps"))
+
+    def do_next(self, count: str = "1") -> Dict[str, Any]:
+        return self.batch(
+            Batch(count=int(count, 0), step_over=True, description=f"{count} steps")
+        )
+
+    def do_until(self, *condition: str) -> Dict[str, Any]:
+        snapshot = self.stopped()
+        text = "until " + " ".join(condition)
+        return self.batch(parse_batch(text, list(snapshot.registers), self.symbols.resolve))
+
+    def batch(self, batch: Batch) -> Dict[str, Any]:
+        snapshot = self.stopped()
+        self.engine.batch(snapshot.thread, batch)
+        return self.wait()
+
+    def do_regs(self) -> Dict[str, Any]:
+        snapshot = self.stopped()
+        return {"registers": {name: reg.value for name, reg in snapshot.registers.items()}}
+
+    def do_memory(self, where: str, size: str = "64") -> Dict[str, Any]:
+        self.stopped()
+        address = self.address(where)
+        data = self.memory.read(address, int(size, 0))
+        if data is None:
+            raise ValueError(f"couldn't read memory at 0x{address:x}")
+        return {"address": address, "bytes": data.hex()}
+
+    def do_disas(self, count: str = "16", where: str = "") -> Dict[str, Any]:
+        snapshot = self.stopped()
+        address = self.address(where) if where else snapshot.pc
+        instructions = read_instructions(self.target, address, int(count, 0))
+        return {
+            "instructions": [
+                {
+                    "address": ins.address,
+                    "bytes": ins.data.hex(),
+                    "mnemonic": ins.mnemonic,
+                    "operands": ins.operands,
+                    "comment": ins.comment,
+                }
+                for ins in instructions
+            ]
+        }
+
+    def do_symbols(self, query: str = "", limit: str = "50") -> Dict[str, Any]:
+        libraries = query.startswith("@")
+        records = self.symbols.search(query.lstrip("@"), libraries, int(limit, 0))
+        return {"symbols": [record._asdict() for record in records]}
+
+    def do_xrefs(self, where: str) -> Dict[str, Any]:
+        """Callers and callees of a function, by name or file address."""
+        if not self.xrefs.complete:
+            self.xrefs.build()
+        try:
+            record = self.xrefs.function(int(where, 0))
+        except ValueError:
+            record = self.symbols.lookup(where)
+        if record is None:
+            raise ValueError(f"no function at or named {where}")
+        return {
+            "function": record.demangled,
+            "callers": [xref._asdict() for xref in self.xrefs.callers(record)],
+            "callees": [xref._asdict() for xref in self.xrefs.callees(record)],
+        }
+
+    def do_coverage(self, action: str = "on", path: str = "") -> Dict[str, Any]:
+        """`on` arms a breakpoint on every block, `off` clears them, `export` writes hits."""
+        if action == "on":
+            if self.coverage is None:
+                self.coverage = Coverage.build(self.target, self.symbols)
+            if self.coverage.armed:
+                raise ValueError("coverage is already armed!")
+            self.engine.cover(self.coverage)
+            return self.wait(covered=True)
+        if self.coverage is None:
+            raise ValueError("no coverage yet!")
+        if action == "off":
+            self.engine.cover(None)
+            return self.wait(covered=True)
+        if action == "export":
+            return {"path": self.coverage.export(path or None), "covered": self.coverage.covered()}
+        raise ValueError(f"unknown coverage action: {action}; use on, off or export")
+
+    def do_strings(self, query: str = "", limit: str = "50") -> Dict[str, Any]:
+        snapshot = self.stopped()
+        if self.strings.stale(snapshot.process):
+            self.strings.scan(snapshot.process)
+        return {
+            "count": len(self.strings),
+            "strings": [hit._asdict() for hit in self.strings.search(query, int(limit, 0))],
+        }
+
+    def do_scan(self, kind: str, *value: str) -> Dict[str, Any]:
+        snapshot = self.stopped()
+        self.scan = ValueScan.start(snapshot.process, kind, " ".join(value))
+        return self.scanned()
+
+    def do_narrow(self, *condition: str) -> Dict[str, Any]:
+        snapshot = self.stopped()
+        if self.scan is None:
+            raise ValueError("no scan to narrow!")
+        self.scan.narrow(snapshot.process, " ".join(condition))
+        return self.scanned()
+
+    def scanned(self, limit: int = 50) -> Dict[str, Any]:
+        hits = [
+            {"address": address, "value": value.hex() if isinstance(value, bytes) else value}
+            for address, value in self.scan.hits(limit)
+        ]
+        return {"count": len(self.scan), "hits": hits}
+
+    def do_pointers(self, where: str, reach: str = "0") -> Dict[str, Any]:
+        """Pointers to `where`, or to up to `reach` bytes before it."""
+        address = self.address(where)
+        pointers = self.mapped()
+        found = pointers.into(max(0, address - int(reach, 0)), address + 1)
+        return {
+            "count": len(pointers),
+            "pointers": [{"source": source, "target": target} for source, target in found],
+        }
+
+    def do_chains(self, where: str, depth: str = "4") -> Dict[str, Any]:
+        address = self.address(where)
+        chains = self.mapped().chains(address, statics(self.target), int(depth, 0), MAX_OFFSET)
+        return {"chains": [chain._asdict() for chain in chains]}
+
+    def mapped(self) -> PointerMap:
+        snapshot = self.stopped()
+        if self.pointers is None or self.pointers.stale(snapshot.process):
+            self.pointers = PointerMap.build(snapshot.process)
+        return self.pointers
+
+    def do_kill(self) -> Dict[str, Any]:
+        process = self.snapshot.process if self.snapshot is not None else None
+        result: Dict[str, Any] = {}
+        if process and process.GetState() not in (
+            lldb.eStateExited,
+            lldb.eStateCrashed,
+            lldb.eStateDetached,
+        ):
+            process.Kill()
+            # the exit is ours; leaving it queued would end the next command's wait
+            result = self.wait()
+        self.snapshot = None
+        return result
+
+
+def run_script(lines: List[str], timeout: float = TIMEOUT) -> List[Dict[str, Any]]:
+    """Run a whole script in a fresh session."""
+    session = Session(timeout)
+    records = []
+    try:
+        for line in lines:
+            records.extend(session.run(line.strip()))
+    finally:
+        session.close()
+    return records
+
+
+def run_file(path: str, timeout: float = TIMEOUT) -> List[Dict[str, Any]]:
+    with open(path) as file:
+        records = run_script(file.readlines(), timeout)
+    return [{"script": path, **record} for record in records]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="run abh sessions without the tui")
+    parser.add_argument("scripts", nargs="*", help="script files, one command per line")
+    parser.add_argument("-c", "--command", action="append", default=[], help="a command to run")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="scripts to run at once")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT, help="seconds per stop")
+    args = parser.parse_args(argv)
+
+    failed = False
+    if args.command:
+        for record in run_script(args.command, args.timeout):
+            failed |= record.get("ok") is False
+            print(json.dumps(record), flush=True)
+
+    if args.jobs > 1 and len(args.scripts) > 1:
+        # a debugger per process; lldb doesn't take well to several per thread
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=args.jobs, mp_context=context) as pool:
+            results = pool.map(run_file, args.scripts, [args.timeout] * len(args.scripts))
+            for records in results:
+                for record in records:
+                    failed |= record.get("ok") is False
+                    print(json.dumps(record), flush=True)
+    else:
+        for path in args.scripts:
+            for record in run_file(path, args.timeout):
+                failed |= record.get("ok") is False
+                print(json.dumps(record), flush=True)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from rich.segment import Segment
+from rich.style import Style
+from textual.geometry import Size
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+
+from typing import Dict, List, Optional
+
+import lldb
+
+from memcache import MemoryCache
+from memmap import Region, regions
+
+ROW_BYTES = 16
+
+ADDRESS = Style(color="blue")
+BYTE = Style(color="white")
+ZERO = Style(color="bright_black")
+CHANGED = Style(color="magenta", bold=True, reverse=True)
+ASCII = Style(color="green")
+CURSOR = Style(underline=True)
+
+
+class HexView(ScrollView):
+    """Hex and ascii dump of one whole memory region.
+
+    Only visible rows are rendered, and their bytes come a page at a time from
+    the memory cache. Bytes that differ from the previous stop are highlighted.
+    """
+
+    BINDINGS = [
+        ("[", "region(-1)", "prev region"),
+        ("]", "region(1)", "next region"),
+    ]
+
+    def __init__(
+        self,
+        memory: MemoryCache,
+        *,
+        id: Optional[str] = None,
+        classes: Optional[str] = None,
+    ) -> None:
+        super().__init__(id=id, classes=classes)
+        self.memory = memory
+        self.regions: List[Region] = []
+        self.mapped: Optional[Region] = None
+        self.cursor: Optional[int] = None
+        # page contents as drawn at this stop and at the previous one
+        self.current: Dict[int, Optional[bytes]] = {}
+        self.previous: Dict[int, Optional[bytes]] = {}
+
+    def new_stop(self, process: lldb.SBProcess) -> None:
+        """Remember what was on screen, so changes can be shown."""
+        self.previous, self.current = self.current, {}
+        if self.display:
+            self.load_regions(process)
+
+    def load_regions(self, process: lldb.SBProcess) -> None:
+        """Re-read the region map; regions grow and move as the process runs."""
+        self.regions = regions(process)
+        if self.mapped is not None:
+            self.set_region(self.find(self.mapped.base) or self.mapped)
+        self.refresh()
+
+    def find(self, address: int) -> Optional[Region]:
+        for region in self.regions:
+            if region.base <= address < region.end:
+                return region
+        return None
+
+    def goto(self, address: int) -> bool:
+        """Show the region holding `address` and scroll it into view."""
+        if not self.regions and self.memory.process:
+            self.regions = regions(self.memory.process)
+        region = self.find(address)
+        if region is None:
+            return False
+        self.set_region(region)
+        self.cursor = address
+        row = (address - region.base) // ROW_BYTES
+        self.call_after_refresh(
+            self.scroll_to, y=max(0, row - self.size.height // 3), animate=False
+        )
+        self.refresh()
+        return True
+
+    def set_region(self, region: Region) -> None:
+        self.mapped = region
+        name = region.name or "region"
+        self.border_title = f"{name} 0x{region.base:x}-0x{region.end:x} {region.permissions}"
+        rows = (region.end - region.base + ROW_BYTES - 1) // ROW_BYTES
+        # address, hex columns with the middle gap, and the ascii column
+        self.virtual_size = Size(20 + ROW_BYTES * 3 + 1 + 2 + ROW_BYTES + 1, rows)
+
+    def action_region(self, step: int) -> None:
+        if self.mapped is None or not self.regions:
+            return
+        index = self.regions.index(self.mapped) if self.mapped in self.regions else 0
+        self.set_region(self.regions[(index + step) % len(self.regions)])
+        self.cursor = None
+        self.scroll_to(y=0, animate=False)
+        self.refresh()
+
+    def page(self, page: int) -> Optional[bytes]:
+        if page not in self.current:
+            size = self.memory.page_size
+            self.current[page] = self.memory.read(page * size, size)
+        return self.current[page]
+
+    def render_line(self, y: int) -> Strip:
+        scroll_x, scroll_y = self.scroll_offset
+        width = self.size.width
+        region = self.mapped
+        row = scroll_y + y
+        if region is None or row * ROW_BYTES >= region.end - region.base:
+            return Strip.blank(width, self.rich_style)
+
+        address = region.base + row * ROW_BYTES
+        page_size = self.memory.page_size
+        page, offset = divmod(address, page_size)
+        data = self.page(page)
+        old = self.previous.get(page)
+
+        segments = [Segment(f"0x{address:016x}  ", ADDRESS)]
+        ascii = []
+        for index in range(ROW_BYTES):
+            at = offset + index
+            gap = "  " if index == 7 else " "
+            if data is None:
+                segments.append(Segment("??" + gap, ZERO))
+                ascii.append(Segment(".", ZERO))
+                continue
+            byte = data[at]
+            changed = old is not None and old[at] != byte
+            style = CHANGED if changed else BYTE if byte else ZERO
+            if self.cursor == address + index:
+                style += CURSOR
+            segments.append(Segment(f"{byte:02x}", style))
+            segments.append(Segment(gap))
+            char = chr(byte) if 0x20 <= byte < 0x7F else "."
+            ascii.append(Segment(char, CHANGED if changed else ASCII))
+        segments.append(Segment(" |"))
+        segments.extend(ascii)
+        segments.append(Segment("|"))
+
+        strip = Strip(segments).apply_style(self.rich_style)
+        return strip.crop_extend(scroll_x, scroll_x + width, self.rich_style)
@@ -1,7 +1,11 @@
+from __future__ import annotations
+
+from rich.markup import escape
 from textual import on
 from textual.app import ComposeResult
 from textual.containers import Grid
 from textual.events import Key
+from textual.message import Message
 from textual.widget import Widget
 from textual.widgets import (
     Label,
@@ -9,20 +13,34 @@ from textual.widgets import (
     Input,
 )
 
+from types import MappingProxyType
+from typing import Callable, Mapping, Optional
+
 import lldb
-import struct
+
+from expression import Context, parse as parse_expression
+from memcache import MemoryCache
+from profiler import PROFILER
+from spray import TYPES, SprayTable
+from strings import preview
+from snapshot import Register, StopSnapshot
 
 
 class Inspector(Widget):
     """Widget to display the inspector."""
 
-    process: lldb.SBProcess = lldb.SBProcess()
-    regs = {}
+    process: Optional[lldb.SBProcess] = None
+    regs: Mapping[str, Register] = MappingProxyType({})
     dereferencing = False
 
-    def __init__(self, regs: dict) -> None:
+    def __init__(
+        self,
+        memory: MemoryCache,
+        resolve: Callable[[str], Optional[int]] = lambda name: None,
+    ) -> None:
         super().__init__()
-        self.regs = regs
+        self.memory = memory
+        self.context = Context(self.register, memory.read, resolve)
 
     def compose(self) -> ComposeResult:
         yield Grid(
@@ -55,52 +73,51 @@ class Inspector(Widget):
             id="inspector",
         )
 
+    class Examined(Message):
+        """The user asked to examine an address."""
+
+        def __init__(self, address: int) -> None:
+            super().__init__()
+            self.address = address
+
     @on(Input.Submitted)
-    def parse(self, event: Input.Submitted) -> None:
+    def submit(self, event: Input.Submitted) -> None:
+        address = self.parse(event)
+        if address is not None:
+            self.post_message(self.Examined(address))
+
+    def parse(self, event: Input.Submitted) -> Optional[int]:
         if not event.value:
-            return
+            return None
 
         hex_static = self.query_one("#hex", Static)
         if not self.regs:
             hex_static.update("[i red]no process running[/]")
-            return
-
-        # convert, say, 'rax' to '0x000ff...'
-        # do the largest reg names first so, i.e., 'sil' comes before 'si'
-        input = event.value.lower()
-        for reg, value in sorted(self.regs.items(), key=lambda item: len(item[0]), reverse=True):
-            input = input.replace(reg, value)
+            return None
 
-        # check for validity, roughly
-        for char in input:
-            if char not in "0123456789abcdefx+-*":
-                hex_static.update("[i red]invalid input[/]")
-                return
-
-        # eval; SECURITY RISK !!
+        # parsed once per distinct input; every step after that only evaluates
         try:
-            output = eval(input)
-        except Exception as _:
-            hex_static.update("[i red]address parse failure[/]")
-            return
-
-        if not isinstance(output, int):
-            hex_static.update("[i red]address parse failure[/]")
-            return
-
-        if output < 0:
-            hex_static.update("[i red]negative address[/]")
-            return
+            output = parse_expression(event.value).evaluate(self.context)
+        except ValueError as error:
+            hex_static.update(f"[i red]{escape(str(error))}[/]")
+            return None
 
         hex_string = f"{output:016x}"
-        hex_static.update(f"{event.value}:\n" + self.color_groupings(hex_string))
+        hex_static.update(f"{escape(event.value)}:\n" + self.color_groupings(hex_string))
 
-        self.type_spray(f"{output:016x}", self.dereferencing)
+        with PROFILER.span("type spray", "render"):
+            self.type_spray(f"{output:016x}", self.dereferencing)
+        return output
 
-    def update(self, process: lldb.SBProcess, regs: dict) -> None:
-        self.process = process
-        self.regs = regs
-        self.reload()
+    def register(self, name: str) -> Optional[int]:
+        reg = self.regs.get(name)
+        return reg.value if reg is not None else None
+
+    def update(self, snapshot: StopSnapshot) -> None:
+        self.process = snapshot.process
+        self.regs = snapshot.registers
+        with PROFILER.span("inspector", "render"):
+            self.reload()
 
     # address will be 16 characters long, and will have no 0x
     def type_spray(self, address: str, dereferencing: bool) -> None:
@@ -108,7 +125,6 @@ class Inspector(Widget):
             return
 
         addr = int(address, 16)
-        error = lldb.SBError()
         data: bytes
 
         types_to_colors = {
@@ -128,8 +144,8 @@ class Inspector(Widget):
 
         drf = self.query_one("#drf", Static)
         if dereferencing:
-            data = self.process.ReadMemory(addr, 16, error)
-            if error.Fail():
+            read = self.memory.read(addr, 16)
+            if read is None:
                 drf.update(
                     "[b magenta]dereferencing[/]: [b i]yes[/]; [i red]but dereference failed[/]"
                 )
@@ -157,6 +173,7 @@ class Inspector(Widget):
                     )
                 return
 
+            data = read
             hex_string = f"{int.from_bytes(data[:8], 'big'):016x}"
             drf.update(
                 f"[b magenta]dereferencing[/]: [b i]yes[/]; results are from " + self.color_groupings(hex_string)
@@ -166,19 +183,12 @@ class Inspector(Widget):
             data = bytes.fromhex(address)
             drf.update("[b magenta]dereferencing[/]: [b i]no[/]")
 
-        type_spray = {}
-        type_spray["u8"] = int.from_bytes(data[:1], "little", signed=False)
-        type_spray["u16"] = int.from_bytes(data[:2], "little", signed=False)
-        type_spray["u32"] = int.from_bytes(data[:4], "little", signed=False)
-        type_spray["u64"] = int.from_bytes(data[:8], "little", signed=False)
-        type_spray["i8"] = int.from_bytes(data[:1], "little", signed=True)
-        type_spray["i16"] = int.from_bytes(data[:2], "little", signed=True)
-        type_spray["i32"] = int.from_bytes(data[:4], "little", signed=True)
-        type_spray["i64"] = int.from_bytes(data[:8], "little", signed=True)
-        type_spray["f32"] = struct.unpack("f", data[:4])[0]
-        type_spray["f64"] = struct.unpack("d", data[:8])[0]
+        table = SprayTable(addr, data)
+        type_spray = {name: table.value(name, 0) for name in TYPES}
 
-        type_spray["str"] = data.decode("ascii", errors="ignore")
+        # a longer look for the string; it may run off the mapping, though
+        text = self.memory.read(addr, 64) if dereferencing else None
+        type_spray["str"] = escape(preview(text or data))
 
         # this threw internal errors?
         # string = self.process.ReadCStringFromMemory(addr, 256, error)
@@ -187,8 +197,8 @@ class Inspector(Widget):
         # else:
         #     type_spray['str'] = "[i red]n/a[/]"
 
-        ptr = self.process.ReadPointerFromMemory(int.from_bytes(data[:8], "big", signed=False), error)
-        if error.Success():
+        ptr = self.memory.read_pointer(int.from_bytes(data[:8], "big", signed=False))
+        if ptr is not None:
             # have to reverse order of pairs here
             hex_str = f"{ptr:016x}"
             type_spray["ptr"] = self.color_groupings("".join(reversed([hex_str[i:i+2] for i in range(0, len(hex_str), 2)])))
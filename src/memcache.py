@@ -0,0 +1,135 @@
+"""
+page-granular cache over process memory.
+
+every view that reads inferior memory goes through one `MemoryCache`, which
+reads whole pages, merges runs of missing pages into single reads, and drops
+everything as soon as the process's stop id moves on.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import lldb
+
+from profiler import PROFILER
+
+PAGE_SIZE = 4096
+
+
+class MemoryCache:
+    """Pages of inferior memory, valid for one stop."""
+
+    def __init__(self, page_size: int = PAGE_SIZE) -> None:
+        self.page_size = page_size
+        self.process: Optional[lldb.SBProcess] = None
+        self.stop_id = -1
+        # page number -> contents, or None if the page couldn't be read
+        self.pages: Dict[int, Optional[bytes]] = {}
+        # called with (address, size) after every write
+        self.listeners: List[Callable[[int, int], None]] = []
+        self.hits = 0
+        self.misses = 0
+
+    def attach(self, process: lldb.SBProcess) -> None:
+        if self.process is None or process.GetUniqueID() != self.process.GetUniqueID():
+            self.process = process
+            self.invalidate()
+        self.sync()
+
+    def sync(self) -> None:
+        """Drop every page if the process has run since they were read."""
+        stop_id = self.process.GetStopID() if self.process else -1
+        # memory the inferior is still changing is only good for one read
+        running = not self.process or self.process.GetState() != lldb.eStateStopped
+        if stop_id != self.stop_id or running:
+            self.stop_id = stop_id
+            self.pages.clear()
+
+    def invalidate(self, address: Optional[int] = None, size: int = 1) -> None:
+        if address is None:
+            self.pages.clear()
+            self.stop_id = -1
+            return
+        first = address // self.page_size
+        last = (address + size - 1) // self.page_size
+        for page in range(first, last + 1):
+            self.pages.pop(page, None)
+
+    def prefetch(self, ranges: Iterable[Tuple[int, int]]) -> None:
+        """Load every page touched by `ranges`, merging runs into single reads."""
+        self.sync()
+        wanted = set()
+        for address, size in ranges:
+            if size > 0:
+                first = address // self.page_size
+                last = (address + size - 1) // self.page_size
+                wanted.update(range(first, last + 1))
+
+        missing = sorted(page for page in wanted if page not in self.pages)
+        self.hits += len(wanted) - len(missing)
+        self.misses += len(missing)
+
+        run: List[int] = []
+        for page in missing:
+            if run and page != run[-1] + 1:
+                self.load(run)
+                run = []
+            run.append(page)
+        if run:
+            self.load(run)
+
+    def load(self, run: List[int]) -> None:
+        """Read consecutive pages in one go, falling back page by page."""
+        error = lldb.SBError()
+        address = run[0] * self.page_size
+        with PROFILER.span("ReadMemory", "lldb"):
+            data = self.process.ReadMemory(address, len(run) * self.page_size, error)
+        if error.Success() and data is not None:
+            for index, page in enumerate(run):
+                start = index * self.page_size
+                self.pages[page] = data[start : start + self.page_size]
+        elif len(run) == 1:
+            self.pages[run[0]] = None
+        else:
+            # part of the run is unmapped; find out which part
+            for page in run:
+                self.load([page])
+
+    def read(self, address: int, size: int) -> Optional[bytes]:
+        """Read `size` bytes, or None if any of them is unreadable."""
+        if size <= 0 or address < 0:
+            return b""
+        if not self.process:
+            return None
+        self.prefetch([(address, size)])
+        first = address // self.page_size
+        last = (address + size - 1) // self.page_size
+        chunks = []
+        for page in range(first, last + 1):
+            data = self.pages.get(page)
+            if data is None:
+                return None
+            chunks.append(data)
+        offset = address - first * self.page_size
+        return b"".join(chunks)[offset : offset + size]
+
+    def read_pointer(self, address: int) -> Optional[int]:
+        if not self.process:
+            return None
+        size = self.process.GetAddressByteSize() or 8
+        data = self.read(address, size)
+        if data is None:
+            return None
+        order = "big" if self.process.GetByteOrder() == lldb.eByteOrderBig else "little"
+        return int.from_bytes(data, order)
+
+    def write(self, address: int, data: bytes) -> bool:
+        if not self.process:
+            return False
+        error = lldb.SBError()
+        self.process.WriteMemory(address, data, error)
+        self.invalidate(address, len(data))
+        for listener in self.listeners:
+            listener(address, len(data))
+        return error.Success()
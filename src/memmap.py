@@ -0,0 +1,68 @@
+"""
+the process's mapped regions, with lookups by address.
+
+shared by everything that has to tell a pointer from a number: the hex view,
+the spray table and the scanners.
+"""
+
+from __future__ import annotations
+
+from typing import Iterator, List, NamedTuple, Optional
+
+import bisect
+import lldb
+
+
+class Region(NamedTuple):
+    """One mapped memory region of the process."""
+
+    base: int
+    end: int
+    permissions: str
+    name: str
+
+
+def regions(process: lldb.SBProcess) -> List[Region]:
+    """All readable regions, from `SBProcess.GetMemoryRegions()`."""
+    found = []
+    infos = process.GetMemoryRegions()
+    info = lldb.SBMemoryRegionInfo()
+    for index in range(infos.GetSize()):
+        if not infos.GetMemoryRegionAtIndex(index, info) or not info.IsReadable():
+            continue
+        permissions = (
+            "r"
+            + ("w" if info.IsWritable() else "-")
+            + ("x" if info.IsExecutable() else "-")
+        )
+        found.append(
+            Region(info.GetRegionBase(), info.GetRegionEnd(), permissions, info.GetName() or "")
+        )
+    return found
+
+
+class RegionMap:
+    """Regions sorted by base address; `find` is a bisect, not a scan."""
+
+    def __init__(self, found: List[Region]) -> None:
+        self.regions = sorted(found)
+        self.bases = [region.base for region in self.regions]
+
+    @classmethod
+    def of(cls, process: Optional[lldb.SBProcess]) -> RegionMap:
+        return cls(regions(process) if process else [])
+
+    def find(self, address: int) -> Optional[Region]:
+        index = bisect.bisect_right(self.bases, address) - 1
+        if index >= 0 and address < self.regions[index].end:
+            return self.regions[index]
+        return None
+
+    def __contains__(self, address: int) -> bool:
+        return self.find(address) is not None
+
+    def __iter__(self) -> Iterator[Region]:
+        return iter(self.regions)
+
+    def __len__(self) -> int:
+        return len(self.regions)
@@ -1,12 +1,29 @@
+from __future__ import annotations
+
+from rich.markup import escape
+from rich.text import Text
 from textual import on
 from textual.app import ComposeResult
 from textual.containers import Grid
 from textual.events import Key
 from textual.screen import ModalScreen
 from textual.widgets import (
+    Input,
     Label,
-    RichLog,
 )
+from textual.worker import get_current_worker
+
+from typing import Callable, Iterator, List, Optional, Tuple, Union
+
+import lldb
+
+from pointers import MAX_OFFSET, PointerChain, PointerMap
+from scanner import Value, ValueScan
+from spray import TYPES
+from strings import StringHit, StringIndex
+from symbols import SymbolIndex, SymbolRecord
+from virtuallist import VirtualList, fuzzy
+from xrefs import Xref, XrefIndex
 
 
 class Notif(ModalScreen[str]):
@@ -15,34 +32,450 @@ class Notif(ModalScreen[str]):
         self.dismiss()
 
 
-class SymbolNotif(Notif):
-    """Display the symbols found in the target."""
+class ListNotif(ModalScreen[str]):
+    """A title, a list to move through, a label and an input under it.
+
+    Subclasses hand the list to `__init__` and give the texts around it as
+    class attributes; the ids of the label and the input are `prefix`
+    followed by `-label` and `-query`. The input has focus once mounted;
+    textual still runs a subclass's own `on_mount`.
+    """
+
+    BINDINGS = [
+        ("up", "move(-1)"),
+        ("down", "move(1)"),
+        ("pageup", "page(-1)"),
+        ("pagedown", "page(1)"),
+    ]
 
-    symbols: list[str] = []
+    prefix = ""
+    heading = ""
+    hint = ""
+    placeholder = ""
 
-    def __init__(self, symbols: list[str]) -> None:
+    def __init__(self, listing: VirtualList) -> None:
         super().__init__()
-        self.symbols = symbols
+        self.listing = listing
 
     def compose(self) -> ComposeResult:
         yield Grid(
-            Label("[b]symbols found in target:"),
-            RichLog(id="symbols", markup=True, classes="scroller"),
+            Label(f"[b]{self.heading}", id=f"{self.prefix}-title"),
+            self.listing,
+            Label(self.hint, id=f"{self.prefix}-label"),
+            Input("", placeholder=self.placeholder, id=f"{self.prefix}-query"),
             classes="big-modal",
         )
 
     def on_mount(self) -> None:
-        symbols = self.query_one("#symbols", RichLog)
-        symbols.clear()
+        self.query_one(f"#{self.prefix}-query", Input).focus()
+
+    def action_move(self, rows: int) -> None:
+        self.listing.action_move(rows)
+
+    def action_page(self, pages: int) -> None:
+        self.listing.action_page(pages)
+
+    @on(Key)
+    def esc(self, event: Key) -> None:
+        if event.key == "escape":
+            self.dismiss()
+
+
+def symbol_matcher(query: str) -> Callable[[str], bool]:
+    """Fuzzy matching, or a plain prefix match for queries starting with `^`."""
+    if query.startswith("^"):
+        prefix = query[1:]
+        return lambda key: key.startswith(prefix)
+    return fuzzy(query)
+
+
+def symbol_row(record: SymbolRecord) -> Text:
+    text = Text(" ")
+    text.append(f"0x{record.start:x}-0x{record.end:x} ", "blue")
+    text.append(f"{record.type} ", "magenta")
+    text.append(record.demangled, "green")
+    text.append(f" {record.module}", "bright_black")
+    return text
+
+
+class SymbolNotif(ListNotif):
+    """Search the symbols found in the target.
+
+    Symbols stream in from the index in the background, so the screen opens at
+    once. Matching is fuzzy on the demangled name; start the query with `@` to
+    search shared libraries too, or with `^` for a plain prefix match.
+    """
+
+    prefix = "s"
+    heading = "symbols found in target:"
+    hint = "filter; @ to include libraries, ^ for prefix only"
+    placeholder = "symbol name"
+
+    def __init__(self, index: SymbolIndex) -> None:
+        super().__init__(
+            VirtualList(
+                symbol_row,
+                lambda record: record.demangled,
+                matcher=symbol_matcher,
+                id="symbols",
+                classes="scroller",
+            )
+        )
+        self.index = index
+        self.libraries = False
+
+    def on_mount(self) -> None:
+        self.listing.stream(self.index.batches(self.libraries))
+
+    @on(Input.Changed)
+    def filter(self, event: Input.Changed) -> None:
+        symbols = self.listing
+        libraries = event.value.startswith("@")
+        if libraries != self.libraries:
+            # libraries are only ever read when asked for
+            self.libraries = libraries
+            symbols.stream(self.index.batches(libraries))
+        symbols.filter(event.value.lstrip("@"))
+
+
+def string_row(hit: StringHit) -> Text:
+    text = Text(" ")
+    text.append(f"0x{hit.address:x} ", "blue")
+    text.append(f"{hit.encoding:<8} ", "magenta")
+    text.append(hit.text.replace("\n", "\\n"), "green")
+    return text
+
 
-        for symbol in self.symbols:
-            symbol_parts = symbol.split(", ")
-            id = int(
-                symbol_parts[0].split(" = ")[1].replace("{", "").replace("}", ""), 16
+class StringNotif(ListNotif):
+    """Search the strings in the process's memory.
+
+    The index is rebuilt in the background when the process has run since the
+    last scan. Enter dismisses with the highlighted string's address, in hex.
+    """
+
+    prefix = "t"
+    heading = "strings in memory:"
+    hint = "scanning..."
+    placeholder = "text"
+
+    def __init__(self, index: StringIndex, process: lldb.SBProcess) -> None:
+        super().__init__(
+            VirtualList(
+                string_row,
+                lambda hit: hit.text.lower(),
+                matcher=lambda query: lambda key: query in key,
+                id="strings",
+                classes="scroller",
             )
-            range = symbol_parts[1].split(" = ")[1]
-            name = symbol_parts[2].split("=")[1]
-            symbols.write(f" [b cyan]{id}[/]: from [blue]{range}[/]; [green]{name}[/]")
+        )
+        self.index = index
+        self.process = process
+
+    def on_mount(self) -> None:
+        self.listing.stream(self.batches())
+
+    def batches(self) -> Iterator[List[StringHit]]:
+        """Runs on the list's worker thread."""
+        if self.index.stale(self.process):
+            worker = get_current_worker()
+            self.index.scan(self.process, cancelled=lambda: worker.is_cancelled)
+        label = self.query_one("#t-label", Label)
+        self.app.call_from_thread(label.update, f"{len(self.index)} strings; filter by text")
+        yield from self.index.batches()
+
+    @on(Input.Changed)
+    def filter(self, event: Input.Changed) -> None:
+        self.listing.filter(event.value)
+
+    @on(Input.Submitted)
+    def submit(self) -> None:
+        hit = self.listing.highlighted
+        if hit is not None:
+            self.dismiss(f"{hit.address:x}")
+
+
+# hits listed at once; the count covers the rest
+SCAN_SHOWN = 10_000
+
+
+def scan_row(hit: Tuple[int, Value]) -> Text:
+    address, value = hit
+    text = Text(" ")
+    text.append(f"0x{address:x} ", "blue")
+    if isinstance(value, bytes):
+        text.append(value.hex(" "), "green")
+    elif isinstance(value, float):
+        text.append(f"{value:g}", "green")
+    else:
+        text.append(f"{value} (0x{value & (1 << 64) - 1:x})", "green")
+    return text
+
+
+class ScanNotif(ListNotif):
+    """Scan writable memory for a value, then narrow the hits over later stops.
+
+    `u32 1234` or `bytes 48 8b ?? 24` starts a scan; anything else, such as
+    `changed` or `== 5`, narrows the current one. Enter on an empty input
+    dismisses with the highlighted hit's address, in hex.
+    """
+
+    prefix = "v"
+    heading = "value scan:"
+    placeholder = "u32 1234 | changed | == 5"
+
+    def __init__(
+        self,
+        process: lldb.SBProcess,
+        scan: Optional[ValueScan],
+        keep: Callable[[ValueScan], None],
+    ) -> None:
+        super().__init__(
+            VirtualList(
+                scan_row,
+                lambda hit: f"{hit[0]:x}",
+                id="hits",
+                classes="scroller",
+            )
+        )
+        self.process = process
+        self.scan = scan
+        self.keep = keep
+
+    def on_mount(self) -> None:
+        self.show_scan()
+
+    def show_scan(self) -> None:
+        label = self.query_one("#v-label", Label)
+        hits = self.listing
+        if self.scan is None:
+            label.update("start with a kind and value: u8..u64, i8..i64, f32, f64, bytes")
+            return
+        label.update(
+            f"{len(self.scan)} {self.scan.kind} hits after {self.scan.rounds} rounds; "
+            "narrow with changed, unchanged, increased, decreased or == x"
+        )
+        hits.clear()
+        hits.extend(self.scan.hits(SCAN_SHOWN))
+
+    @on(Input.Submitted)
+    def submit(self, event: Input.Submitted) -> None:
+        text = event.value.strip()
+        if not text:
+            hit = self.listing.highlighted
+            if hit is not None:
+                self.dismiss(f"{hit[0]:x}")
+            return
+        event.input.value = ""
+        self.query_one("#v-label", Label).update("scanning...")
+        self.run_worker(lambda: self.work(text), thread=True, exclusive=True, group="scan")
+
+    def work(self, text: str) -> None:
+        worker = get_current_worker()
+        kind, _, rest = text.partition(" ")
+        try:
+            if self.scan is None or kind in ("bytes", *TYPES):
+                scan = ValueScan.start(
+                    self.process, kind, rest, cancelled=lambda: worker.is_cancelled
+                )
+            else:
+                scan = self.scan
+                scan.narrow(self.process, text, cancelled=lambda: worker.is_cancelled)
+        except ValueError as error:
+            label = self.query_one("#v-label", Label)
+            self.app.call_from_thread(label.update, f"[red]{escape(str(error))}")
+            return
+        self.app.call_from_thread(self.done, scan)
+
+    def done(self, scan: ValueScan) -> None:
+        self.scan = scan
+        self.keep(scan)
+        self.show_scan()
+
+
+# (source, target) or a chain to the queried address
+PointerRow = Union[Tuple[int, int], PointerChain]
+
+
+def pointer_row(row: PointerRow) -> Text:
+    text = Text(" ")
+    if isinstance(row, PointerChain):
+        text.append(f"0x{row.address:x} ", "blue")
+        text.append(row.describe(), "green")
+        return text
+    source, target = row
+    text.append(f"0x{source:x} ", "blue")
+    text.append(f"-> 0x{target:x}", "green")
+    return text
+
+
+class PointerNotif(ListNotif):
+    """Find what points at an address, or chains to it from a module's statics.
+
+    An expression lists the pointers to anywhere up to `MAX_OFFSET` bytes
+    before its value; `chains` and an expression lists pointer chains from
+    module memory instead. The map is rebuilt in the background when the
+    process has run since. Enter on an empty input dismisses with the
+    highlighted source's address, in hex.
+    """
+
+    prefix = "l"
+    heading = "pointers to:"
+    hint = "an address, or chains and an address"
+    placeholder = "rsp + 8 | chains 0x601040"
+
+    def __init__(
+        self,
+        process: lldb.SBProcess,
+        pointers: Optional[PointerMap],
+        keep: Callable[[PointerMap], None],
+        evaluate: Callable[[str], int],
+        locate: Callable[[int], Optional[Tuple[str, int]]],
+    ) -> None:
+        super().__init__(
+            VirtualList(
+                pointer_row,
+                lambda row: f"{row.address if isinstance(row, PointerChain) else row[0]:x}",
+                id="pointers",
+                classes="scroller",
+            )
+        )
+        self.process = process
+        self.pointers = pointers
+        self.keep = keep
+        self.evaluate = evaluate
+        self.locate = locate
+
+    @on(Input.Submitted)
+    def submit(self, event: Input.Submitted) -> None:
+        text = event.value.strip()
+        if not text:
+            row = self.listing.highlighted
+            if row is not None:
+                source = row.address if isinstance(row, PointerChain) else row[0]
+                self.dismiss(f"{source:x}")
+            return
+        label = self.query_one("#l-label", Label)
+        chains = text.split(None, 1)[0] == "chains"
+        try:
+            address = self.evaluate(text[len("chains") :] if chains else text)
+        except ValueError as error:
+            label.update(f"[red]{escape(str(error))}")
+            return
+        event.input.value = ""
+        if self.pointers is None or self.pointers.stale(self.process):
+            label.update("mapping pointers...")
+        else:
+            label.update("searching...")
+        self.run_worker(
+            lambda: self.work(address, chains), thread=True, exclusive=True, group="pointers"
+        )
+
+    def work(self, address: int, chains: bool) -> None:
+        worker = get_current_worker()
+        pointers = self.pointers
+        if pointers is None or pointers.stale(self.process):
+            pointers = PointerMap.build(self.process, cancelled=lambda: worker.is_cancelled)
+            if worker.is_cancelled:
+                return
+        rows: List[PointerRow]
+        if chains:
+            rows = list(pointers.chains(address, self.locate))
+        else:
+            rows = pointers.into(max(0, address - MAX_OFFSET), address + 1)
+            # nearest the address first
+            rows.sort(key=lambda row: -row[1])
+        self.app.call_from_thread(self.done, pointers, address, chains, rows)
+
+    def done(
+        self, pointers: PointerMap, address: int, chains: bool, rows: List[PointerRow]
+    ) -> None:
+        self.pointers = pointers
+        self.keep(pointers)
+        kind = "chains" if chains else "pointers"
+        self.query_one("#l-label", Label).update(
+            f"{len(rows)} {kind} to 0x{address:x}, out of {len(pointers)} pointers in memory"
+        )
+        self.listing.clear()
+        self.listing.extend(rows)
+
+
+# (whether it comes into the function, the reference)
+XrefRow = Tuple[bool, Xref]
+
+
+def xref_row(index: XrefIndex, row: XrefRow) -> Text:
+    incoming, xref = row
+    text = Text(" ")
+    text.append("<- " if incoming else "-> ", "magenta")
+    text.append(f"{xref.kind:<7}", "bright_black")
+    site = xref.source if incoming else xref.target
+    text.append(f"0x{site:x} ", "blue")
+    if xref.kind == "string":
+        text.append(repr(xref.text), "green")
+    else:
+        text.append(index.name(site), "green")
+    return text
+
+
+class XrefNotif(ListNotif):
+    """Callers and callees of a function, from the static xref index.
+
+    Enter a symbol name or an address to list who calls or jumps into its
+    function, and what it calls, jumps out to, and which strings it uses.
+    Enter on an empty input dismisses with an address to break on, in hex:
+    the call site for a caller, the callee for a call, the instruction
+    using it for a string.
+    """
+
+    prefix = "j"
+    heading = "cross references:"
+    placeholder = "function name or address"
+
+    def __init__(self, index: XrefIndex, symbols: SymbolIndex) -> None:
+        super().__init__(
+            VirtualList(
+                lambda row: xref_row(self.index, row),
+                lambda row: f"{row[1].source:x}",
+                id="xrefs",
+                classes="scroller",
+            )
+        )
+        self.index = index
+        self.symbols = symbols
+        self.hint = self.progress()
+
+    def progress(self) -> str:
+        done, total = self.index.progress()
+        if self.index.complete:
+            return f"{done} functions analysed"
+        return f"analysing... {done}/{total} functions so far"
+
+    @on(Input.Submitted)
+    def submit(self, event: Input.Submitted) -> None:
+        text = event.value.strip()
+        label = self.query_one("#j-label", Label)
+        if not text:
+            row = self.listing.highlighted
+            if row is not None:
+                incoming, xref = row
+                site = xref.target if not incoming and xref.kind != "string" else xref.source
+                self.dismiss(f"{self.index.load_address(site):x}")
+            return
+
+        try:
+            record = self.index.function(int(text, 0))
+        except ValueError:
+            record = self.symbols.lookup(text)
+        if record is None:
+            label.update(f"[red]no function at or named {escape(text)}")
+            return
+
+        event.input.value = ""
+        rows: List[XrefRow] = [(True, xref) for xref in self.index.callers(record)]
+        rows.extend((False, xref) for xref in self.index.callees(record))
+        label.update(f"{escape(record.demangled)}: {len(rows)} references; {self.progress()}")
+        self.listing.clear()
+        self.listing.extend(rows)
 
 
 class ErrorNotif(Notif):
@@ -0,0 +1,63 @@
+from rich.text import Text
+from textual.widgets import Static
+
+from typing import Optional
+
+from memcache import MemoryCache
+from profiler import BUCKET_LABELS, PROFILER, Profiler
+
+BARS = " ▁▂▃▄▅▆▇█"
+# seconds between redraws while the panel is showing
+INTERVAL = 0.5
+
+
+def histogram_bars(histogram: tuple) -> str:
+    tallest = max(histogram) or 1
+    return "".join(BARS[round(count / tallest * (len(BARS) - 1))] for count in histogram)
+
+
+class ProfilerPanel(Static):
+    """Overlay with recent latencies of lldb calls and widget updates."""
+
+    def __init__(
+        self,
+        memory: MemoryCache,
+        profiler: Profiler = PROFILER,
+        *,
+        id: Optional[str] = None,
+    ) -> None:
+        super().__init__(id=id)
+        self.memory = memory
+        self.profiler = profiler
+
+    def on_mount(self) -> None:
+        self.timer = self.set_interval(INTERVAL, self.redraw, pause=not self.display)
+
+    def toggle(self) -> None:
+        self.display = not self.display
+        if self.display:
+            self.redraw()
+            self.timer.resume()
+        else:
+            self.timer.pause()
+
+    def redraw(self) -> None:
+        text = Text()
+        text.append(f"{'operation':<18}{'n':>7}{'p50':>9}{'p95':>9}{'max':>9}  histogram\n", "b")
+        category = None
+        for stat in self.profiler.stats():
+            if stat.category != category:
+                category = stat.category
+                text.append(f"{category}\n", "magenta")
+            text.append(f"{stat.name[:17]:<18}{stat.count:>7}")
+            for seconds in (stat.median, stat.p95, stat.worst):
+                text.append(f"{seconds * 1000:>7.2f}ms", "red" if seconds > 0.016 else "")
+            text.append("  " + " ".join(histogram_bars(stat.histogram)) + "\n", "purple")
+
+        total = self.memory.hits + self.memory.misses
+        rate = self.memory.hits / total if total else 0
+        text.append("\nmemory cache ", "magenta")
+        text.append(f"{self.memory.hits} hits, {self.memory.misses} misses ({rate:.0%})\n")
+        text.append("buckets (ms) ", "bright_black")
+        text.append(" ".join(BUCKET_LABELS), "bright_black")
+        self.update(text)
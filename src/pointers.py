@@ -0,0 +1,211 @@
+"""
+pointer map: every aligned qword in memory that points into a mapped region.
+
+a qword can only point into a region if its high bytes match the region's
+addresses, so instead of testing every qword, each chunk is searched with
+`bytes.find` for those high bytes, and only the aligned hits are checked
+against the region map. the map is kept as two arrays sorted by target, so
+"what points at x" is a binary search:
+
+    pointers = PointerMap.build(process)
+    pointers.to(0x7ffeefbff5a0)                  # sources of exact pointers
+    pointers.into(start, end)                    # sources of pointers into a range
+    pointers.chains(0x600010, statics(target))   # module+offset -> ... -> x
+"""
+
+from __future__ import annotations
+
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import bisect
+import lldb
+import os
+
+from memmap import Region, RegionMap, regions as readable_regions
+
+# bytes per read
+CHUNK = 1 << 20
+WORKERS = min(8, os.cpu_count() or 1)
+# how far into a structure a chain may reach at each level
+MAX_OFFSET = 0x400
+# pointers followed per level of a chain search
+MAX_FRONTIER = 20_000
+
+# at most this many distinct high-byte prefixes are searched per region;
+# bigger regions are matched on fewer, higher bytes
+PREFIXES = 16
+
+
+class PointerChain(NamedTuple):
+    """`module+base`, then one offset per dereference, ends at the target."""
+
+    # where `module+base` is loaded right now
+    address: int
+    module: str
+    base: int
+    offsets: Tuple[int, ...]
+
+    def describe(self) -> str:
+        hops = "".join(f" -> +0x{offset:x}" for offset in self.offsets)
+        return f"{self.module}+0x{self.base:x}{hops}"
+
+
+def needles(regions: RegionMap) -> Set[Tuple[bytes, int]]:
+    """(high bytes, where they sit in a qword) for pointers into any region.
+
+    The more bytes a needle has, the fewer false hits, but the more needles
+    a big region needs; each region gets the longest ones it can afford.
+    """
+    found: Set[Tuple[bytes, int]] = set()
+    for region in regions:
+        for shift in range(2, 8):
+            first = region.base >> (shift * 8)
+            last = (region.end - 1) >> (shift * 8)
+            if first == 0:
+                # too low to tell pointers from small numbers
+                break
+            if last - first < PREFIXES:
+                for prefix in range(first, last + 1):
+                    found.add((prefix.to_bytes(8 - shift, "little"), shift))
+                break
+    # a needle ending in a shorter one finds nothing the shorter one doesn't,
+    # and searching both would index the same qwords twice
+    return {
+        (needle, shift)
+        for needle, shift in found
+        if not any(
+            other > shift and needle[other - shift :] == high for high, other in found
+        )
+    }
+
+
+def statics(target: lldb.SBTarget) -> Callable[[int], Optional[Tuple[str, int]]]:
+    """(module name, offset from its load address) for addresses inside a module."""
+
+    def locate(address: int) -> Optional[Tuple[str, int]]:
+        module = target.ResolveLoadAddress(address).GetModule()
+        if not module:
+            return None
+        header = module.GetObjectFileHeaderAddress().GetLoadAddress(target)
+        if header == lldb.LLDB_INVALID_ADDRESS:
+            return None
+        return module.GetFileSpec().GetFilename(), address - header
+
+    return locate
+
+
+class PointerMap:
+    """(source, target) pairs, sorted by target."""
+
+    def __init__(self, sources: array, targets: array, stop_id: int = -1) -> None:
+        self.sources = sources
+        self.targets = targets
+        self.stop_id = stop_id
+
+    def __len__(self) -> int:
+        return len(self.targets)
+
+    @classmethod
+    def build(
+        cls,
+        process: lldb.SBProcess,
+        regions: Optional[Iterable[Region]] = None,
+        cancelled: Callable[[], bool] = lambda: False,
+        workers: int = WORKERS,
+    ) -> PointerMap:
+        """Sweep `regions`, or every readable one, in parallel."""
+        mapped = RegionMap(list(regions) if regions is not None else readable_regions(process))
+        searched = needles(mapped)
+
+        def sweep(region: Region) -> Tuple[array, array]:
+            sources = array("Q")
+            targets = array("Q")
+            # qword aligned, so offsets into a chunk are aligned too
+            address = (region.base + 7) & ~7
+            while address < region.end and not cancelled():
+                size = min(CHUNK, region.end - address) & ~7
+                if not size:
+                    break
+                error = lldb.SBError()
+                data = process.ReadMemory(address, size, error)
+                if error.Success() and data:
+                    qwords = memoryview(data).cast("Q")
+                    for needle, shift in searched:
+                        offset = data.find(needle)
+                        while offset >= 0:
+                            index, skew = divmod(offset - shift, 8)
+                            if skew == 0 and index >= 0:
+                                value = qwords[index]
+                                if mapped.find(value) is not None:
+                                    sources.append(address + index * 8)
+                                    targets.append(value)
+                                offset = data.find(needle, offset + 8)
+                            else:
+                                offset = data.find(needle, offset + 1)
+                address += size
+            return sources, targets
+
+        sources = array("Q")
+        targets = array("Q")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="abh-pointers") as pool:
+            for found, pointed in pool.map(sweep, list(mapped)):
+                sources.extend(found)
+                targets.extend(pointed)
+        order = sorted(range(len(targets)), key=targets.__getitem__)
+        return cls(
+            array("Q", (sources[index] for index in order)),
+            array("Q", (targets[index] for index in order)),
+            process.GetStopID(),
+        )
+
+    def stale(self, process: lldb.SBProcess) -> bool:
+        return not process or process.GetStopID() != self.stop_id
+
+    def into(self, start: int, end: int) -> List[Tuple[int, int]]:
+        """(source, target) for every pointer to an address in [start, end)."""
+        first = bisect.bisect_left(self.targets, start)
+        last = bisect.bisect_left(self.targets, end)
+        return [(self.sources[index], self.targets[index]) for index in range(first, last)]
+
+    def to(self, address: int) -> List[int]:
+        """Addresses holding a pointer to exactly `address`."""
+        return [source for source, _ in self.into(address, address + 1)]
+
+    def chains(
+        self,
+        address: int,
+        locate: Callable[[int], Optional[Tuple[str, int]]],
+        depth: int = 4,
+        max_offset: int = MAX_OFFSET,
+        limit: int = 100,
+    ) -> List[PointerChain]:
+        """Chains from a module's memory to `address`, shortest first.
+
+        Searches backwards a level at a time: whatever points at most
+        `max_offset` bytes before a node becomes a node of the next level.
+        """
+        found: List[PointerChain] = []
+        # node address -> offsets from it to `address`
+        frontier: Dict[int, Tuple[int, ...]] = {address: ()}
+        seen: Set[int] = {address}
+        for _ in range(depth):
+            following: Dict[int, Tuple[int, ...]] = {}
+            for node, offsets in frontier.items():
+                for source, target in self.into(max(0, node - max_offset), node + 1):
+                    if source in seen:
+                        continue
+                    seen.add(source)
+                    path = (node - target,) + offsets
+                    static = locate(source)
+                    if static is not None:
+                        found.append(PointerChain(source, static[0], static[1], path))
+                        if len(found) >= limit:
+                            return found
+                    elif len(following) < MAX_FRONTIER:
+                        following[source] = path
+            if not following:
+                break
+            frontier = following
+        return found
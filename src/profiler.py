@@ -0,0 +1,126 @@
+"""
+lightweight timing of lldb calls and widget updates.
+
+spans are recorded into a rolling window per operation, for the overlay's
+histograms, and into a bounded list of chrome trace events, which can be
+dumped and opened in perfetto or chrome://tracing.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+import json
+import os
+import threading
+import time
+
+# upper bounds of the histogram buckets, in seconds; the last one is open
+BUCKETS = (0.0001, 0.0003, 0.001, 0.003, 0.01, 0.03, 0.1)
+BUCKET_LABELS = ("<.1", "<.3", "<1", "<3", "<10", "<30", "<100", "100+")
+
+
+class OperationStats(NamedTuple):
+    """Summary of one operation's recent samples, in seconds."""
+
+    name: str
+    category: str
+    count: int
+    median: float
+    p95: float
+    worst: float
+    histogram: Tuple[int, ...]
+
+
+class Span:
+    """Times one `with` block."""
+
+    __slots__ = ("profiler", "name", "category", "start")
+
+    def __init__(self, profiler: Profiler, name: str, category: str) -> None:
+        self.profiler = profiler
+        self.name = name
+        self.category = category
+        self.start = 0.0
+
+    def __enter__(self) -> Span:
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.profiler.record(self.name, self.category, self.start, time.perf_counter())
+
+
+class Profiler:
+    """Rolling latencies per operation, plus a trace of recent spans."""
+
+    def __init__(self, window: int = 512, events: int = 100_000) -> None:
+        self.window = window
+        self.origin = time.perf_counter()
+        self.samples: Dict[Tuple[str, str], Deque[float]] = {}
+        self.totals: Dict[Tuple[str, str], int] = {}
+        # (name, category, start, duration, thread id)
+        self.events: Deque[Tuple[str, str, float, float, int]] = deque(maxlen=events)
+
+    def span(self, name: str, category: str = "app") -> Span:
+        return Span(self, name, category)
+
+    def record(self, name: str, category: str, start: float, end: float) -> None:
+        key = (name, category)
+        samples = self.samples.get(key)
+        if samples is None:
+            samples = self.samples.setdefault(key, deque(maxlen=self.window))
+        samples.append(end - start)
+        self.totals[key] = self.totals.get(key, 0) + 1
+        self.events.append((name, category, start, end - start, threading.get_ident()))
+
+    def stats(self) -> List[OperationStats]:
+        stats = []
+        for (name, category), samples in list(self.samples.items()):
+            ordered = sorted(samples)
+            if not ordered:
+                continue
+            histogram = [0] * (len(BUCKETS) + 1)
+            for sample in ordered:
+                bucket = 0
+                while bucket < len(BUCKETS) and sample >= BUCKETS[bucket]:
+                    bucket += 1
+                histogram[bucket] += 1
+            stats.append(
+                OperationStats(
+                    name=name,
+                    category=category,
+                    count=self.totals.get((name, category), len(ordered)),
+                    median=ordered[len(ordered) // 2],
+                    p95=ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                    worst=ordered[-1],
+                    histogram=tuple(histogram),
+                )
+            )
+        stats.sort(key=lambda stat: (stat.category, -stat.median))
+        return stats
+
+    def dump(self, path: Optional[str] = None) -> str:
+        """Write the recorded spans as chrome trace json; returns the path."""
+        path = path or f"abh-profile-{int(time.time())}.json"
+        pid = os.getpid()
+        events = [
+            {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": (start - self.origin) * 1e6,
+                "dur": duration * 1e6,
+                "pid": pid,
+                "tid": tid,
+            }
+            for name, category, start, duration, tid in list(self.events)
+        ]
+        with open(path, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+        return path
+
+
+# one profiler for the whole process; the engine thread records into it too
+PROFILER = Profiler()
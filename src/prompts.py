@@ -1,3 +1,4 @@
+from rich.text import Text
 from textual import on
 from textual.app import ComposeResult
 from textual.containers import Grid
@@ -6,10 +7,10 @@ from textual.screen import ModalScreen
 from textual.widgets import (
     Input,
     Label,
-    RichLog,
 )
 
-import lldb
+from breakpoints import BreakpointEntry, BreakpointRegistry, modifiers
+from virtuallist import VirtualList
 
 
 class Prompt(ModalScreen[str]):
@@ -35,39 +36,81 @@ class TargetPrompt(Prompt):
         )
 
 
+def breakpoint_row(entry: BreakpointEntry) -> Text:
+    text = Text(" ")
+    text.append(str(entry.id), "b cyan" if entry.enabled else "bright_black")
+    text.append(": ")
+    text.append(entry.name or "?", "green" if entry.enabled else "bright_black")
+    text.append(f" ({entry.kind}), locations = ")
+    text.append(str(entry.locations), "b magenta")
+    text.append(f", hits = {entry.hits}")
+    for modifier in modifiers(entry):
+        text.append(f" {modifier}", "yellow")
+    return text
+
+
 class BreakpointPrompt(Prompt):
-    """Prompt for setting the breakpoint."""
+    """Prompt for setting the breakpoint.
+
+    Up and down pick an existing breakpoint; ctrl+t toggles it and ctrl+x
+    deletes it.
+    """
 
-    breakpoints: list[lldb.SBBreakpoint] = []
+    BINDINGS = [
+        ("up", "move(-1)"),
+        ("down", "move(1)"),
+        ("ctrl+t", "toggle", "toggle"),
+        ("ctrl+x", "delete", "delete"),
+    ]
 
-    def __init__(self, breakpoints: list[lldb.SBBreakpoint]) -> None:
+    def __init__(self, registry: BreakpointRegistry) -> None:
         super().__init__()
-        self.breakpoints = breakpoints
+        self.registry = registry
 
     def compose(self) -> ComposeResult:
         yield Grid(
             Label("[b]existing breakpoints:"),
-            RichLog(id="bs", classes="scroller", markup=True),
-            Label("input the name of the symbol to break at", id="b-label"),
-            Input("", placeholder="name of symbol to break at", id="b-path"),
+            VirtualList(
+                breakpoint_row,
+                lambda entry: entry.name,
+                id="bs",
+                classes="scroller",
+            ),
+            Label("symbol, *address or /regex/; then once, after N, if <expr>", id="b-label"),
+            Input("", placeholder="where to break", id="b-path"),
             id="b-grid",
             classes="big-modal",
         )
 
     def on_mount(self) -> None:
         self.query_one("#b-path", Input).focus()
-        bs = self.query_one("#bs", RichLog)
-        bs.clear()
-
-        for bp in self.breakpoints:
-            bp_str = str(bp).replace("SBBreakpoint: ", "")
-            bp_parts = bp_str.split(", ")
-            id = bp.id
-            name = bp_parts[1].split(" ")[2]
-            locations = bp.num_locations
-            bs.write(
-                f" [b cyan]{id}[/]: name = [green]{name}[/], locations = [b magenta]{locations}[/]"
-            )
+        self.query_one(VirtualList).extend(self.registry.entries())
+
+    @on(Input.Changed)
+    def filter(self, event: Input.Changed) -> None:
+        self.query_one(VirtualList).filter(event.value)
+
+    def action_move(self, rows: int) -> None:
+        self.query_one(VirtualList).action_move(rows)
+
+    def action_toggle(self) -> None:
+        bs = self.query_one(VirtualList)
+        entry = bs.highlighted
+        if entry is None:
+            return
+        toggled = self.registry.toggle(entry.id)
+        if toggled is None:
+            bs.remove(entry)
+        else:
+            bs.replace(entry, toggled)
+
+    def action_delete(self) -> None:
+        bs = self.query_one(VirtualList)
+        entry = bs.highlighted
+        if entry is None:
+            return
+        self.registry.delete(entry.id)
+        bs.remove(entry)
 
 
 class ExaminePrompt(Prompt):
@@ -80,3 +123,15 @@ class ExaminePrompt(Prompt):
             id="x-grid",
             classes="modal",
         )
+
+
+class BatchPrompt(Prompt):
+    """Prompt for running a batch of steps without rendering each one."""
+
+    def compose(self) -> ComposeResult:
+        yield Grid(
+            Label("steps, or until an address, symbol or `rax == 0`", id="n-label"),
+            Input("", placeholder="e.g. 1000, 500 over, until main", id="n-path"),
+            id="n-grid",
+            classes="modal",
+        )
@@ -0,0 +1,99 @@
+from rich.text import Text
+from textual.app import ComposeResult
+from textual.containers import Grid
+from textual.geometry import Size
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+
+from typing import Dict, Iterable, List, Mapping, Optional, Set
+
+from snapshot import Register, StopSnapshot
+
+# column id for each register width, in bytes
+COLUMNS = {8: "regs64", 4: "regs32", 2: "regs16", 1: "regs8"}
+
+
+class RegisterColumn(ScrollView):
+    """Registers of one width, one fixed row each; rows repaint individually."""
+
+    def __init__(self, *, id: Optional[str] = None, classes: Optional[str] = None) -> None:
+        super().__init__(id=id, classes=classes)
+        self.rows: Dict[str, int] = {}
+        self.strips: List[Strip] = []
+
+    def set_layout(self, names: List[str]) -> None:
+        self.rows = {name: row for row, name in enumerate(names)}
+        self.strips = [Strip.blank(0)] * len(names)
+        self.virtual_size = Size(0, len(names))
+        self.refresh()
+
+    def set_register(self, reg: Register, changed: bool) -> None:
+        row = self.rows[reg.name]
+        text = Text.from_markup(f"[magenta]%[/]{reg.name: <6}: ", end="")
+        text.append(reg.hex(), "blue b r" if changed else "blue")
+        self.strips[row] = Strip(text.render(self.app.console), text.cell_len)
+        if text.cell_len > self.virtual_size.width:
+            self.virtual_size = Size(text.cell_len, len(self.strips))
+        self.refresh_line(row)
+
+    def render_line(self, y: int) -> Strip:
+        scroll_x, scroll_y = self.scroll_offset
+        row = scroll_y + y
+        width = self.size.width
+        if row >= len(self.strips):
+            return Strip.blank(width, self.rich_style)
+        return self.strips[row].crop_extend(scroll_x, scroll_x + width, self.rich_style)
+
+
+class RegisterTable(Grid):
+    """General purpose registers split into columns by width.
+
+    Only registers whose value changed since the last update, plus the ones
+    highlighted last time, are re-rendered.
+    """
+
+    def __init__(self, *, id: Optional[str] = None) -> None:
+        super().__init__(id=id)
+        self.values: Dict[str, int] = {}
+        self.highlighted: Set[str] = set()
+        self.columns: Dict[str, RegisterColumn] = {}
+
+    def compose(self) -> ComposeResult:
+        for column in COLUMNS.values():
+            yield RegisterColumn(id=column, classes="regs_item scroller")
+
+    def column(self, reg: Register) -> RegisterColumn:
+        return self.columns[COLUMNS.get(reg.size, "regs8")]
+
+    def update(self, snapshot: StopSnapshot) -> None:
+        self.show(snapshot.registers)
+
+    def show(self, registers: Mapping[str, Register]) -> None:
+        """Show a set of register values, highlighting what changed."""
+        if registers.keys() != self.values.keys():
+            self.relayout(registers.values())
+            for reg in registers.values():
+                self.column(reg).set_register(reg, False)
+            self.values = {name: reg.value for name, reg in registers.items()}
+            self.highlighted = set()
+            return
+
+        changed = {
+            name for name, reg in registers.items() if reg.value != self.values[name]
+        }
+        for name in changed | self.highlighted:
+            reg = registers[name]
+            self.column(reg).set_register(reg, name in changed)
+            self.values[name] = reg.value
+        self.highlighted = changed
+
+    def relayout(self, registers: Iterable[Register]) -> None:
+        self.columns = {
+            column: self.query_one(f"#{column}", RegisterColumn)
+            for column in COLUMNS.values()
+        }
+        names: Dict[str, List[str]] = {column: [] for column in COLUMNS.values()}
+        for reg in registers:
+            names[COLUMNS.get(reg.size, "regs8")].append(reg.name)
+        for column, widget in self.columns.items():
+            widget.set_layout(names[column])
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+from rich.text import Text
+from textual.containers import VerticalScroll
+from textual.widgets import Collapsible, Static
+
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import lldb
+import math
+
+from snapshot import Register, StopSnapshot
+
+# lane views for vector registers, cycled with `l`
+LANES = [
+    ("u8", "B"),
+    ("u16", "H"),
+    ("u32", "I"),
+    ("u64", "Q"),
+    ("f32", "f"),
+    ("f64", "d"),
+]
+
+X86_FLAGS = [
+    (0, "CF"),
+    (2, "PF"),
+    (4, "AF"),
+    (6, "ZF"),
+    (7, "SF"),
+    (8, "TF"),
+    (9, "IF"),
+    (10, "DF"),
+    (11, "OF"),
+]
+ARM_FLAGS = [(31, "N"), (30, "Z"), (29, "C"), (28, "V")]
+WIDTHS = {"B": 1, "H": 2, "I": 4, "Q": 8, "f": 4, "d": 8}
+
+
+def float80(data: bytes) -> float:
+    """Decode an x87 80-bit extended precision float."""
+    mantissa = int.from_bytes(data[:8], "little")
+    exponent = int.from_bytes(data[8:10], "little")
+    sign = -1.0 if exponent & 0x8000 else 1.0
+    exponent &= 0x7FFF
+    if exponent == 0x7FFF:
+        return sign * math.inf if mantissa << 1 == 0 else math.nan
+    try:
+        return sign * math.ldexp(mantissa, exponent - 16383 - 63)
+    except OverflowError:
+        return sign * math.inf
+
+
+def lanes(raw: List[Tuple[str, bytes]], lane: int) -> Dict[str, str]:
+    """Decode every vector register in `raw` with one cast per register size."""
+    label, code = LANES[lane]
+    by_size: Dict[int, List[Tuple[str, bytes]]] = {}
+    for name, data in raw:
+        by_size.setdefault(len(data), []).append((name, data))
+
+    width = WIDTHS[code]
+    decoded = {}
+    for size, regs in by_size.items():
+        if size % width:
+            continue
+        count = size // width
+        # one buffer and one cast for all registers of this size
+        values = memoryview(b"".join(data for _, data in regs)).cast(code)
+        for index, (name, _) in enumerate(regs):
+            chunk = values[index * count : (index + 1) * count]
+            if code in "fd":
+                cells = " ".join(f"{value:.6g}" for value in chunk)
+            else:
+                cells = " ".join(f"{value:0{width * 2}x}" for value in chunk)
+            decoded[name] = f"{label}x{count}: {cells}"
+    return decoded
+
+
+def flags(registers: Mapping[str, Register]) -> Optional[str]:
+    """Spell out the set bits of rflags/eflags or cpsr."""
+    tables = (("rflags", X86_FLAGS), ("eflags", X86_FLAGS), ("cpsr", ARM_FLAGS))
+    for name, table in tables:
+        if name in registers:
+            value = registers[name].value
+            bits = [flag for bit, flag in table if value >> bit & 1]
+            return f"{name} = {registers[name].hex()}  " + (" ".join(bits) or "-")
+    return None
+
+
+class RegisterSetPanel(Collapsible):
+    """One lldb register set; values are read only while it's expanded."""
+
+    def __init__(self, set_name: str) -> None:
+        self.body = Static("", classes="regset-body")
+        super().__init__(self.body, title=set_name.lower(), collapsed=True)
+        self.set_name = set_name
+        # (stop id, lane) the body currently shows
+        self.loaded: Tuple[int, int] = (-1, -1)
+
+    def load(self, snapshot: StopSnapshot, lane: int) -> None:
+        if self.loaded == (snapshot.stop_id, lane) or not snapshot.frame:
+            return
+        regset = snapshot.frame.GetRegisters().GetFirstValueByName(self.set_name)
+        error = lldb.SBError()
+        raw = []
+        scalars = []
+        for reg in regset:
+            size = reg.GetByteSize()
+            if size >= 10:
+                data = reg.GetData().ReadRawData(error, 0, size)
+                if error.Success():
+                    raw.append((reg.name, data))
+                    continue
+            scalars.append(Register(reg.name, reg.GetValueAsUnsigned(), size))
+
+        vectors = lanes([(name, data) for name, data in raw if len(data) != 10], lane)
+        text = Text()
+        for reg in scalars:
+            text.append(f"{reg.name: <8}", "magenta")
+            text.append(f"{reg.hex()}\n", "blue")
+        for name, data in raw:
+            text.append(f"{name: <8}", "magenta")
+            if len(data) == 10:
+                text.append(f"f80: {float80(data):.18g}\n", "blue")
+            else:
+                text.append(f"{vectors.get(name, data.hex())}\n", "blue")
+        text.rstrip()
+        self.body.update(text)
+        self.loaded = (snapshot.stop_id, lane)
+
+
+class FlagsPanel(Collapsible):
+    """Decoded flags register; comes straight from the snapshot."""
+
+    def __init__(self) -> None:
+        self.body = Static("", classes="regset-body")
+        super().__init__(self.body, title="flags", collapsed=False)
+
+    def load(self, snapshot: StopSnapshot, lane: int) -> None:
+        self.body.update(flags(snapshot.registers) or "[i]no flags register[/]")
+
+
+class RegisterSets(VerticalScroll):
+    """Collapsible non-general register sets, fetched lazily per stop."""
+
+    BINDINGS = [("l", "cycle_lanes", "lanes")]
+
+    snapshot: Optional[StopSnapshot] = None
+    set_names: Tuple[str, ...] = ()
+    lane: int = 0
+
+    def update(self, snapshot: StopSnapshot) -> None:
+        self.snapshot = snapshot
+        if not snapshot.frame:
+            return
+        if not self.set_names:
+            self.set_names = tuple(
+                regset.name
+                for regset in snapshot.frame.GetRegisters()
+                if "general purpose registers" not in regset.name.lower()
+            )
+            self.mount(FlagsPanel(), *(RegisterSetPanel(name) for name in self.set_names))
+            self.call_after_refresh(self.load_visible)
+            return
+        self.load_visible()
+
+    def reset(self) -> None:
+        """Forget the register sets; a new target may have different ones."""
+        self.set_names = ()
+        self.snapshot = None
+        self.remove_children()
+
+    def load_visible(self) -> None:
+        if self.snapshot is None or not self.display:
+            return
+        for panel in self.query(Collapsible):
+            if not panel.collapsed:
+                panel.load(self.snapshot, self.lane)
+
+    def on_collapsible_expanded(self, event: Collapsible.Expanded) -> None:
+        if self.snapshot is not None:
+            event.collapsible.load(self.snapshot, self.lane)
+
+    def action_cycle_lanes(self) -> None:
+        self.lane = (self.lane + 1) % len(LANES)
+        self.load_visible()
@@ -0,0 +1,293 @@
+"""
+value scans over writable memory, narrowed stop by stop.
+
+    scan = ValueScan.start(process, "u32", "1234")
+    scan.narrow(process, "changed")          # after the process has run
+    scan.narrow(process, "== 1300")
+
+kinds are u8..u64, i8..i64, f32, f64, and `bytes` patterns such as
+`48 8b ?? 24`, where `??` matches any byte. numbers are found at aligned
+addresses only. filters are `changed`, `unchanged`, `increased`,
+`decreased`, a comparison (`== x`, `!= x`, `< x`, `> x`, `<= x`, `>= x`) or
+a bare value, meaning `== value`.
+
+hits live in flat arrays, addresses sorted. a narrowing pass only reads the
+pages that still hold candidates, merging neighbouring ones into one read.
+"""
+
+from __future__ import annotations
+
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from itertools import compress, repeat
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+import bisect
+import lldb
+import operator
+import os
+import re
+import struct
+
+from memmap import Region, regions as readable_regions
+from spray import SIZES, TYPES
+
+# bytes per read while scanning
+CHUNK = 1 << 20
+PAGE_SIZE = 4096
+WORKERS = min(8, os.cpu_count() or 1)
+
+COMPARISONS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<=": operator.le,
+    ">=": operator.ge,
+    "<": operator.lt,
+    ">": operator.gt,
+}
+CHANGES = {
+    "changed": operator.ne,
+    "unchanged": operator.eq,
+    "increased": operator.gt,
+    "decreased": operator.lt,
+}
+FILTER = re.compile(r"\s*(==|!=|<=|>=|<|>)?\s*(.+?)\s*")
+
+Value = Union[int, float, bytes]
+
+
+def parse_number(kind: str, text: str) -> Union[int, float]:
+    """Parse `text` as a value of `kind`, raising ValueError if it doesn't fit."""
+    if kind not in TYPES:
+        raise ValueError(f"unknown kind: {kind}; use u8..u64, i8..i64, f32, f64 or bytes")
+    try:
+        value: Union[int, float] = float(text) if kind[0] == "f" else int(text, 0)
+    except ValueError:
+        raise ValueError(f"not a {kind}: {text}")
+    try:
+        struct.pack(f"<{TYPES[kind]}", value)
+    except struct.error:
+        raise ValueError(f"{text} doesn't fit in a {kind}")
+    return value
+
+
+def parse_pattern(text: str) -> Tuple[bytes, re.Pattern]:
+    """`48 8b ?? 24` into its fixed bytes (wildcards zeroed) and a regex."""
+    parts = text.split()
+    if not parts:
+        raise ValueError("empty pattern")
+    fixed = bytearray()
+    regex = b""
+    for part in parts:
+        if part in ("?", "??"):
+            fixed.append(0)
+            regex += b"."
+            continue
+        try:
+            byte = int(part, 16)
+        except ValueError:
+            raise ValueError(f"not a byte: {part}")
+        if not 0 <= byte <= 0xFF:
+            raise ValueError(f"not a byte: {part}")
+        fixed.append(byte)
+        regex += re.escape(bytes([byte]))
+    return bytes(fixed), re.compile(regex, re.DOTALL)
+
+
+def writable(process: lldb.SBProcess) -> List[Region]:
+    return [region for region in readable_regions(process) if region.permissions[1] == "w"]
+
+
+def read(process: lldb.SBProcess, address: int, size: int) -> Optional[bytes]:
+    error = lldb.SBError()
+    data = process.ReadMemory(address, size, error)
+    return data if error.Success() and data else None
+
+
+class ValueScan:
+    """The addresses still matching a scan, and what each held last time."""
+
+    def __init__(self, kind: str, width: int) -> None:
+        if kind != "bytes" and kind not in TYPES:
+            raise ValueError(f"unknown kind: {kind}; use u8..u64, i8..i64, f32, f64 or bytes")
+        self.kind = kind
+        # bytes per hit
+        self.width = width
+        self.addresses = array("Q")
+        # numbers in a typed array, patterns as `width` bytes per hit
+        self.values: Union[array, bytearray] = (
+            bytearray() if kind == "bytes" else array(TYPES[kind])
+        )
+        self.rounds = 0
+
+    def __len__(self) -> int:
+        return len(self.addresses)
+
+    def value(self, index: int) -> Value:
+        if self.kind == "bytes":
+            return bytes(self.values[index * self.width : (index + 1) * self.width])
+        return self.values[index]
+
+    def hits(self, limit: int = 0) -> List[Tuple[int, Value]]:
+        count = min(len(self), limit) if limit else len(self)
+        return [(self.addresses[index], self.value(index)) for index in range(count)]
+
+    @classmethod
+    def start(
+        cls,
+        process: lldb.SBProcess,
+        kind: str,
+        text: str,
+        regions: Optional[Iterable[Region]] = None,
+        cancelled: Callable[[], bool] = lambda: False,
+        workers: int = WORKERS,
+    ) -> ValueScan:
+        """Scan `regions`, or every writable one, for `text` as a `kind`."""
+        if kind == "bytes":
+            needle, pattern = parse_pattern(text)
+            scan = cls(kind, len(needle))
+            search: Callable[[bytes, int], Iterable[int]] = lambda data, base: (
+                match.start() for match in pattern.finditer(data)
+            )
+        else:
+            number = parse_number(kind, text)
+            scan = cls(kind, SIZES[TYPES[kind]])
+            needle = struct.pack(f"={TYPES[kind]}", number)
+            search = lambda data, base: aligned(data, base, needle)
+
+        if regions is None:
+            regions = writable(process)
+
+        def sweep(region: Region) -> Tuple[array, bytes]:
+            found = array("Q")
+            matched = bytearray()
+            address = region.base
+            while address < region.end and not cancelled():
+                # overlap chunks so a match can't straddle two of them
+                size = min(CHUNK + scan.width - 1, region.end - address)
+                data = read(process, address, size)
+                if data is not None:
+                    for offset in search(data, address):
+                        # the overlap is found again at the start of the next chunk
+                        if offset >= CHUNK:
+                            break
+                        found.append(address + offset)
+                        if kind == "bytes":
+                            matched += data[offset : offset + scan.width]
+                address += CHUNK
+            return found, bytes(matched)
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="abh-scan") as pool:
+            # regions come back in order, so the addresses stay sorted
+            for found, matched in pool.map(sweep, sorted(regions)):
+                scan.addresses.extend(found)
+                if kind == "bytes":
+                    scan.values.extend(matched)
+        if kind != "bytes":
+            scan.values = array(TYPES[kind], [number]) * len(scan.addresses)
+        scan.rounds = 1
+        return scan
+
+    def narrow(
+        self,
+        process: lldb.SBProcess,
+        text: str,
+        cancelled: Callable[[], bool] = lambda: False,
+    ) -> int:
+        """Keep the hits passing the filter `text`; returns how many are left."""
+        compare, operand = self.compile_filter(text)
+        addresses = array("Q")
+        values: Union[array, bytearray] = (
+            bytearray() if self.kind == "bytes" else array(TYPES[self.kind])
+        )
+        for first, last, base, data in self.runs(process):
+            if cancelled():
+                return len(self)
+            if data is None:
+                # unmapped since; nothing there can match any more
+                continue
+            if self.kind == "bytes":
+                for index in range(first, last):
+                    offset = self.addresses[index] - base
+                    new = data[offset : offset + self.width]
+                    if compare(new, self.value(index)):
+                        addresses.append(self.addresses[index])
+                        values += new
+                continue
+            # aligned hits in a page aligned read index straight into a cast,
+            # and the whole run is compared with c-level maps
+            view = memoryview(data).cast(TYPES[self.kind])
+            run = self.addresses[first:last]
+            offsets = map(
+                operator.floordiv, map(operator.sub, run, repeat(base)), repeat(self.width)
+            )
+            new = list(map(view.__getitem__, offsets))
+            against = self.values[first:last] if operand is None else repeat(operand)
+            mask = list(map(compare, new, against))
+            addresses.extend(compress(run, mask))
+            values.extend(compress(new, mask))
+        self.addresses, self.values = addresses, values
+        self.rounds += 1
+        return len(self)
+
+    def compile_filter(
+        self, text: str
+    ) -> Tuple[Callable[[Value, Value], bool], Optional[Value]]:
+        """A comparison of each new value with the old one, or with a constant."""
+        word = text.strip().lower()
+        if word in CHANGES:
+            if self.kind == "bytes" and word not in ("changed", "unchanged"):
+                raise ValueError(f"patterns can't have {word}, only changed or unchanged")
+            return CHANGES[word], None
+
+        match = FILTER.fullmatch(text)
+        if match is None:
+            raise ValueError(f"can't parse filter: {text}")
+        op, operand = match.group(1) or "==", match.group(2)
+        if self.kind == "bytes":
+            if op not in ("==", "!="):
+                raise ValueError("patterns can only be compared with == or !=")
+            _, pattern = parse_pattern(operand)
+            equal = op == "=="
+            return lambda new, old: (pattern.fullmatch(new) is not None) == equal, None
+        return COMPARISONS[op], parse_number(self.kind, operand)
+
+    def runs(self, process: lldb.SBProcess) -> Iterator[Tuple[int, int, int, Optional[bytes]]]:
+        """(first index, end index, base, data) for each run of candidate pages."""
+        addresses = self.addresses
+        count = len(addresses)
+        index = 0
+        while index < count:
+            first_page = addresses[index] // PAGE_SIZE
+            last_page = first_page
+            end = index
+            # take in every candidate up to the next gap in the pages, or a chunk
+            while end < count and (last_page - first_page) * PAGE_SIZE < CHUNK:
+                following = bisect.bisect_left(addresses, (last_page + 2) * PAGE_SIZE, end)
+                if following == end:
+                    break
+                end = following
+                last_page = (addresses[end - 1] + self.width - 1) // PAGE_SIZE
+            base = first_page * PAGE_SIZE
+            data = read(process, base, (last_page - first_page + 1) * PAGE_SIZE)
+            if data is None and last_page > first_page:
+                # part of the run went away; retry the hits one by one
+                for single in range(index, end):
+                    address = addresses[single]
+                    yield single, single + 1, address, read(process, address, self.width)
+            else:
+                yield index, end, base, data
+            index = end
+
+
+def aligned(data: bytes, base: int, needle: bytes) -> Iterable[int]:
+    """Offsets into `data` of `needle` at addresses aligned to its size."""
+    size = len(needle)
+    skew = base % size
+    offset = data.find(needle)
+    while offset >= 0:
+        if (offset + skew) % size:
+            offset = data.find(needle, offset + 1)
+            continue
+        yield offset
+        offset = data.find(needle, offset + size)
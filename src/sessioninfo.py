@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 from textual.app import ComposeResult
 from textual.containers import Grid
 from textual.reactive import reactive
@@ -6,16 +8,19 @@ from textual.widgets import (
     Label,
 )
 
+from typing import Optional
+
 import lldb
 
+from profiler import PROFILER
+from snapshot import StopSnapshot
+
 
 class SessionInfo(Widget):
     """Display current target and process information at the bottom."""
 
     filename: reactive[str] = reactive("")
-    target: reactive[lldb.SBTarget] = reactive(lldb.SBTarget())
-    process: reactive[lldb.SBProcess] = reactive(lldb.SBProcess())
-    thread: reactive[lldb.SBThread] = reactive(lldb.SBThread())
+    target: reactive[Optional[lldb.SBTarget]] = reactive(None)
     mounted: bool = False
 
     def compose(self) -> ComposeResult:
@@ -41,7 +46,7 @@ class SessionInfo(Widget):
     def on_mount(self) -> None:
         self.mounted = True
 
-    def watch_target(self, target: lldb.SBTarget) -> None:
+    def watch_target(self, target: Optional[lldb.SBTarget]) -> None:
         if not self.mounted:
             return
         if target:
@@ -50,35 +55,24 @@ class SessionInfo(Widget):
             message = "[bright_black]no target selected[/bright_black]"
         self.query_one("#target", Label).update(message)
 
-    def watch_process(self, process: lldb.SBProcess) -> None:
+    def update(self, snapshot: Optional[StopSnapshot]) -> None:
+        """Show the process and thread from one stop snapshot."""
         if not self.mounted:
             return
-        if process:
-            desc = str(process).replace("SBProcess: ", "")
-            desc_parts = desc.split(", ")
-            pid = desc_parts[0].split(" = ")[1]
-            state = desc_parts[1].split(" = ")[1]
-            message = f"process ID: [b green]{pid}[/] is [b green]{state}[/]"
-        else:
-            message = "[bright_black]no process running[/bright_black]"
-        self.query_one("#process", Label).update(message)
+        with PROFILER.span("session info", "render"):
+            self.show(snapshot)
 
-    def watch_thread(self, thread: lldb.SBThread) -> None:
-        if not self.mounted:
-            return
-        if thread:
-            desc = thread.GetStopDescription(1000)
-            if desc:
-                message = f"at [purple]{desc}[/purple]"
-            else:
-                message = "[purple]exited[/purple]"
+    def show(self, snapshot: Optional[StopSnapshot]) -> None:
+        if snapshot is None:
+            process = "[bright_black]no process running[/bright_black]"
+            thread = "[bright_black]thread not stopped[/bright_black]"
         else:
-            message = "[bright_black]thread not stopped[/bright_black]"
-        self.query_one("#thread", Label).update(message)
-
-    def update(
-        self, target: lldb.SBTarget, process: lldb.SBProcess, thread: lldb.SBThread
-    ) -> None:
-        self.watch_target(target)
-        self.watch_process(process)
-        self.watch_thread(thread)
+            process = f"process ID: [b green]{snapshot.pid}[/] is [b green]{snapshot.state_name}[/]"
+            if snapshot.stopped and snapshot.stop_reason:
+                thread = f"at [purple]{snapshot.stop_reason}[/purple]"
+            elif snapshot.exited:
+                thread = "[purple]exited[/purple]"
+            else:
+                thread = "[bright_black]thread not stopped[/bright_black]"
+        self.query_one("#process", Label).update(process)
+        self.query_one("#thread", Label).update(thread)
@@ -0,0 +1,88 @@
+"""
+immutable per-stop view of the process.
+
+collected once per stop on the engine thread, then handed to every widget so
+that none of them has to go back to lldb for the basics.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, NamedTuple
+
+import lldb
+
+from profiler import PROFILER
+
+
+class Register(NamedTuple):
+    """One register's value, kept as an integer."""
+
+    name: str
+    value: int
+    size: int
+
+    def hex(self) -> str:
+        return f"0x{self.value:0{self.size * 2}x}"
+
+
+@dataclass(frozen=True)
+class StopSnapshot:
+    """Everything the widgets need to know about one stop."""
+
+    stop_id: int
+    pid: int
+    state: int
+    state_name: str
+    pc: int
+    registers: Mapping[str, Register]
+    stop_reason: str
+    process: lldb.SBProcess
+    thread: lldb.SBThread
+    frame: lldb.SBFrame
+
+    @property
+    def stopped(self) -> bool:
+        return self.state == lldb.eStateStopped
+
+    @property
+    def exited(self) -> bool:
+        return self.state == lldb.eStateExited
+
+
+def collect(process: lldb.SBProcess) -> StopSnapshot:
+    """Read the selected thread, frame and general purpose registers once."""
+    state = process.GetState()
+    thread = process.GetSelectedThread()
+    frame = lldb.SBFrame()
+    registers = {}
+    pc = 0
+    stop_reason = ""
+
+    if state == lldb.eStateStopped and thread:
+        frame = thread.GetSelectedFrame()
+        stop_reason = thread.GetStopDescription(1000) or ""
+    if frame:
+        pc = frame.GetPC()
+        with PROFILER.span("GetRegisters", "lldb"):
+            for regset in frame.GetRegisters():
+                if "general purpose registers" in regset.name.lower():
+                    for reg in regset:
+                        registers[reg.name] = Register(
+                            reg.name, reg.GetValueAsUnsigned(), reg.GetByteSize()
+                        )
+                    break
+
+    return StopSnapshot(
+        stop_id=process.GetStopID(),
+        pid=process.GetProcessID(),
+        state=state,
+        state_name=lldb.SBDebugger.StateAsCString(state),
+        pc=pc,
+        registers=MappingProxyType(registers),
+        stop_reason=stop_reason,
+        process=process,
+        thread=thread,
+        frame=frame,
+    )
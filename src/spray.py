@@ -0,0 +1,115 @@
+"""
+type spray over a whole window of memory.
+
+one read, then one `memoryview.cast` per type: every naturally aligned
+offset of the window is decoded as u8..u64, i8..i64, f32 and f64 without
+copying or unpacking cell by cell. qwords that land inside a mapped region
+are flagged as pointer candidates, by bisecting the region map rather than
+reading through each of them.
+
+values come out in the host's byte order, which is the inferior's for a
+local debugger.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+from memmap import Region, RegionMap
+
+WINDOW = 256
+# the widest type; windows start on a multiple of it
+ALIGN = 8
+
+# name -> memoryview format
+TYPES = {
+    "u8": "B",
+    "u16": "H",
+    "u32": "I",
+    "u64": "Q",
+    "i8": "b",
+    "i16": "h",
+    "i32": "i",
+    "i64": "q",
+    "f32": "f",
+    "f64": "d",
+}
+SIZES = {"B": 1, "H": 2, "I": 4, "Q": 8, "b": 1, "h": 2, "i": 4, "q": 8, "f": 4, "d": 8}
+
+
+class Pointer(NamedTuple):
+    """A qword in the window that points into a mapped region."""
+
+    offset: int
+    value: int
+    region: Region
+
+
+class SprayTable:
+    """Every type at every aligned offset of one window."""
+
+    def __init__(self, address: int, data: bytes, regions: Optional[RegionMap] = None) -> None:
+        self.address = address
+        self.data = data
+        view = memoryview(data)
+        self.columns: Dict[str, Sequence] = {}
+        for name, format in TYPES.items():
+            size = SIZES[format]
+            self.columns[name] = view[: len(data) - len(data) % size].cast(format)
+        # offset -> candidate, for offsets that are a multiple of 8
+        self.pointers: Dict[int, Pointer] = {}
+        if regions is not None and len(regions):
+            self.pointers = {
+                pointer.offset: pointer for pointer in self.find_pointers(regions)
+            }
+
+    @classmethod
+    def read(
+        cls,
+        read: Callable[[int, int], Optional[bytes]],
+        address: int,
+        regions: Optional[RegionMap] = None,
+        size: int = WINDOW,
+    ) -> Optional[SprayTable]:
+        """Read a window starting at `address` rounded down to `ALIGN`."""
+        base = address - address % ALIGN
+        data = read(base, size)
+        if data is None:
+            return None
+        return cls(base, data, regions)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def find_pointers(self, regions: RegionMap) -> Iterator[Pointer]:
+        qwords = self.columns["u64"]
+        if not qwords:
+            return
+        # anything outside [lowest base, highest end) can't be a pointer
+        low = regions.regions[0].base
+        high = max(region.end for region in regions)
+        for index, value in enumerate(qwords):
+            if low <= value < high:
+                region = regions.find(value)
+                if region is not None:
+                    yield Pointer(index * 8, value, region)
+
+    def value(self, name: str, offset: int) -> Optional[float]:
+        """One type's value at `offset`, or None if unaligned or out of range."""
+        size = SIZES[TYPES[name]]
+        if offset % size or offset + size > len(self.data):
+            return None
+        return self.columns[name][offset // size]
+
+    def values(self, name: str, offset: int, count: int) -> List[float]:
+        """`count` consecutive values of one type, from an aligned `offset`."""
+        size = SIZES[TYPES[name]]
+        start = offset // size
+        return self.columns[name][start : start + count].tolist()
+
+    def row(self, offset: int) -> Dict[str, Optional[float]]:
+        """Every type at one offset."""
+        return {name: self.value(name, offset) for name in TYPES}
+
+    def offset(self, address: int) -> int:
+        return address - self.address
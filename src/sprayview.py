@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from rich.text import Text
+from textual.geometry import Size
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+
+from typing import List, Optional
+
+import lldb
+
+from memcache import MemoryCache
+from memmap import RegionMap
+from spray import WINDOW, SprayTable
+
+HEADER = (
+    f"{'address':<20}{'bytes':<25}{'i64':>21}{'f64':>13}"
+    f"{'i32':>24}{'f32':>26}{'i16':>28}  pointer"
+)
+
+
+class SprayView(ScrollView):
+    """The type spray for a whole window, one row per qword.
+
+    The window is decoded in one go by `SprayTable` and its rows are rendered
+    once per stop; scrolling only crops them.
+    """
+
+    def __init__(
+        self,
+        memory: MemoryCache,
+        *,
+        id: Optional[str] = None,
+        classes: Optional[str] = None,
+    ) -> None:
+        super().__init__(id=id, classes=classes)
+        self.memory = memory
+        self.regions: Optional[RegionMap] = None
+        self.table: Optional[SprayTable] = None
+        self.cursor: Optional[int] = None
+        self.strips: List[Strip] = []
+
+    def new_stop(self, process: lldb.SBProcess) -> None:
+        # the map is re-read on the next load, which may never come
+        self.regions = None
+        if self.display:
+            self.load()
+
+    def goto(self, address: int) -> None:
+        self.cursor = address
+        self.load()
+
+    def load(self) -> None:
+        if self.cursor is None:
+            return
+        if self.regions is None:
+            self.regions = RegionMap.of(self.memory.process)
+        self.table = SprayTable.read(self.memory.read, self.cursor, self.regions, WINDOW)
+        if self.table is None:
+            self.border_title = f"spray: can't read 0x{self.cursor:x}"
+            self.strips = []
+        else:
+            self.border_title = (
+                f"spray 0x{self.table.address:x}: {len(self.table.pointers)} pointers"
+            )
+            self.strips = [self.strip(Text(HEADER, "b"))]
+            self.strips.extend(
+                self.strip(self.row(offset)) for offset in range(0, len(self.table), 8)
+            )
+        width = max((strip.cell_length for strip in self.strips), default=0)
+        self.virtual_size = Size(width, len(self.strips))
+        self.refresh()
+
+    def strip(self, text: Text) -> Strip:
+        return Strip(text.render(self.app.console), text.cell_len)
+
+    def row(self, offset: int) -> Text:
+        table = self.table
+        address = table.address + offset
+        current = self.cursor is not None and address <= self.cursor < address + 8
+        text = Text(f"0x{address:016x}  ", "blue b r" if current else "blue")
+        chunk = table.data[offset : offset + 8]
+        for byte in chunk:
+            text.append(f"{byte:02x} ", "white" if byte else "bright_black")
+        text.append("   " * (8 - len(chunk)) + " ")
+        if len(chunk) < 8:
+            return text
+
+        text.append(f"{table.value('i64', offset):>21}", "purple")
+        text.append(f"{table.value('f64', offset):>13.6g}", "purple")
+        for value in table.values("i32", offset, 2):
+            text.append(f"{value:>12}", "dark_violet")
+        for value in table.values("f32", offset, 2):
+            text.append(f"{value:>13.6g}", "dark_violet")
+        for value in table.values("i16", offset, 4):
+            text.append(f"{value:>7}", "medium_violet_red")
+        pointer = table.pointers.get(offset)
+        if pointer is not None:
+            name = pointer.region.name or pointer.region.permissions
+            text.append(f"  -> {name}", "green")
+        return text
+
+    def render_line(self, y: int) -> Strip:
+        scroll_x, scroll_y = self.scroll_offset
+        row = scroll_y + y
+        width = self.size.width
+        if row >= len(self.strips):
+            return Strip.blank(width, self.rich_style)
+        return self.strips[row].crop_extend(scroll_x, scroll_x + width, self.rich_style)
@@ -0,0 +1,76 @@
+"""
+fast startup.
+
+lldb initializes the whole debugger as a side effect of `import lldb`, so the
+app imports it lazily: a stand-in module exists straight away, and the real
+import happens on first attribute access, which the app arranges to be on a
+worker thread after the ui has painted.
+"""
+
+from types import ModuleType
+from typing import Any, List, Optional, Tuple
+
+import importlib
+import importlib.util
+import sys
+import threading
+import time
+
+
+class LazyModule(ModuleType):
+    """Stands in for a module until an attribute is read from it.
+
+    `importlib.util.LazyLoader` doesn't do here: the `import` statement itself
+    reads `__spec__` off the module, which would load it in every importer.
+    """
+
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+        self.__spec__ = importlib.util.find_spec(name)
+        if self.__spec__ is None:
+            raise ImportError(f"no module named {name!r}")
+        self.__lock = threading.Lock()
+        self.__module: Optional[ModuleType] = None
+
+    def __getattr__(self, attribute: str) -> Any:
+        # only reached for attributes the stand-in doesn't have itself
+        return getattr(self.load(), attribute)
+
+    def load(self) -> ModuleType:
+        with self.__lock:
+            if self.__module is None:
+                del sys.modules[self.__name__]
+                try:
+                    self.__module = importlib.import_module(self.__name__)
+                except BaseException:
+                    sys.modules[self.__name__] = self
+                    raise
+                # later lookups then never reach __getattr__
+                vars(self).update(vars(self.__module))
+            return self.__module
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Register `name` in `sys.modules` without executing it yet."""
+    if name not in sys.modules:
+        sys.modules[name] = LazyModule(name)
+    return sys.modules[name]
+
+
+class StartupProfile:
+    """Named timings, in seconds since `started`."""
+
+    def __init__(self, started: float) -> None:
+        self.started = started
+        self.marks: List[Tuple[str, float]] = []
+
+    def mark(self, name: str, at: float = 0.0) -> None:
+        self.marks.append((name, (at or time.perf_counter()) - self.started))
+
+    def report(self) -> List[str]:
+        lines = []
+        previous = 0.0
+        for name, at in self.marks:
+            lines.append(f"{name:<16} {at * 1000:8.1f} ms  (+{(at - previous) * 1000:.1f} ms)")
+            previous = at
+        return lines
@@ -0,0 +1,119 @@
+"""
+batched execution requests.
+
+a batch runs many steps on the engine thread without reporting the stops in
+between, so only its final state gets rendered. the prompt accepts:
+
+    500                 step 500 instructions
+    500 over            same, stepping over calls
+    until 0x401136      run until the pc reaches an address (or a symbol)
+    until main+0x20     same, for any constant expression
+    until rax == 0      step until a predicate holds (see expression.py)
+    500 until rax == 0  same, but give up after 500 steps
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+import lldb
+
+from expression import Context, parse as parse_expression
+
+# steps taken by an unbounded `until <predicate>` before giving up
+MAX_STEPS = 10_000_000
+
+
+@dataclass(frozen=True)
+class Batch:
+    """One batch of execution; exactly one of `address` and `count` drives it."""
+
+    count: int = 0
+    step_over: bool = False
+    address: Optional[int] = None
+    # checked after every step, with the newest frame
+    until: Optional[Callable[[lldb.SBFrame], bool]] = None
+    description: str = ""
+
+
+def compile_predicate(
+    text: str,
+    registers: List[str],
+    resolve: Callable[[str], Optional[int]] = lambda name: None,
+) -> Callable[[lldb.SBFrame], bool]:
+    """Compile `rax == 0 && [rsp] > 4` into a check over one frame."""
+    expression = parse_expression(text)
+    known = {name.lower() for name in registers}
+    # symbols don't move while the process runs, so resolve them up front
+    symbols = {}
+    for name in expression.names:
+        if name.lower() in known:
+            continue
+        address = resolve(name)
+        if address is None:
+            raise ValueError(f"unknown register or symbol: {name}")
+        symbols[name] = address
+
+    def holds(frame: lldb.SBFrame) -> bool:
+        process = frame.GetThread().GetProcess()
+
+        def register(name: str) -> Optional[int]:
+            if name not in known:
+                return None
+            return frame.FindRegister(name).GetValueAsUnsigned()
+
+        def read(address: int, size: int) -> Optional[bytes]:
+            error = lldb.SBError()
+            data = process.ReadMemory(address, size, error)
+            return data if error.Success() else None
+
+        try:
+            return bool(expression.evaluate(Context(register, read, symbols.get)))
+        except ValueError:
+            # unreadable memory or the like; keep stepping
+            return False
+
+    return holds
+
+
+def parse(
+    text: str,
+    registers: List[str],
+    resolve: Callable[[str], Optional[int]],
+) -> Batch:
+    """Parse a batch request; `resolve` turns symbol names into addresses."""
+    words = text.split()
+    count = 0
+    step_over = False
+    if words and words[0].isdigit():
+        count = int(words.pop(0))
+        if words and words[0] == "over":
+            step_over = True
+            words.pop(0)
+    if not words:
+        if count <= 0:
+            raise ValueError("nothing to do!")
+        return Batch(count=count, step_over=step_over, description=f"{count} steps")
+
+    if words[0] != "until" or len(words) == 1:
+        raise ValueError("expected a step count or `until ...`")
+    condition = " ".join(words[1:])
+
+    expression = parse_expression(condition.lstrip("*"))
+    if expression.predicate:
+        return Batch(
+            count=count or MAX_STEPS,
+            step_over=step_over,
+            until=compile_predicate(condition, registers, resolve),
+            description=f"until {condition}",
+        )
+
+    # an address; registers would only name where the process is now
+    try:
+        address = expression.evaluate(
+            Context(lambda name: None, lambda address, size: None, resolve)
+        )
+    except ValueError:
+        raise ValueError(f"no such address or symbol: {condition}")
+    return Batch(address=address, description=f"until 0x{address:x}")
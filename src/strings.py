@@ -0,0 +1,266 @@
+"""
+strings in process memory.
+
+regions are read in large chunks, several regions at once. each chunk is
+translated into byte classes, so ascii and utf-16le runs can be found with
+literal searches instead of testing a character class at every byte; ascii
+runs are then grown over any neighbouring multibyte utf-8 characters. a
+string cut in two by a chunk boundary is carried over into the next chunk.
+the hits end up in one address-sorted index:
+
+    index = StringIndex()
+    index.scan(process)                 # every readable region
+    index.search("password")
+    index.at(0x7ffeefbff5a0)            # the string covering an address
+"""
+
+from __future__ import annotations
+
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import bisect
+import lldb
+import os
+import re
+import threading
+
+from memmap import Region, regions as readable_regions
+
+# shortest string worth indexing, in characters
+MINIMUM = 5
+# bytes per read
+CHUNK = 1 << 20
+# longest text kept per hit; the address still finds the rest
+MAX_TEXT = 1024
+WORKERS = min(8, os.cpu_count() or 1)
+
+ENCODINGS = ("ascii", "utf-8", "utf-16le")
+
+# bytes that can be part of an ascii string become "a", nul "z", the rest "."
+CLASSES = bytes(
+    ord("a") if byte == 9 or 0x20 <= byte < 0x7F else ord("z") if byte == 0 else ord(".")
+    for byte in range(256)
+)
+# bytes that can be part of any string, utf-8 included, become "a"
+TEXT = bytes(
+    ord("a") if byte == 9 or 0x20 <= byte < 0x7F or byte >= 0x80 else ord(".")
+    for byte in range(256)
+)
+# one utf-8 character: ascii, or a well-formed multibyte sequence
+UTF8 = rb"(?:[\x20-\x7e\t]|[\xc2-\xdf][\x80-\xbf]|[\xe0-\xef][\x80-\xbf]{2}|[\xf0-\xf4][\x80-\xbf]{3})"
+UTF8_AFTER = re.compile(UTF8 + rb"*")
+UTF8_BEFORE = re.compile(UTF8 + rb"+\Z")
+# how far back a utf-8 string is looked for before an ascii run
+LOOKBEHIND = 64
+
+
+class StringHit(NamedTuple):
+    """One string found in memory."""
+
+    address: int
+    encoding: str
+    text: str
+
+
+# (address, encoding index, text, length in bytes)
+Found = List[Tuple[int, int, str, int]]
+
+
+def patterns(minimum: int) -> Tuple[re.Pattern, re.Pattern]:
+    """Ascii and utf-16le runs over classified bytes; both have literal prefixes."""
+    return re.compile(b"a" * minimum + b"a*"), re.compile(b"az" * minimum + b"(?:az)*")
+
+
+def extract(
+    buffer: bytearray,
+    base: int,
+    compiled: Tuple[re.Pattern, re.Pattern],
+    found: Found,
+    final: bool,
+) -> int:
+    """Record the strings in `buffer`; returns how much of it is done with.
+
+    Strings running into the end of the buffer may continue in the next
+    chunk, so unless this is the last chunk they're left for it.
+    """
+    ascii, wide = compiled
+    classes = buffer.translate(CLASSES)
+    hold = len(buffer)
+    hits = []
+    covered = 0
+    for match in ascii.finditer(classes):
+        start, end = match.span()
+        if start < covered:
+            # already part of a utf-8 string
+            continue
+        encoding = 0
+        if end < len(buffer) and buffer[end] >= 0x80:
+            end = UTF8_AFTER.match(buffer, end).end()
+            encoding = 1 if end > match.end() else 0
+        if start and buffer[start - 1] >= 0x80:
+            before = UTF8_BEFORE.search(buffer, max(0, start - LOOKBEHIND), start)
+            if before is not None:
+                start, encoding = before.start(), 1
+        covered = end
+        hits.append((start, end, encoding))
+    for match in wide.finditer(classes):
+        hits.append((match.start(), match.end(), 2))
+
+    if not final:
+        # whatever runs into the end may be the start of a string, too short
+        # or too cut off to match yet; it's looked at again with what follows
+        hold = min(trailing(buffer, classes), hold)
+        for start, end, encoding in hits:
+            if end == len(buffer):
+                hold = min(hold, start)
+    # nothing finishes in a buffer this size; give up on finding the end
+    if hold == 0 and len(buffer) >= 2 * CHUNK:
+        hold = len(buffer)
+    for start, end, encoding in hits:
+        if start >= hold:
+            continue
+        raw = bytes(buffer[start : min(end, start + MAX_TEXT * 4)])
+        text = raw.decode("utf-16-le" if encoding == 2 else "utf-8", errors="replace")
+        found.append((base + start, encoding, text[:MAX_TEXT], end - start))
+    return hold
+
+
+def trailing(buffer: bytearray, classes: bytes) -> int:
+    """Where the text at the end of `buffer` starts, as utf-8 or as utf-16le."""
+    start = len(buffer.translate(TEXT).rstrip(b"a"))
+    # utf-16le pairs, possibly cut after the first byte of the last one
+    wide = len(classes)
+    if classes.endswith(b"a"):
+        wide -= 1
+    while wide >= 2 and classes[wide - 2 : wide] == b"az":
+        wide -= 2
+    return min(start, wide)
+
+
+def preview(data: bytes, limit: int = 64) -> str:
+    """The string at the start of `data`, as utf-16le if it looks like that."""
+    if len(data) >= 4 and data[1] == 0 and data[3] == 0 and data[0]:
+        end = len(data) - len(data) % 2
+        for index in range(0, end, 2):
+            if data[index] == 0 and data[index + 1] == 0:
+                end = index
+                break
+        return data[:end].decode("utf-16-le", errors="replace")[:limit]
+    return data.split(b"\x00", 1)[0].decode("utf-8", errors="replace")[:limit]
+
+
+class StringIndex:
+    """Strings found in memory, sorted by address."""
+
+    def __init__(self, minimum: int = MINIMUM) -> None:
+        self.minimum = minimum
+        self.compiled = patterns(minimum)
+        self.addresses = array("Q")
+        self.encodings = bytearray()
+        self.texts: List[str] = []
+        self.lengths = array("L")
+        self.lowered: Optional[List[str]] = None
+        self.stop_id = -1
+        # each scanning thread keeps one buffer for all of its regions
+        self.local = threading.local()
+
+    def __len__(self) -> int:
+        return len(self.addresses)
+
+    def __getitem__(self, index: int) -> StringHit:
+        return StringHit(
+            self.addresses[index], ENCODINGS[self.encodings[index]], self.texts[index]
+        )
+
+    def scan(
+        self,
+        process: lldb.SBProcess,
+        regions: Optional[Iterable[Region]] = None,
+        cancelled: Callable[[], bool] = lambda: False,
+        workers: int = WORKERS,
+    ) -> int:
+        """Rebuild the index from `regions`, or every readable region."""
+        if regions is None:
+            regions = readable_regions(process)
+        regions = list(regions)
+        found: Found = []
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="abh-strings") as pool:
+            scanned = pool.map(
+                lambda region: self.scan_region(process, region, cancelled), regions
+            )
+            for hits in scanned:
+                found.extend(hits)
+        found.sort()
+        self.addresses = array("Q", (hit[0] for hit in found))
+        self.encodings = bytearray(hit[1] for hit in found)
+        self.texts = [hit[2] for hit in found]
+        self.lengths = array("L", (hit[3] for hit in found))
+        self.lowered = None
+        self.stop_id = process.GetStopID()
+        return len(found)
+
+    def scan_region(
+        self,
+        process: lldb.SBProcess,
+        region: Region,
+        cancelled: Callable[[], bool],
+    ) -> Found:
+        buffer = getattr(self.local, "buffer", None)
+        if buffer is None:
+            buffer = self.local.buffer = bytearray()
+        del buffer[:]
+        found: Found = []
+        # address of buffer[0]
+        base = address = region.base
+        while address < region.end and not cancelled():
+            size = min(CHUNK, region.end - address)
+            error = lldb.SBError()
+            chunk = process.ReadMemory(address, size, error)
+            address += size
+            if not error.Success() or not chunk:
+                # a hole; whatever was carried over ends here
+                extract(buffer, base, self.compiled, found, True)
+                del buffer[:]
+                base = address
+                continue
+            buffer += chunk
+            done = extract(buffer, base, self.compiled, found, address >= region.end)
+            del buffer[:done]
+            base += done
+        return found
+
+    def stale(self, process: lldb.SBProcess) -> bool:
+        return not process or process.GetStopID() != self.stop_id
+
+    def at(self, address: int) -> Optional[StringHit]:
+        """The string starting at or covering `address`."""
+        index = bisect.bisect_right(self.addresses, address) - 1
+        if index < 0:
+            return None
+        if address >= self.addresses[index] + self.lengths[index]:
+            return None
+        return self[index]
+
+    def between(self, start: int, end: int) -> List[StringHit]:
+        first = bisect.bisect_left(self.addresses, start)
+        last = bisect.bisect_left(self.addresses, end)
+        return [self[index] for index in range(first, last)]
+
+    def search(self, query: str, limit: int = 0) -> List[StringHit]:
+        """Strings containing `query`, ignoring case, in address order."""
+        if self.lowered is None:
+            self.lowered = [text.lower() for text in self.texts]
+        query = query.lower()
+        hits = []
+        for index, text in enumerate(self.lowered):
+            if query in text:
+                hits.append(self[index])
+                if len(hits) == limit:
+                    break
+        return hits
+
+    def batches(self, size: int = 1024) -> Iterator[List[StringHit]]:
+        for start in range(0, len(self), size):
+            yield [self[index] for index in range(start, min(start + size, len(self)))]
@@ -0,0 +1,277 @@
+"""
+structured symbol index.
+
+symbols are read out of lldb once per module, keyed by the module's uuid (or
+a hash of the file when it has none), and persisted to an on-disk cache so the
+next session doesn't have to walk the module again.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import bisect
+import hashlib
+import json
+import lldb
+import os
+import re
+import threading
+
+# bump when the on-disk format changes
+CACHE_VERSION = 1
+
+# filled on first use; touching lldb's constants at import would load lldb
+SYMBOL_TYPES: Dict[int, str] = {}
+
+
+def symbol_type(kind: int) -> str:
+    if not SYMBOL_TYPES:
+        SYMBOL_TYPES.update(
+            {
+                lldb.eSymbolTypeCode: "code",
+                lldb.eSymbolTypeData: "data",
+                lldb.eSymbolTypeTrampoline: "trampoline",
+                lldb.eSymbolTypeResolver: "resolver",
+                lldb.eSymbolTypeRuntime: "runtime",
+                lldb.eSymbolTypeException: "exception",
+                lldb.eSymbolTypeObjCClass: "objc class",
+                lldb.eSymbolTypeLocal: "local",
+            }
+        )
+    return SYMBOL_TYPES.get(kind, "other")
+
+
+class SymbolRecord(NamedTuple):
+    """One symbol, detached from lldb; addresses are file addresses."""
+
+    name: str
+    demangled: str
+    start: int
+    end: int
+    type: str
+    module: str
+
+
+def cache_dir() -> str:
+    home = os.path.join(os.path.expanduser("~"), ".cache")
+    base = os.environ.get("XDG_CACHE_HOME") or home
+    return os.path.join(base, "abh")
+
+
+def module_key(module: lldb.SBModule) -> str:
+    """The module's uuid, or a hash of its contents when it doesn't have one."""
+    uuid = module.GetUUIDString()
+    if uuid:
+        return uuid
+    path = module.GetFileSpec().fullpath
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(1 << 20), b""):
+                digest.update(chunk)
+    except (OSError, TypeError):
+        return ""
+    return digest.hexdigest()
+
+
+def read_module(module: lldb.SBModule) -> List[SymbolRecord]:
+    """Walk a module's symbol table once."""
+    records = []
+    name = module.GetFileSpec().GetFilename() or ""
+    for symbol in module:
+        start = symbol.GetStartAddress().GetFileAddress()
+        if start == lldb.LLDB_INVALID_ADDRESS:
+            continue
+        end = symbol.GetEndAddress().GetFileAddress()
+        mangled = symbol.GetMangledName() or ""
+        display = symbol.GetDisplayName() or symbol.GetName() or ""
+        records.append(
+            SymbolRecord(
+                name=mangled or display,
+                demangled=display,
+                start=start,
+                end=end if end != lldb.LLDB_INVALID_ADDRESS else start,
+                type=symbol_type(symbol.GetType()),
+                module=name,
+            )
+        )
+    return records
+
+
+class ModuleSymbols:
+    """The symbols of one module, sorted for prefix search."""
+
+    def __init__(self, key: str, records: List[SymbolRecord]) -> None:
+        self.key = key
+        self.records = sorted(records, key=lambda record: record.demangled.lower())
+        self.keys = [record.demangled.lower() for record in self.records]
+        self.by_name: Dict[str, SymbolRecord] = {}
+        for record in self.records:
+            self.by_name.setdefault(record.name, record)
+            self.by_name.setdefault(record.demangled, record)
+        self.by_address = sorted(self.records, key=lambda record: record.start)
+        self.starts = [record.start for record in self.by_address]
+
+    def prefix(self, prefix: str) -> List[SymbolRecord]:
+        prefix = prefix.lower()
+        first = bisect.bisect_left(self.keys, prefix)
+        last = bisect.bisect_left(self.keys, prefix + "\uffff")
+        return self.records[first:last]
+
+    def at(self, address: int) -> Optional[SymbolRecord]:
+        """The symbol whose file address range covers `address`."""
+        index = bisect.bisect_right(self.starts, address) - 1
+        if index < 0:
+            return None
+        record = self.by_address[index]
+        if record.start <= address < max(record.end, record.start + 1):
+            return record
+        return None
+
+
+def load(module: lldb.SBModule, directory: Optional[str] = None) -> ModuleSymbols:
+    """Symbols for `module`, from the on-disk cache when possible."""
+    key = module_key(module)
+    path = os.path.join(directory or cache_dir(), "symbols", f"{key}.v{CACHE_VERSION}.json")
+    if key and os.path.exists(path):
+        try:
+            with open(path) as file:
+                return ModuleSymbols(key, [SymbolRecord(*row) for row in json.load(file)])
+        except (OSError, ValueError, TypeError):
+            pass
+
+    symbols = ModuleSymbols(key, read_module(module))
+    if key:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            partial = f"{path}.{os.getpid()}.tmp"
+            with open(partial, "w") as file:
+                json.dump([list(record) for record in symbols.records], file)
+            os.replace(partial, path)
+        except OSError:
+            pass
+    return symbols
+
+
+def score(query: str, key: str, pattern: "re.Pattern[str]") -> Optional[Tuple[int, int]]:
+    """Rank a match: prefix, then substring, then scattered subsequence."""
+    if key.startswith(query):
+        return (0, len(key))
+    if query in key:
+        return (1, len(key))
+    if pattern.search(key):
+        return (2, len(key))
+    return None
+
+
+class SymbolIndex:
+    """Symbols of every module in a target; libraries are only read on demand."""
+
+    def __init__(self, directory: Optional[str] = None) -> None:
+        self.directory = directory
+        self.target: Optional[lldb.SBTarget] = None
+        self.modules: Dict[str, ModuleSymbols] = {}
+        self.lock = threading.Lock()
+        # the last query and everything it matched, to narrow as the user types
+        self.last: Tuple[str, bool, List[Tuple[str, SymbolRecord]]] = ("", False, [])
+
+    def attach(self, target: lldb.SBTarget) -> None:
+        with self.lock:
+            self.target = target
+            self.modules = {}
+            self.last = ("", False, [])
+
+    def module(self, module: lldb.SBModule) -> ModuleSymbols:
+        name = module.GetFileSpec().GetFilename() or ""
+        with self.lock:
+            if name not in self.modules:
+                self.modules[name] = load(module, self.directory)
+            return self.modules[name]
+
+    def main(self) -> Optional[ModuleSymbols]:
+        """The executable's own symbols."""
+        if not self.target or self.target.GetNumModules() == 0:
+            return None
+        return self.module(self.target.GetModuleAtIndex(0))
+
+    def loaded(self, libraries: bool) -> List[ModuleSymbols]:
+        main = self.main()
+        if main is None:
+            return []
+        if not libraries:
+            return [main]
+        return [self.module(module) for module in self.target.module_iter()]
+
+    def batches(self, libraries: bool = False, size: int = 1024) -> Iterator[List[SymbolRecord]]:
+        """Every record in name order per module, a module at a time as it loads."""
+        main = self.main()
+        if main is None:
+            return
+        modules = [main]
+        if libraries:
+            modules = (self.module(module) for module in self.target.module_iter())
+        for symbols in modules:
+            for first in range(0, len(symbols.records), size):
+                yield symbols.records[first : first + size]
+
+    def search(self, query: str, libraries: bool = False, limit: int = 0) -> List[SymbolRecord]:
+        """Fuzzy search by demangled name; narrows the previous result when it can.
+
+        A leading `^` asks for a plain prefix search, which is a bisect per module.
+        """
+        query = query.lower()
+        if query.startswith("^"):
+            matches = [
+                record
+                for symbols in self.loaded(libraries)
+                for record in symbols.prefix(query[1:])
+            ]
+            return matches[:limit] if limit else matches
+
+        last_query, last_libraries, last_matches = self.last
+        if last_query and query.startswith(last_query) and last_libraries == libraries:
+            candidates = last_matches
+        else:
+            candidates = [
+                pair
+                for symbols in self.loaded(libraries)
+                for pair in zip(symbols.keys, symbols.records)
+            ]
+
+        if query:
+            pattern = re.compile(".*?".join(re.escape(char) for char in query))
+            ranked = []
+            for key, record in candidates:
+                rank = score(query, key, pattern)
+                if rank is not None:
+                    ranked.append((rank, key, record))
+            ranked.sort(key=lambda item: item[0])
+            candidates = [(key, record) for _, key, record in ranked]
+
+        self.last = (query, libraries, candidates)
+        matches = [record for _, record in candidates]
+        return matches[:limit] if limit else matches
+
+    def lookup(self, name: str) -> Optional[SymbolRecord]:
+        """Exact lookup by mangled or demangled name, main module first."""
+        for symbols in self.loaded(False) + list(self.modules.values()):
+            record = symbols.by_name.get(name)
+            if record is not None:
+                return record
+        return None
+
+    def resolve(self, name: str) -> Optional[int]:
+        """Load address of a symbol by exact name, if there is one."""
+        record = self.lookup(name)
+        return None if record is None else self.load_address(record)
+
+    def load_address(self, record: SymbolRecord) -> int:
+        """Where `record` lives in the running process (or its file address)."""
+        if not self.target:
+            return record.start
+        module = self.target.FindModule(lldb.SBFileSpec(record.module))
+        if not module:
+            return record.start
+        address = module.ResolveFileAddress(record.start).GetLoadAddress(self.target)
+        return record.start if address == lldb.LLDB_INVALID_ADDRESS else address
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+from rich.style import Style
+from rich.text import Text
+from textual.geometry import Size
+from textual.message import Message
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import lldb
+
+from asmtok import ADDRESS, BRANCH, MNEMONIC, OFFSET, REGISTER, is_branch, operands
+from disasm import Instruction, read
+from snapshot import Register
+from tracing import Trace
+
+# decoded instructions kept by pc; traces revisit the same loops a lot
+DECODED = 4096
+
+
+class TraceView(ScrollView):
+    """Replay of a recorded trace, one row per record.
+
+    Rows are read from the mmapped trace only when drawn. Moving the cursor
+    rebuilds the registers at that record and posts them, so the register
+    table can show any point of the trace.
+    """
+
+    BINDINGS = [
+        ("up", "scrub(-1)", "back"),
+        ("down", "scrub(1)", "forward"),
+        ("pageup", "scrub(-100)", "back 100"),
+        ("pagedown", "scrub(100)", "forward 100"),
+        ("home", "scrub(-1000000000)", "first"),
+        ("end", "scrub(1000000000)", "last"),
+    ]
+
+    highlight = Style(bgcolor="#44475a", bold=True)
+
+    class Scrubbed(Message):
+        """The cursor moved to another record."""
+
+        def __init__(self, index: int, pc: int, registers: Dict[str, Register]) -> None:
+            super().__init__()
+            self.index = index
+            self.pc = pc
+            self.registers = registers
+
+    def __init__(self, *, id: Optional[str] = None, classes: Optional[str] = None) -> None:
+        super().__init__(id=id, classes=classes)
+        self.trace: Optional[Trace] = None
+        self.target: Optional[lldb.SBTarget] = None
+        self.cursor = 0
+        self.decoded: "OrderedDict[int, Optional[Instruction]]" = OrderedDict()
+
+    def open(self, trace: Trace, target: lldb.SBTarget) -> None:
+        if self.trace is not None and self.trace is not trace:
+            self.trace.close()
+        self.trace = trace
+        self.target = target
+        self.decoded.clear()
+        self.cursor = 0
+        self.reload()
+
+    def reload(self) -> None:
+        """Pick up records appended since the last look."""
+        if self.trace is None:
+            return
+        self.trace.reload()
+        self.border_title = f"trace: {len(self.trace)} records"
+        self.virtual_size = Size(self.size.width, len(self.trace))
+        self.refresh()
+
+    def action_scrub(self, rows: int) -> None:
+        if self.trace is None or not len(self.trace):
+            return
+        previous = self.cursor
+        self.cursor = max(0, min(len(self.trace) - 1, self.cursor + rows))
+        self.refresh_line(previous)
+        self.refresh_line(self.cursor)
+        top = self.scroll_offset.y
+        height = self.size.height
+        if self.cursor < top:
+            self.scroll_to(y=self.cursor, animate=False)
+        elif self.cursor >= top + height:
+            self.scroll_to(y=self.cursor - height + 1, animate=False)
+        self.post_message(
+            self.Scrubbed(
+                self.cursor, self.trace.pc(self.cursor), self.trace.registers(self.cursor)
+            )
+        )
+
+    def instruction(self, pc: int) -> Optional[Instruction]:
+        if pc in self.decoded:
+            self.decoded.move_to_end(pc)
+            return self.decoded[pc]
+        if not self.target:
+            return None
+        decoded = read(self.target, pc, 1)
+        ins = decoded[0] if decoded and decoded[0].address == pc else None
+        self.decoded[pc] = ins
+        if len(self.decoded) > DECODED:
+            self.decoded.popitem(last=False)
+        return ins
+
+    def render_line(self, y: int) -> Strip:
+        scroll_x, scroll_y = self.scroll_offset
+        row = scroll_y + y
+        width = self.size.width
+        trace = self.trace
+        if trace is None or row >= len(trace):
+            return Strip.blank(width, self.rich_style)
+
+        pc = trace.pc(row)
+        text = Text(end="", no_wrap=True)
+        text.append(f"{row:>9} ", OFFSET)
+        text.append(f"0x{pc:x} ", ADDRESS)
+        ins = self.instruction(pc)
+        if ins is not None:
+            text.append(f"{ins.mnemonic:<8}", BRANCH if is_branch(ins.mnemonic) else MNEMONIC)
+            operands(text, ins.operands)
+        # full-width registers only; their sub-registers would just repeat them
+        widest = max(trace.sizes, default=0)
+        for register, value in trace.delta(row) if row else []:
+            name = trace.names[register]
+            if trace.sizes[register] != widest or name in ("rip", "pc"):
+                continue
+            text.append(f"  {name}", REGISTER)
+            text.append(f"=0x{value:x}")
+
+        strip = Strip(text.render(self.app.console), text.cell_len)
+        strip = strip.apply_style(self.rich_style)
+        strip = strip.crop_extend(scroll_x, scroll_x + width, self.rich_style)
+        if row == self.cursor:
+            strip = strip.apply_style(self.highlight)
+        return strip
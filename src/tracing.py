@@ -0,0 +1,226 @@
+"""
+instruction trace recorder.
+
+while tracing, every stop appends one fixed-width record to `steps.bin`: the
+pc, where its register values start in `values.bin`, and a bitmask of the
+registers that changed since the previous record. only those registers are
+written, with their new absolute values as little-endian u64s. every
+`KEYFRAME` records all registers are written, so any state can be rebuilt by
+replaying at most `KEYFRAME` records.
+
+both files are append-only and replayed through mmap, so neither the
+recorder nor the replay holds more than a few records in memory.
+"""
+
+from __future__ import annotations
+
+from typing import BinaryIO, Dict, List, Optional, Sequence, Tuple
+
+import json
+import lldb
+import mmap
+import os
+import struct
+
+from snapshot import Register
+
+# pc, offset into values.bin (in u64s), changed mask low and high words
+RECORD = struct.Struct("<QQQQ")
+VALUE = struct.Struct("<Q")
+# registers a mask can describe
+MAX_REGISTERS = 128
+KEYFRAME = 4096
+
+
+def general_purpose(frame: lldb.SBFrame) -> lldb.SBValue:
+    for regset in frame.GetRegisters():
+        if "general purpose registers" in regset.name.lower():
+            return regset
+    return lldb.SBValue()
+
+
+class TraceWriter:
+    """Appends records to a trace directory."""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.names: List[str] = []
+        self.last: List[Optional[int]] = []
+        self.count = 0
+        self.offset = 0
+        self.steps: Optional[BinaryIO] = None
+        self.values: Optional[BinaryIO] = None
+
+    def open(self, registers: Sequence[Register]) -> None:
+        """Fix the register layout from the first stop, and create the files."""
+        registers = list(registers)[:MAX_REGISTERS]
+        self.names = [reg.name for reg in registers]
+        self.last = [None] * len(self.names)
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, "registers.json"), "w") as file:
+            json.dump({"registers": [[reg.name, reg.size] for reg in registers]}, file)
+        self.steps = open(os.path.join(self.directory, "steps.bin"), "wb")
+        self.values = open(os.path.join(self.directory, "values.bin"), "wb")
+
+    def record(self, pc: int, values: Sequence[int]) -> None:
+        keyframe = self.count % KEYFRAME == 0
+        mask = 0
+        changed = []
+        for index, value in enumerate(values[: len(self.names)]):
+            if keyframe or value != self.last[index]:
+                mask |= 1 << index
+                changed.append(value)
+                self.last[index] = value
+        assert self.steps is not None and self.values is not None
+        self.values.write(struct.pack(f"<{len(changed)}Q", *changed))
+        self.steps.write(RECORD.pack(pc, self.offset, mask & (2**64 - 1), mask >> 64))
+        self.offset += len(changed)
+        self.count += 1
+
+    def record_registers(self, pc: int, registers: Sequence[Register]) -> None:
+        if self.steps is None:
+            self.open(registers)
+        self.record(pc, [reg.value for reg in registers])
+
+    def record_frame(self, frame: lldb.SBFrame) -> None:
+        """Record straight from a frame, without building a snapshot."""
+        regset = general_purpose(frame)
+        registers = [
+            Register(reg.name, reg.GetValueAsUnsigned(), reg.GetByteSize()) for reg in regset
+        ]
+        self.record_registers(frame.GetPC(), registers)
+
+    def flush(self) -> None:
+        # values first, so a reader never sees a record pointing past them
+        if self.values is not None and self.steps is not None:
+            self.values.flush()
+            self.steps.flush()
+
+    def close(self) -> None:
+        self.flush()
+        for file in (self.values, self.steps):
+            if file is not None:
+                file.close()
+        self.values = self.steps = None
+
+
+class Trace:
+    """Read-only, mmap-backed view of a trace directory."""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.names: List[str] = []
+        self.sizes: List[int] = []
+        self.steps: Optional[mmap.mmap] = None
+        self.values: Optional[mmap.mmap] = None
+        self.length = 0
+        # the last state rebuilt, to step forward from
+        self.cached: Tuple[int, List[int]] = (-1, [])
+        # keyframe -> the registers that really changed at it
+        self.keyframes: Dict[int, List[Tuple[int, int]]] = {}
+        self.reload()
+
+    def reload(self) -> None:
+        """Pick up records appended since the last reload."""
+        path = os.path.join(self.directory, "registers.json")
+        if not self.names and os.path.exists(path):
+            with open(path) as file:
+                layout = json.load(file)["registers"]
+            self.names = [name for name, _ in layout]
+            self.sizes = [size for _, size in layout]
+        self.steps = self.map("steps.bin", self.steps)
+        self.values = self.map("values.bin", self.values)
+        length = len(self.steps) // RECORD.size if self.steps else 0
+        available = len(self.values) // VALUE.size if self.values else 0
+        # drop a record whose values haven't reached the disk yet
+        while length and self.end(length - 1) > available:
+            length -= 1
+        self.length = length
+
+    def map(self, name: str, current: Optional[mmap.mmap]) -> Optional[mmap.mmap]:
+        path = os.path.join(self.directory, name)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return None
+        if current is not None and len(current) == size:
+            return current
+        if size == 0:
+            return None
+        with open(path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if current is not None:
+            current.close()
+        return mapped
+
+    def close(self) -> None:
+        for mapped in (self.steps, self.values):
+            if mapped is not None:
+                mapped.close()
+        self.steps = self.values = None
+        self.length = 0
+
+    def __len__(self) -> int:
+        return self.length
+
+    def record(self, index: int) -> Tuple[int, int, int]:
+        """pc, value offset and changed mask of one record."""
+        assert self.steps is not None
+        pc, offset, low, high = RECORD.unpack_from(self.steps, index * RECORD.size)
+        return pc, offset, low | high << 64
+
+    def end(self, index: int) -> int:
+        _, offset, mask = self.record(index)
+        return offset + bin(mask).count("1")
+
+    def pc(self, index: int) -> int:
+        return self.record(index)[0]
+
+    def changed(self, index: int) -> List[Tuple[int, int]]:
+        """(register index, value) for each register written by a record."""
+        assert self.values is not None
+        _, offset, mask = self.record(index)
+        changed = []
+        bit = 0
+        while mask:
+            if mask & 1:
+                changed.append((bit, VALUE.unpack_from(self.values, offset * VALUE.size)[0]))
+                offset += 1
+            mask >>= 1
+            bit += 1
+        return changed
+
+    def delta(self, index: int) -> List[Tuple[int, int]]:
+        """Like `changed`, minus what a keyframe rewrites with the same value."""
+        changed = self.changed(index)
+        if not index or index % KEYFRAME:
+            return changed
+        if index not in self.keyframes:
+            # a replay of up to a whole keyframe's worth of records, once
+            before = self.state(index - 1)
+            self.keyframes[index] = [
+                (register, value) for register, value in changed if before[register] != value
+            ]
+        return self.keyframes[index]
+
+    def state(self, index: int) -> List[int]:
+        """Every register's value at a record, replayed from the nearest keyframe."""
+        start, values = self.cached
+        if not (0 <= start <= index and index - start < KEYFRAME):
+            start = index - index % KEYFRAME
+            values = [0] * len(self.names)
+            for register, value in self.changed(start):
+                values[register] = value
+        else:
+            values = list(values)
+        for record in range(start + 1, index + 1):
+            for register, value in self.changed(record):
+                values[register] = value
+        self.cached = (index, values)
+        return values
+
+    def registers(self, index: int) -> Dict[str, Register]:
+        return {
+            name: Register(name, value, size)
+            for name, value, size in zip(self.names, self.state(index), self.sizes)
+        }
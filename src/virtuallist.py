@@ -0,0 +1,214 @@
+from rich.style import Style
+from rich.text import Text
+from textual.geometry import Size
+from textual.message import Message
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+from textual.worker import Worker, get_current_worker
+
+from collections import OrderedDict
+from typing import Callable, Generic, Iterable, List, Optional, TypeVar
+
+import re
+
+T = TypeVar("T")
+
+# rendered rows kept around, so scrolling back and forth doesn't re-render
+RENDERED_ROWS = 2048
+
+
+def fuzzy(query: str) -> Callable[[str], bool]:
+    """Match keys containing the characters of `query`, in order."""
+    pattern = re.compile(".*?".join(re.escape(char) for char in query.lower()))
+    return lambda key: pattern.search(key) is not None
+
+
+class VirtualList(ScrollView, Generic[T]):
+    """A long list of items, of which only the visible rows are ever rendered.
+
+    Items arrive in batches, usually from a background producer via `stream`,
+    and can be filtered at any time; a filter only changes which items are
+    shown, and narrowing one only looks at what the last one matched.
+    """
+
+    BINDINGS = [
+        ("up", "move(-1)", "up"),
+        ("down", "move(1)", "down"),
+        ("pageup", "page(-1)", "page up"),
+        ("pagedown", "page(1)", "page down"),
+        ("enter", "select", "select"),
+    ]
+
+    highlight = Style(bgcolor="#44475a", bold=True)
+
+    class Selected(Message):
+        """Enter was pressed on an item."""
+
+        def __init__(self, item: object) -> None:
+            super().__init__()
+            self.item = item
+
+    def __init__(
+        self,
+        render: Callable[[T], Text],
+        key: Callable[[T], str],
+        *,
+        matcher: Callable[[str], Callable[[str], bool]] = fuzzy,
+        id: Optional[str] = None,
+        classes: Optional[str] = None,
+    ) -> None:
+        super().__init__(id=id, classes=classes)
+        self.render_item = render
+        self.key = key
+        self.matcher = matcher
+        self.items: List[T] = []
+        self.keys: List[str] = []
+        # indices into `items` of the rows that pass the filter, in order
+        self.shown: List[int] = []
+        self.filter_text = ""
+        self.match: Optional[Callable[[str], bool]] = None
+        self.cursor = 0
+        self.rendered: "OrderedDict[int, Strip]" = OrderedDict()
+        # bumped by every new stream, so batches of an old one are dropped
+        self.generation = 0
+
+    def clear(self) -> None:
+        self.items = []
+        self.keys = []
+        self.shown = []
+        self.cursor = 0
+        self.rendered.clear()
+        self.relayout()
+
+    def extend(self, batch: Iterable[T]) -> None:
+        """Append items; only rows that land inside the view are repainted."""
+        first = len(self.items)
+        rows = len(self.shown)
+        for item in batch:
+            self.items.append(item)
+            self.keys.append(self.key(item).lower())
+        for index in range(first, len(self.items)):
+            if self.match is None or self.match(self.keys[index]):
+                self.shown.append(index)
+        if len(self.shown) == rows:
+            return
+        self.relayout(repaint=rows < self.scroll_offset.y + self.size.height)
+
+    def stream(self, batches: Iterable[List[T]]) -> Worker[None]:
+        """Pull batches on a worker thread and append them as they come."""
+        self.clear()
+        self.generation += 1
+        generation = self.generation
+
+        def append(batch: List[T]) -> None:
+            if generation == self.generation:
+                self.extend(batch)
+
+        def produce() -> None:
+            worker = get_current_worker()
+            for batch in batches:
+                if worker.is_cancelled:
+                    return
+                # blocks until appended, so a fast producer can't run ahead
+                self.app.call_from_thread(append, batch)
+
+        return self.run_worker(produce, thread=True, exclusive=True, group="stream")
+
+    def filter(self, query: str) -> None:
+        query = query.lower()
+        if query == self.filter_text:
+            return
+        narrowing = self.match is not None and query.startswith(self.filter_text)
+        self.filter_text = query
+        self.match = self.matcher(query) if query else None
+        if self.match is None:
+            self.shown = list(range(len(self.items)))
+        else:
+            candidates = self.shown if narrowing else range(len(self.items))
+            self.shown = [index for index in candidates if self.match(self.keys[index])]
+        self.cursor = 0
+        self.scroll_to(y=0, animate=False)
+        self.relayout()
+
+    def relayout(self, repaint: bool = True) -> None:
+        self.virtual_size = Size(self.size.width, len(self.shown))
+        if repaint:
+            self.refresh()
+
+    @property
+    def highlighted(self) -> Optional[T]:
+        if not self.shown:
+            return None
+        return self.items[self.shown[min(self.cursor, len(self.shown) - 1)]]
+
+    def replace(self, old: T, new: T) -> None:
+        """Swap one item for an updated version of itself, in place."""
+        index = self.items.index(old)
+        self.items[index] = new
+        self.keys[index] = self.key(new).lower()
+        self.rendered.pop(index, None)
+        self.refresh()
+
+    def remove(self, item: T) -> None:
+        """Drop one item; the rest keep their rendered rows."""
+        index = self.items.index(item)
+        del self.items[index]
+        del self.keys[index]
+        self.shown = [row if row < index else row - 1 for row in self.shown if row != index]
+        self.rendered = OrderedDict(
+            (row if row < index else row - 1, strip)
+            for row, strip in self.rendered.items()
+            if row != index
+        )
+        self.cursor = min(self.cursor, max(0, len(self.shown) - 1))
+        self.relayout()
+
+    def action_move(self, rows: int) -> None:
+        if not self.shown:
+            return
+        previous = self.cursor
+        self.cursor = max(0, min(len(self.shown) - 1, self.cursor + rows))
+        self.refresh_line(previous)
+        self.refresh_line(self.cursor)
+        self.follow(self.cursor)
+
+    def action_page(self, pages: int) -> None:
+        self.action_move(pages * max(1, self.size.height - 1))
+
+    def action_select(self) -> None:
+        item = self.highlighted
+        if item is not None:
+            self.post_message(self.Selected(item))
+
+    def follow(self, row: int) -> None:
+        top = self.scroll_offset.y
+        height = self.size.height
+        if row < top:
+            self.scroll_to(y=row, animate=False)
+        elif row >= top + height:
+            self.scroll_to(y=row - height + 1, animate=False)
+
+    def strip(self, index: int) -> Strip:
+        strip = self.rendered.get(index)
+        if strip is None:
+            text = self.render_item(self.items[index])
+            text.end = ""
+            strip = Strip(text.render(self.app.console), text.cell_len)
+            self.rendered[index] = strip
+            if len(self.rendered) > RENDERED_ROWS:
+                self.rendered.popitem(last=False)
+        else:
+            self.rendered.move_to_end(index)
+        return strip
+
+    def render_line(self, y: int) -> Strip:
+        scroll_x, scroll_y = self.scroll_offset
+        row = scroll_y + y
+        width = self.size.width
+        if row >= len(self.shown):
+            return Strip.blank(width, self.rich_style)
+        strip = self.strip(self.shown[row]).apply_style(self.rich_style)
+        strip = strip.crop_extend(scroll_x, scroll_x + width, self.rich_style)
+        if row == self.cursor:
+            strip = strip.apply_style(self.highlight)
+        return strip
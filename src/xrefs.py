@@ -0,0 +1,361 @@
+"""
+static cross references for the main module.
+
+every code symbol is disassembled with `ReadInstructions` straight out of the
+file, before any process exists, and three kinds of reference are pulled out
+of the operands:
+
+    call      call / bl to a fixed address
+    jump      jmp / jcc / b / cbz ... to a fixed address
+    string    rip-relative (x86) or adrp+add (arm64) address of a c string
+
+addresses are file addresses. the index fills in a batch of functions at a
+time, so lookups work (on what's done) while it's still being built, and is
+persisted per module uuid next to the symbol cache. a build that's cancelled
+saves what it got through, and the next one carries on from there:
+
+    xrefs = XrefIndex(symbols)
+    xrefs.attach(target)
+    xrefs.build()                       # in a worker
+    xrefs.callers(record)               # who calls or jumps into a function
+    xrefs.callees(record)               # what it calls, and its strings
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import bisect
+import json
+import lldb
+import os
+import re
+import threading
+
+from strings import CLASSES, preview
+from symbols import SymbolIndex, SymbolRecord, cache_dir, module_key
+
+# bump when the on-disk format changes
+CACHE_VERSION = 1
+# functions disassembled between publishing results (and checking for cancel)
+BATCH = 64
+# bytes looked at for a string at a referenced address
+STRING_WINDOW = 256
+# shortest text counted as a string reference
+MIN_STRING = 3
+
+CALLS = re.compile(r"(?:call|bl)q?", re.IGNORECASE)
+JUMPS = re.compile(r"(?:jmp|j[a-z]{1,3}|b|b\.\w+|cbn?z|tbn?z)q?", re.IGNORECASE)
+# the branch target, when it's a plain address and not a register or memory
+TARGET = re.compile(r"(?:^|,\s*)#?(0x[0-9a-f]+)\s*(?:<[^>]*>)?$", re.IGNORECASE)
+# `0x1234(%rip)` in at&t, `[rip + 0x1234]` in intel
+RIP = re.compile(r"(-?0x[0-9a-f]+)\(%rip\)|\[rip\s*([+-])\s*(0x[0-9a-f]+)\]", re.IGNORECASE)
+ADRP = re.compile(r"(\w+),\s*#?(-?(?:0x[0-9a-f]+|\d+))", re.IGNORECASE)
+ADD = re.compile(r"(\w+),\s*(\w+),\s*#(0x[0-9a-f]+|\d+)", re.IGNORECASE)
+
+
+class Xref(NamedTuple):
+    """One reference from an instruction; `text` is the string, for strings."""
+
+    source: int
+    target: int
+    kind: str
+    text: str = ""
+
+
+def targets(address: int, size: int, mnemonic: str, operands: str) -> Iterable[Tuple[str, int]]:
+    """(kind, file address) for the branch or data reference in one instruction.
+
+    String references come out as "data" here; whether there's a string at
+    the address is checked afterwards.
+    """
+    if operands.startswith("*"):
+        # indirect
+        return
+    if CALLS.fullmatch(mnemonic) or JUMPS.fullmatch(mnemonic):
+        match = TARGET.search(operands)
+        if match is not None:
+            yield ("call" if CALLS.fullmatch(mnemonic) else "jump"), int(match.group(1), 16)
+        return
+    match = RIP.search(operands)
+    if match is not None:
+        if match.group(1) is not None:
+            displacement = int(match.group(1), 16)
+        else:
+            displacement = int(match.group(3), 16) * (-1 if match.group(2) == "-" else 1)
+        yield "data", address + size + displacement
+
+
+def instructions(
+    target: lldb.SBTarget, module: lldb.SBModule, record: SymbolRecord
+) -> Iterator[Tuple[int, int, str, str]]:
+    """(file address, size, mnemonic, operands) for each instruction of a function."""
+    address = record.start
+    while address < record.end:
+        # a guess at about four bytes an instruction; decoding a byte count's
+        # worth would run far past the end, and a short guess only costs
+        # another pass round this loop
+        count = (record.end - address) // 4 + 1
+        decoded = target.ReadInstructions(module.ResolveFileAddress(address), count)
+        progressed = False
+        for ins in decoded:
+            start = ins.GetAddress().GetFileAddress()
+            size = ins.GetByteSize()
+            if start >= record.end or not size:
+                break
+            progressed = True
+            address = start + size
+            mnemonic = (ins.GetMnemonic(target) or "").lower()
+            yield start, size, mnemonic, ins.GetOperands(target) or ""
+        if not progressed:
+            return
+
+
+def decode_function(
+    target: lldb.SBTarget, module: lldb.SBModule, record: SymbolRecord, slide: int
+) -> List[Tuple[str, int, int]]:
+    """(kind, source, target) for one function; "data" still needs checking."""
+    found: List[Tuple[str, int, int]] = []
+    # arm64 builds addresses as a page from adrp plus an offset from add
+    pages: Dict[str, int] = {}
+    for start, size, mnemonic, operands in instructions(target, module, record):
+        if mnemonic == "adrp":
+            match = ADRP.match(operands)
+            if match is not None:
+                page = int(match.group(2), 0)
+                # a small number is a count of pages from this one
+                if abs(page) < 1 << 20:
+                    page = (start & ~0xFFF) + (page << 12)
+                else:
+                    page -= slide
+                pages[match.group(1)] = page
+            continue
+        if mnemonic == "add" and pages:
+            match = ADD.match(operands)
+            if match is not None and match.group(2) in pages:
+                page = pages.pop(match.group(2))
+                found.append(("data", start, page + int(match.group(3), 0)))
+            continue
+        for kind, to in targets(start, size, mnemonic, operands):
+            # with a process running, lldb prints load addresses
+            found.append((kind, start, to - slide if kind != "data" else to))
+    return found
+
+
+def module_slide(target: lldb.SBTarget, module: lldb.SBModule) -> int:
+    """How far `module` was moved from its file addresses; 0 before launch."""
+    header = module.GetObjectFileHeaderAddress()
+    loaded = header.GetLoadAddress(target)
+    if loaded == lldb.LLDB_INVALID_ADDRESS:
+        return 0
+    return loaded - header.GetFileAddress()
+
+
+def string_at(module: lldb.SBModule, address: int) -> Optional[str]:
+    """The c string at a file address in `module`, if one starts there."""
+    resolved = module.ResolveFileAddress(address)
+    section = resolved.GetSection()
+    if not section or section.GetSectionType() == lldb.eSectionTypeCode:
+        return None
+    offset = resolved.GetOffset()
+    size = min(STRING_WINDOW, section.GetByteSize() - offset)
+    if size <= 0:
+        return None
+    error = lldb.SBError()
+    data = section.GetSectionData(offset, size).ReadRawData(error, 0, size)
+    if not error.Success() or not data:
+        return None
+    end = data.find(b"\x00")
+    if end < MIN_STRING:
+        return None
+    # ascii only; anything else is more likely a table than text
+    if data[:end].translate(CLASSES).strip(b"a"):
+        return None
+    return preview(data, STRING_WINDOW)
+
+
+class XrefIndex:
+    """Cross references of the main module, by source and by target."""
+
+    def __init__(self, symbols: SymbolIndex, directory: Optional[str] = None) -> None:
+        self.symbols = symbols
+        self.directory = directory
+        self.target: Optional[lldb.SBTarget] = None
+        self.key = ""
+        self.lock = threading.Lock()
+        self.xrefs: List[Xref] = []
+        # function starts already disassembled
+        self.done: Set[int] = set()
+        self.total = 0
+        self.complete = False
+        # sorted views, rebuilt when `xrefs` has grown since
+        self.sorted_count = -1
+        self.by_source: List[Xref] = []
+        self.sources: List[int] = []
+        self.by_target: List[Xref] = []
+        self.targets: List[int] = []
+
+    def attach(self, target: lldb.SBTarget) -> None:
+        with self.lock:
+            self.target = target
+            self.key = ""
+            self.xrefs = []
+            self.done = set()
+            self.total = 0
+            self.complete = False
+            self.sorted_count = -1
+
+    def path(self) -> str:
+        return os.path.join(
+            self.directory or cache_dir(), "xrefs", f"{self.key}.v{CACHE_VERSION}.json"
+        )
+
+    def load(self) -> None:
+        """Pick up a previous session's index, finished or not."""
+        try:
+            with open(self.path()) as file:
+                cached = json.load(file)
+            xrefs = [Xref(*row) for row in cached["xrefs"]]
+            done = set(cached["done"])
+        except (OSError, ValueError, TypeError, KeyError):
+            return
+        with self.lock:
+            self.xrefs = xrefs
+            self.done = done
+
+    def save(self) -> None:
+        if not self.key:
+            return
+        with self.lock:
+            cached = {"done": sorted(self.done), "xrefs": [list(xref) for xref in self.xrefs]}
+        path = self.path()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            partial = f"{path}.{os.getpid()}.tmp"
+            with open(partial, "w") as file:
+                json.dump(cached, file)
+            os.replace(partial, path)
+        except OSError:
+            pass
+
+    def build(self, cancelled: Callable[[], bool] = lambda: False) -> None:
+        """Disassemble whatever functions the cache doesn't already cover."""
+        target = self.target
+        main = self.symbols.main()
+        if not target or main is None or target.GetNumModules() == 0:
+            return
+        module = target.GetModuleAtIndex(0)
+        self.key = module_key(module)
+        if self.key:
+            self.load()
+
+        functions = [
+            record
+            for record in main.by_address
+            if record.type == "code" and record.end > record.start
+        ]
+        with self.lock:
+            self.total = len(functions)
+            remaining = [record for record in functions if record.start not in self.done]
+        if not remaining:
+            self.complete = True
+            return
+        # another target was attached; its index isn't ours to touch
+        replaced = lambda: self.target is not target
+
+        slide = module_slide(target, module)
+        strings: Dict[int, Optional[str]] = {}
+        for first in range(0, len(remaining), BATCH):
+            if replaced():
+                return
+            if cancelled():
+                # keep what's done for next time
+                self.save()
+                return
+            batch = remaining[first : first + BATCH]
+            found: List[Xref] = []
+            for record in batch:
+                for kind, source, to in decode_function(target, module, record, slide):
+                    if kind != "data":
+                        found.append(Xref(source, to, kind))
+                        continue
+                    if to not in strings:
+                        strings[to] = string_at(module, to)
+                    if strings[to] is not None:
+                        found.append(Xref(source, to, "string", strings[to]))
+            with self.lock:
+                if replaced():
+                    return
+                self.xrefs.extend(found)
+                self.done.update(record.start for record in batch)
+        self.complete = True
+        self.save()
+
+    def progress(self) -> Tuple[int, int]:
+        """(functions done, functions in all)."""
+        return len(self.done), self.total
+
+    def sort(self) -> None:
+        with self.lock:
+            if self.sorted_count == len(self.xrefs):
+                return
+            xrefs = list(self.xrefs)
+        by_source = sorted(xrefs)
+        by_target = sorted(xrefs, key=lambda xref: (xref.target, xref.source))
+        with self.lock:
+            self.by_source, self.sources = by_source, [xref.source for xref in by_source]
+            self.by_target, self.targets = by_target, [xref.target for xref in by_target]
+            self.sorted_count = len(xrefs)
+
+    def to(self, start: int, end: int) -> List[Xref]:
+        """References to anywhere in [start, end)."""
+        self.sort()
+        first = bisect.bisect_left(self.targets, start)
+        last = bisect.bisect_left(self.targets, end)
+        return self.by_target[first:last]
+
+    def within(self, start: int, end: int) -> List[Xref]:
+        """References made by instructions in [start, end)."""
+        self.sort()
+        first = bisect.bisect_left(self.sources, start)
+        last = bisect.bisect_left(self.sources, end)
+        return self.by_source[first:last]
+
+    def callers(self, record: SymbolRecord) -> List[Xref]:
+        """Calls and jumps into `record` from outside it."""
+        end = max(record.end, record.start + 1)
+        return [
+            xref
+            for xref in self.to(record.start, end)
+            if xref.kind != "string" and not record.start <= xref.source < end
+        ]
+
+    def callees(self, record: SymbolRecord) -> List[Xref]:
+        """Calls, jumps out and strings used by `record`."""
+        end = max(record.end, record.start + 1)
+        return [
+            xref
+            for xref in self.within(record.start, end)
+            if xref.kind != "jump" or not record.start <= xref.target < end
+        ]
+
+    def function(self, address: int) -> Optional[SymbolRecord]:
+        """The main module's symbol covering a file address."""
+        main = self.symbols.main()
+        return None if main is None else main.at(address)
+
+    def name(self, address: int) -> str:
+        """`symbol+offset` for a file address, or the bare address."""
+        record = self.function(address)
+        if record is None:
+            return f"0x{address:x}"
+        offset = address - record.start
+        return f"{record.demangled}+{offset}" if offset else record.demangled
+
+    def load_address(self, address: int) -> int:
+        """Where a file address of the main module lives now."""
+        if not self.target or self.target.GetNumModules() == 0:
+            return address
+        module = self.target.GetModuleAtIndex(0)
+        loaded = module.ResolveFileAddress(address).GetLoadAddress(self.target)
+        return address if loaded == lldb.LLDB_INVALID_ADDRESS else loaded
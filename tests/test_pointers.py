@@ -0,0 +1,50 @@
+"""
+pointers into neighbouring regions of different sizes are indexed once.
+
+    python -m pytest tests
+"""
+
+import struct
+
+import pytest
+
+# the sweep builds lldb.SBErrors to read with
+pytest.importorskip("lldb")
+
+from memmap import Region
+from pointers import PointerMap
+
+
+class Memory:
+    """Just enough of an SBProcess to sweep."""
+
+    def __init__(self, regions) -> None:
+        # base -> contents; anything past them reads as a hole
+        self.regions = regions
+
+    def ReadMemory(self, address, size, error):
+        for base, data in self.regions.items():
+            if base <= address < base + len(data):
+                return bytes(data[address - base : address - base + size])
+        return None
+
+    def GetStopID(self):
+        return 1
+
+
+def test_small_region_next_to_a_big_one():
+    # a pie image and the heap after it: the image gets a six byte needle,
+    # the heap a four byte one that the image's ends in
+    image = Region(0x555555554000, 0x555555558000, "r--", "image")
+    heap = Region(0x555555559000, 0x555600000000, "rw-", "heap")
+    small = bytearray(image.end - image.base)
+    big = bytearray(0x2000)
+    struct.pack_into("<Q", small, 0x10, heap.base + 0x40)
+    struct.pack_into("<Q", big, 0x100, image.base + 0x20)
+    struct.pack_into("<Q", big, 0x108, heap.base + 0x80)
+    process = Memory({image.base: small, heap.base: big})
+    pointers = PointerMap.build(process, [image, heap])
+    assert pointers.to(image.base + 0x20) == [heap.base + 0x100]
+    assert pointers.to(heap.base + 0x40) == [image.base + 0x10]
+    assert pointers.to(heap.base + 0x80) == [heap.base + 0x108]
+    assert len(pointers) == 3
@@ -0,0 +1,43 @@
+"""
+strings cut in two by a chunk boundary come back whole.
+
+    python -m pytest tests
+"""
+
+import pytest
+
+# strings builds lldb.SBErrors to read with
+pytest.importorskip("lldb")
+
+import strings
+from memmap import Region
+from strings import StringIndex
+
+
+class Memory:
+    """Just enough of an SBProcess to read from."""
+
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+
+    def ReadMemory(self, address, size, error):
+        return self.data[address : address + size]
+
+
+@pytest.mark.parametrize(
+    "text, encoding",
+    [
+        ("hello wörld ok", "utf-8"),
+        ("BOUNDARY string", "utf-16-le"),
+        ("abcdef", "ascii"),
+    ],
+)
+def test_across_chunks(monkeypatch, text, encoding):
+    monkeypatch.setattr(strings, "CHUNK", 64)
+    encoded = text.encode(encoding)
+    # every cut, from after the first byte to before the last
+    for cut in range(1, len(encoded)):
+        data = b"\x01" * (64 - cut) + encoded + b"\x00" + b"\x01" * 100
+        region = Region(0, len(data), "r--", "")
+        found = StringIndex().scan_region(Memory(data), region, lambda: False)
+        assert [hit[2] for hit in found] == [text], cut